@@ -0,0 +1,121 @@
+# app/browser.py
+"""
+Un singur Chromium (Playwright) + un singur context per proces.
+
+Browserul rulează pe un event loop propriu, într-un thread daemon, așa că poate
+fi folosit din orice thread (ex. workerii din app.pipeline): get_browser().run(...)
+programează o corutină pe loop și așteaptă rezultatul. Pornește la prima folosire
+și se închide la ieșirea din proces.
+
+Cookie-urile din context (inclusiv cele de la protecția anti-bot) și User-Agent-ul
+ajung în session-ul HTTP comun (app.http_client), ca request-urile simple să
+treacă la fel ca browserul.
+"""
+import asyncio
+import atexit
+import threading
+
+from playwright.async_api import async_playwright
+
+from .config import BROWSER_HEADLESS, BROWSER_TABS, USER_AGENT
+from . import http_client
+
+_browser = None
+_browser_lock = threading.Lock()
+
+
+class BrowserSession:
+    def __init__(self, headless: bool = BROWSER_HEADLESS, user_agent: str = USER_AGENT,
+                 tabs: int = BROWSER_TABS):
+        self.headless = headless
+        self.user_agent = user_agent
+        self.tabs = max(1, int(tabs or 1))
+        self.context = None
+        self._pw = None
+        self._chromium = None
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="playwright", daemon=True)
+        self._thread.start()
+        self._start_lock = None
+        self._slots = None
+
+    # --- ciclu de viață (pe loop-ul browserului) ----------------------------
+
+    async def _ensure_started(self):
+        if self._start_lock is None:
+            self._start_lock = asyncio.Lock()
+            self._slots = asyncio.Semaphore(self.tabs)
+        async with self._start_lock:
+            if self.context is None:
+                self._pw = await async_playwright().start()
+                self._chromium = await self._pw.chromium.launch(headless=self.headless)
+                self.context = await self._chromium.new_context(user_agent=self.user_agent)
+        return self.context
+
+    async def _call(self, fn):
+        ctx = await self._ensure_started()
+        return await fn(ctx)
+
+    async def _stop(self):
+        if self._chromium is not None:
+            await self._chromium.close()
+        if self._pw is not None:
+            await self._pw.stop()
+        self.context = self._chromium = self._pw = None
+
+    # --- API sincron (din orice thread) --------------------------------------
+
+    def run(self, fn, timeout: float = None):
+        """fn(context) -> corutină; o rulează pe loop-ul browserului și întoarce rezultatul."""
+        return asyncio.run_coroutine_threadsafe(self._call(fn), self._loop).result(timeout)
+
+    def cookies(self) -> list:
+        return self.run(lambda ctx: ctx.cookies())
+
+    def share_with(self, session=None) -> None:
+        """Cookie-urile și User-Agent-ul browserului în session-ul HTTP (implicit cel comun)."""
+        session = session or http_client.get_session()
+        for c in self.cookies():
+            session.cookies.set(c["name"], c["value"], domain=c.get("domain", ""), path=c.get("path", "/"))
+        session.headers["User-Agent"] = self.user_agent
+
+    def fetch_html(self, url: str, timeout: float = 90) -> str:
+        """
+        HTML-ul randat al unei pagini, într-un tab nou din contextul comun.
+        Cel mult `tabs` pagini deschise simultan; cookie-urile rezultate trec în session-ul HTTP.
+        """
+        async def one(ctx):
+            async with self._slots:
+                page = await ctx.new_page()
+                try:
+                    resp = await page.goto(url, wait_until="domcontentloaded", timeout=timeout * 1000)
+                    if resp is not None and resp.status >= 400:
+                        raise RuntimeError(f"HTTP {resp.status} for {url}")
+                    return await page.content()
+                finally:
+                    await page.close()
+
+        html = self.run(one)
+        self.share_with()
+        return html
+
+    def close(self) -> None:
+        if self._loop.is_closed():
+            return
+        try:
+            asyncio.run_coroutine_threadsafe(self._stop(), self._loop).result(30)
+        finally:
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join(5)
+            self._loop.close()
+
+
+def get_browser() -> BrowserSession:
+    """BrowserSession-ul procesului (creat la prima cerere)."""
+    global _browser
+    if _browser is None:
+        with _browser_lock:
+            if _browser is None:
+                _browser = BrowserSession()
+                atexit.register(_browser.close)
+    return _browser
@@ -14,6 +14,29 @@ JE_DEALER_NAME = os.getenv("JE_DEALER_NAME", "").strip()
 
 IMAGE_HOST_BASE = os.getenv("IMAGE_HOST_BASE", "").rstrip("/")
 
+# Imagini (app.images): URL-uri canonice fără dubluri; opțional validare HEAD, cu rezultatele
+# ținute IMAGE_CHECK_TTL secunde în IMAGE_INDEX_PATH (o imagine se verifică o dată, nu la fiecare rulare)
+IMAGE_VALIDATE = os.getenv("IMAGE_VALIDATE", "0").strip().lower() in ("1", "true", "yes")
+IMAGE_VALIDATE_WORKERS = int(os.getenv("IMAGE_VALIDATE_WORKERS", "4"))
+IMAGE_INDEX_PATH = os.getenv(
+    "IMAGE_INDEX_PATH",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "image_index.json"),
+)
+IMAGE_CHECK_TTL = float(os.getenv("IMAGE_CHECK_TTL", str(30 * 24 * 3600)))
+IMAGE_MAX_BYTES = int(os.getenv("IMAGE_MAX_BYTES", "0"))  # 0 = fără limită
+
+# Mirror de imagini (app.image_mirror): "disk" (IMAGE_MIRROR_DIR) sau "s3" (bucket-ul din app.storage),
+# gol = dezactivat. Fișierele sunt adresate după sha256, iar feed-ul le servește de pe IMAGE_HOST_BASE,
+# care trebuie să indice rădăcina IMAGE_MIRROR_DIR (sau a bucket-ului + S3_PREFIX)
+IMAGE_MIRROR = os.getenv("IMAGE_MIRROR", "").strip().lower()
+IMAGE_MIRROR_DIR = os.getenv(
+    "IMAGE_MIRROR_DIR",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "mirror"),
+)
+IMAGE_MIRROR_WORKERS = int(os.getenv("IMAGE_MIRROR_WORKERS", "4"))
+IMAGE_VARIANT_MAX_PX = int(os.getenv("IMAGE_VARIANT_MAX_PX", "1600"))  # latura maximă a variantei (Pillow)
+IMAGE_VARIANT_QUALITY = int(os.getenv("IMAGE_VARIANT_QUALITY", "85"))
+
 def output_filename():
     if not JE_DEALER_ID:
         raise SystemExit("Environment JE_DEALER_ID is required")
@@ -25,3 +48,82 @@ AWS_DEFAULT_REGION = os.getenv("AWS_DEFAULT_REGION", "us-east-1")
 S3_BUCKET = os.getenv("S3_BUCKET", "")
 S3_PREFIX = os.getenv("S3_PREFIX", "").lstrip("/")
 S3_ENDPOINT_URL = os.getenv("S3_ENDPOINT_URL", "")
+S3_GZIP = os.getenv("S3_GZIP", "1").strip().lower() in ("1", "true", "yes")
+
+# Fetch concurent (app.main): număr de workeri și buget de request-uri per host
+FETCH_WORKERS = int(os.getenv("FETCH_WORKERS", "4"))
+HOST_RATE_LIMIT = float(os.getenv("HOST_RATE_LIMIT", "2.0"))  # request-uri/secundă per host, 0 = fără limită
+HOST_RATE_BURST = float(os.getenv("HOST_RATE_BURST", "2"))
+
+# HTTP: pool de conexiuni + retry cu backoff exponențial (app.http_client)
+HTTP_POOL_SIZE = int(os.getenv("HTTP_POOL_SIZE", "8"))
+HTTP_RETRIES = int(os.getenv("HTTP_RETRIES", "4"))
+HTTP_BACKOFF_BASE = float(os.getenv("HTTP_BACKOFF_BASE", "1.0"))
+HTTP_BACKOFF_MAX = float(os.getenv("HTTP_BACKOFF_MAX", "60"))
+
+# Cache HTTP pe disc (app.http_cache): revalidare cu ETag/Last-Modified, TTL și limită LRU
+HTTP_CACHE_DIR = os.getenv(
+    "HTTP_CACHE_DIR",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "http_cache"),
+)  # gol = cache dezactivat
+HTTP_CACHE_TTL = float(os.getenv("HTTP_CACHE_TTL", str(7 * 24 * 3600)))  # secunde; după TTL descărcăm integral
+HTTP_CACHE_FRESH = float(os.getenv("HTTP_CACHE_FRESH", "0"))  # secunde în care nu revalidăm deloc
+HTTP_CACHE_MAX_MB = float(os.getenv("HTTP_CACHE_MAX_MB", "500"))
+
+# Metrici per rulare (app.metrics): sumar JSON la final, opțional și format text Prometheus
+METRICS_JSON = os.getenv(
+    "METRICS_JSON",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "metrics.json"),
+)  # gol = nu scriem
+METRICS_PROM = os.getenv("METRICS_PROM", "")
+METRICS_SLOWEST = int(os.getenv("METRICS_SLOWEST", "10"))  # câte URL-uri lente păstrăm
+
+# Descoperire listing-uri: "auto" (JSON-ul paginii + endpoint-ul paginat, Playwright doar fallback),
+# "direct" (fără browser deloc) sau "browser" (doar Playwright, ca înainte)
+DISCOVERY_BACKEND = os.getenv("DISCOVERY_BACKEND", "auto").strip().lower()
+INDEX_API_URL = os.getenv("INDEX_API_URL", f"{BASE}/wp-json/bringatrailer/1.0/data/listings-filter")
+# oprește descoperirea la prima pagină cu doar URL-uri deja în inventory (indexul e atunci parțial)
+DISCOVERY_STOP_AT_KNOWN = os.getenv("DISCOVERY_STOP_AT_KNOWN", "0").strip().lower() in ("1", "true", "yes")
+# încercări în plus pentru o pagină de index eșuată (după retry-urile din http_client);
+# apoi descoperirea se oprește cu IndexIncomplete, nu ca la sfârșitul indexului
+DISCOVERY_PAGE_RETRIES = max(0, int(os.getenv("DISCOVERY_PAGE_RETRIES", "2")))
+# bugetul propriu al paginilor de index (endpoint-ul JSON), separat de pauza dintre paginile
+# de listing: altfel paginile cerute în paralel ar aștepta tot PAUSE_BETWEEN_REQUESTS una după alta
+DISCOVERY_RATE_LIMIT = float(os.getenv("DISCOVERY_RATE_LIMIT", "4"))  # request-uri/secundă, 0 = fără limită
+DISCOVERY_RATE_BURST = float(os.getenv("DISCOVERY_RATE_BURST", "4"))
+
+# Playwright: un singur browser + context per proces (app.browser). BROWSER_TABS > 0 activează
+# fallback-ul prin browser pentru paginile de listing blocate la HTTP simplu (403/429/503),
+# cu cel mult atâtea tab-uri deschise în paralel
+BROWSER_HEADLESS = os.getenv("BROWSER_HEADLESS", "1").strip().lower() in ("1", "true", "yes")
+BROWSER_TABS = int(os.getenv("BROWSER_TABS", "0"))
+
+# Mod incremental (app.pipeline): descărcăm doar listing-uri noi sau mai vechi de STALE_AFTER_HOURS
+INCREMENTAL = os.getenv("INCREMENTAL", "0").strip().lower() in ("1", "true", "yes")
+STALE_AFTER_HOURS = float(os.getenv("STALE_AFTER_HOURS", "24"))
+
+# Parsare HTML în procese separate (app.parse_pool); 0 = în thread-ul care a descărcat pagina
+PARSE_PROCESSES = int(os.getenv("PARSE_PROCESSES", "0"))
+
+# Pipeline în flux (app.pipeline.run_streaming): discovery -> fetch/parse -> upsert + advert,
+# legate prin cozi de cel mult STREAM_QUEUE_SIZE elemente; inventory-ul se salvează
+# la fiecare STREAM_COMMIT_EVERY recorduri
+STREAMING = os.getenv("STREAMING", "0").strip().lower() in ("1", "true", "yes")
+STREAM_QUEUE_SIZE = int(os.getenv("STREAM_QUEUE_SIZE", "64"))
+STREAM_COMMIT_EVERY = int(os.getenv("STREAM_COMMIT_EVERY", "25"))
+
+# Inventory: "sqlite" (data/inventory.sqlite, implicit) sau "json" (data/inventory.json)
+INVENTORY_BACKEND = os.getenv("INVENTORY_BACKEND", "sqlite").strip().lower()
+# cu SQLite: export complet în data/inventory.json la finalul fiecărei rulări (O(inventory),
+# deci implicit oprit; la cerere: python -m app.inventory export-json)
+INVENTORY_EXPORT_JSON = os.getenv("INVENTORY_EXPORT_JSON", "0").strip().lower() in ("1", "true", "yes")
+
+# Feed-uri suplimentare randate în aceeași trecere (app.feeds), vezi feeds.example.json
+FEEDS_CONFIG = os.getenv("FEEDS_CONFIG", "feeds.json")
+
+# Feed determinist: adverts sortate după reference, created/updated din first_seen/last_seen
+# (nu din ceasul build-ului) -> același inventory dă exact aceiași bytes
+FEED_DETERMINISTIC = os.getenv("FEED_DETERMINISTIC", "1").strip().lower() in ("1", "true", "yes")
+
+# Lângă feed-ul principal: .delta.xml (adăugate/schimbate/scoase față de publicarea anterioară) + .manifest.json
+FEED_DELTA = os.getenv("FEED_DELTA", "1").strip().lower() in ("1", "true", "yes")
@@ -0,0 +1,209 @@
+# app/discovery.py
+"""
+Descoperirea listing-urilor fără browser: citim datele pe care le încarcă pagina
+de auctions/results (JSON-ul inițial din HTML + endpoint-ul paginat
+listings-filter), nu DOM-ul randat după scroll.
+
+Playwright rămâne doar fallback (app.scraper / app.main).
+"""
+import json
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from urllib.parse import parse_qsl, urlencode, urljoin, urlparse
+
+import requests
+
+from . import http_client
+from .config import (
+    BASE, FETCH_WORKERS, INDEX_API_URL, DISCOVERY_PAGE_RETRIES, DISCOVERY_RATE_LIMIT, DISCOVERY_RATE_BURST,
+)
+from .throttle import HostRateLimiter
+
+# var auctionsCurrentInitialData = {...};  /  var auctionsCompletedInitialData = {...};
+_INITIAL_DATA_RX = re.compile(r"\b(auctions\w*InitialData)\s*=\s*(?=\{)")
+# câmpurile din item-uri care pot conține link-ul spre /listing/
+_URL_KEYS = ("url", "link", "permalink")
+# numele câmpului cu numărul total de pagini diferă între pagini/versiuni
+_PAGES_KEYS = ("pages_total", "page_maximum", "total_pages", "max_pages")
+
+# paginile de index au bugetul lor (DISCOVERY_RATE_LIMIT / _BURST), nu scheduler-ul comun
+_index_limiter = HostRateLimiter(DISCOVERY_RATE_LIMIT, DISCOVERY_RATE_BURST)
+
+
+class IndexIncomplete(RuntimeError):
+    """O pagină de index n-a putut fi citită: URL-urile date până aici nu sunt tot indexul."""
+
+    def __init__(self, page: int, found: int, cause: Exception = None):
+        super().__init__(f"index page {page} failed after {found} listing URLs: {cause!r}")
+        self.page = page
+        self.found = found
+        self.cause = cause
+
+
+def normalize_listing_url(h: str) -> str:
+    if not h:
+        return ""
+    h = h.split("#")[0].split("?")[0].rstrip("/")
+    if "/listing/" not in h:
+        return ""
+    if h.startswith("http"):
+        return h
+    return urljoin(BASE, h)
+
+
+def listing_urls_from_json(obj) -> list:
+    """Toate URL-urile /listing/ dintr-un obiect JSON (în ordinea în care apar)."""
+    out = []
+    stack = [obj]
+    while stack:
+        o = stack.pop()
+        if isinstance(o, dict):
+            for k in _URL_KEYS:
+                v = o.get(k)
+                if isinstance(v, str):
+                    u = normalize_listing_url(v)
+                    if u:
+                        out.append(u)
+            stack.extend(reversed([v for v in o.values() if isinstance(v, (dict, list))]))
+        elif isinstance(o, list):
+            stack.extend(reversed(o))
+    return out
+
+
+def initial_data(html: str) -> list:
+    """Obiectele JSON `auctions*InitialData` inline în HTML-ul paginii."""
+    dec = json.JSONDecoder()
+    out = []
+    for m in _INITIAL_DATA_RX.finditer(html or ""):
+        try:
+            obj, _ = dec.raw_decode(html, m.end())
+        except ValueError:
+            continue
+        if isinstance(obj, dict):
+            out.append(obj)
+    return out
+
+
+def _pages_total(data: dict):
+    for k in _PAGES_KEYS:
+        try:
+            n = int(data.get(k))
+        except (TypeError, ValueError):
+            continue
+        if n > 0:
+            return n
+    return None
+
+
+def fetch_index_page(page: int, query: dict, per_page: int = None) -> list:
+    """Pagina `page` din endpoint-ul JSON paginat; lista de URL-uri /listing/."""
+    params = dict(query, page=page, get_items=1, get_stats=0)
+    if per_page:
+        params["per_page"] = per_page
+    r = http_client.request(f"{INDEX_API_URL}?{urlencode(params)}",
+                            headers={"Accept": "application/json"}, limiter=_index_limiter)
+    r.raise_for_status()
+    return listing_urls_from_json(r.json())
+
+
+def iter_listing_urls(page_url: str, known=None, workers: int = FETCH_WORKERS):
+    """
+    URL-urile /listing/ de pe `page_url`, fără browser, pe măsură ce sosesc paginile:
+      1. JSON-ul inițial din HTML (prima pagină; la auctions, de regulă toate)
+      2. dacă el anunță mai multe pagini: endpoint-ul paginat, câte `workers`
+         pagini în paralel, cu bugetul DISCOVERY_RATE_LIMIT / DISCOVERY_RATE_BURST
+    Se oprește la o pagină goală sau la prima pagină în care toate URL-urile sunt
+    în `known` (mai departe vin doar listing-uri mai vechi).
+    Nu dă nimic dacă pagina nu are datele așteptate (apelantul trece pe Playwright).
+    O pagină care eșuează (5xx, timeout, JSON invalid) e reîncercată de
+    DISCOVERY_PAGE_RETRIES ori, apoi ridică IndexIncomplete: URL-urile date până
+    atunci rămân valabile, dar nu sunt tot indexul (nu se poate face reconcile pe ele).
+    """
+    known = set(known or ())
+    seen = set()
+
+    def fresh(found) -> list:
+        out = []
+        for u in found:
+            if u not in seen:
+                seen.add(u)
+                out.append(u)
+        return out
+
+    pages_total, first = None, []
+    for data in initial_data(http_client.get_text(page_url)):
+        first += listing_urls_from_json(data)
+        pages_total = pages_total or _pages_total(data)
+    yield from fresh(first)
+    if not first or (known and all(u in known for u in first)):
+        return
+    if not pages_total or pages_total <= 1:
+        return
+
+    # filtrele paginii (ex. result=unsold) + aceeași mărime de pagină ca prima
+    query = dict(parse_qsl(urlparse(page_url).query))
+    per_page = len(first)
+    workers = max(1, int(workers or 1))
+
+    def one(n):
+        err = None
+        for attempt in range(DISCOVERY_PAGE_RETRIES + 1):
+            try:
+                return fetch_index_page(n, query, per_page)
+            except (requests.RequestException, ValueError) as e:
+                print(f"Index page {n} failed (attempt {attempt + 1}/{DISCOVERY_PAGE_RETRIES + 1}):", repr(e))
+                err = e
+            if attempt < DISCOVERY_PAGE_RETRIES:
+                time.sleep(http_client.backoff(attempt))
+        return err
+
+    page = 2
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        while page <= pages_total:
+            batch = list(range(page, min(page + workers, pages_total + 1)))
+            for n, found in zip(batch, pool.map(one, batch)):
+                if isinstance(found, Exception):
+                    raise IndexIncomplete(n, len(seen), found)
+                if not found:
+                    return
+                yield from fresh(found)
+                if known and all(u in known for u in found):
+                    return
+            page += len(batch)
+            print(f"Index: {len(seen)} listing URLs after {page - 1}/{pages_total} pages")
+
+
+def discover_listings(page_url: str, target: int = None, known=None,
+                      workers: int = FETCH_WORKERS) -> list:
+    """iter_listing_urls ca listă, cel mult `target` URL-uri (None = toate)."""
+    it = iter_listing_urls(page_url, known, workers)
+    return list(islice(it, target) if target else it)
+
+
+# Pentru fallback-urile cu Playwright (app.scraper, app.main): un MutationObserver
+# pus o singură dată în pagină strânge href-urile /listing/ ale ancorelor noi;
+# fiecare apel întoarce doar ce s-a adăugat de la apelul anterior (nu tot DOM-ul).
+HARVEST_LINKS_JS = """
+() => {
+  const SEL = "a[href*='/listing/']";
+  if (!window.__jeLinks) {
+    const q = window.__jeLinks = [];
+    const take = (n) => {
+      if (!n || n.nodeType !== 1) return;
+      if (n.matches(SEL)) q.push(n.getAttribute('href'));
+      for (const a of n.querySelectorAll(SEL)) q.push(a.getAttribute('href'));
+    };
+    take(document.documentElement);
+    new MutationObserver((ms) => {
+      for (const m of ms) {
+        if (m.type === 'attributes') take(m.target);
+        else for (const n of m.addedNodes) take(n);
+      }
+    }).observe(document.documentElement,
+               {childList: true, subtree: true, attributes: true, attributeFilter: ['href']});
+  }
+  return window.__jeLinks.splice(0);
+}
+"""
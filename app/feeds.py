@@ -0,0 +1,154 @@
+# app/feeds.py
+"""
+Mai multe feed-uri JamesEdition dintr-o singură trecere prin inventory.
+
+Un feed spec (vezi feeds.example.json) e un dict:
+  {
+    "name": "JamesEdition_feed_105029_ferrari.xml",   # fișierul de ieșire
+    "brands": ["Ferrari"],                            # opțional, case-insensitive
+    "statuses": ["active"],                           # implicit ["active"]
+    "year_min": 1950, "year_max": 1999,               # opțional
+    "countries": ["United States"], "regions": [],    # opțional, pe location
+    "max_images": 20                                  # opțional, implicit 40
+  }
+"""
+import json
+import os
+
+from . import metrics
+from .config import FEED_DETERMINISTIC, FEEDS_CONFIG
+from .james_xml import (
+    MAX_ADVERT_IMAGES,
+    JamesFeedWriter,
+    _find_brand,
+    _require_dealer,
+    advert_bytes,
+    advert_fields,
+    feed_records,
+    feed_timestamps,
+)
+
+
+def load_feed_specs(path: str = FEEDS_CONFIG) -> list:
+    """Spec-urile din fișierul JSON (listă sau {"feeds": [...]}); [] dacă nu există."""
+    if not path or not os.path.exists(path):
+        return []
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    specs = data.get("feeds", []) if isinstance(data, dict) else data
+    for s in specs:
+        if not s.get("name"):
+            raise ValueError(f"Feed spec without 'name' in {path}: {s!r}")
+    return specs
+
+
+def _canon_brand(b: str) -> str:
+    # "Mercedes" / "mercedes-benz" -> "mercedes-benz" (prin alias-urile din james_xml)
+    b = (b or "").strip()
+    return (_find_brand(b) or b).lower()
+
+
+def _lower_set(values) -> set:
+    return {str(v).strip().lower() for v in values or [] if str(v).strip()}
+
+
+def _to_int(v):
+    try:
+        return int(str(v).strip())
+    except (TypeError, ValueError):
+        return None
+
+
+class _Matcher:
+    """Predicatul unui spec, cu listele normalizate o singură dată."""
+
+    def __init__(self, spec: dict):
+        self.spec = spec
+        self.statuses = _lower_set(spec.get("statuses") or ["active"])
+        self.brands = {_canon_brand(b) for b in spec.get("brands") or []}
+        self.year_min = _to_int(spec.get("year_min"))
+        self.year_max = _to_int(spec.get("year_max"))
+        self.countries = _lower_set(spec.get("countries"))
+        self.regions = _lower_set(spec.get("regions"))
+        self.max_images = int(spec.get("max_images") or MAX_ADVERT_IMAGES)
+
+    def __call__(self, rec: dict, fields: tuple) -> bool:
+        if (rec.get("status") or "").lower() not in self.statuses:
+            return False
+        year, brand, _ = fields
+        if self.brands and _canon_brand(brand) not in self.brands:
+            return False
+        if self.year_min is not None or self.year_max is not None:
+            y = _to_int(year)
+            if y is None:
+                return False
+            if self.year_min is not None and y < self.year_min:
+                return False
+            if self.year_max is not None and y > self.year_max:
+                return False
+        if self.countries or self.regions:
+            loc = rec.get("location") if isinstance(rec.get("location"), dict) else {}
+            # aceeași valoare implicită ca în <country> din advert
+            country = (str(loc.get("country") or "").strip() or "United States").lower()
+            if self.countries and country not in self.countries:
+                return False
+            if self.regions and str(loc.get("region") or "").strip().lower() not in self.regions:
+                return False
+        return True
+
+
+@metrics.timed("render")
+def render_fanout(inv, specs: list, out_dir: str = ".", now: str = None,
+                  deterministic: bool = FEED_DETERMINISTIC) -> dict:
+    """
+    Trece o singură dată prin inventory și scrie fiecare advert în toate feed-urile
+    al căror spec se potrivește. Fiecare advert e construit o dată per cap de imagini.
+    Fișierele se scriu în .tmp și se redenumesc la final. Read-only pe inventory.
+    Cu `deterministic`, un inventory neschimbat dă aceiași bytes (vezi feed_timestamps).
+    Întoarce {nume feed: număr de adverts}.
+    """
+    _require_dealer()
+    matchers = [_Matcher(s) for s in specs]
+    if not matchers:
+        return {}
+
+    # doar "active" -> mergem pe indexul de status; altfel avem nevoie de tot
+    only_active = all(m.statuses == {"active"} for m in matchers)
+    status = "active" if only_active else None
+    created, updated = feed_timestamps(inv, status, deterministic)
+    if now:
+        created = updated = now
+    records = feed_records(inv, status, deterministic)
+
+    files, writers, paths = [], [], []
+    try:
+        for m in matchers:
+            path = os.path.join(out_dir, m.spec["name"])
+            f = open(path + ".tmp", "wb")
+            files.append(f)
+            paths.append(path)
+            w = JamesFeedWriter(f)
+            w.start(created, updated)
+            writers.append(w)
+
+        for rec in records:
+            fields = advert_fields(rec)
+            by_cap = {}
+            for m, w in zip(matchers, writers):
+                if not m(rec, fields):
+                    continue
+                if m.max_images not in by_cap:
+                    by_cap[m.max_images] = advert_bytes(rec, m.max_images)
+                data = by_cap[m.max_images]
+                if data is not None:
+                    w.add_bytes(data)
+
+        for w in writers:
+            w.close()
+    finally:
+        for f in files:
+            f.close()
+
+    for path in paths:
+        os.replace(path + ".tmp", path)
+    return {m.spec["name"]: w.count for m, w in zip(matchers, writers)}
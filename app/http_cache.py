@@ -0,0 +1,248 @@
+# app/http_cache.py
+import hashlib
+import json
+import os
+import threading
+import time
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+from .config import HTTP_CACHE_DIR, HTTP_CACHE_TTL, HTTP_CACHE_MAX_MB
+
+
+def normalize_url(url: str) -> str:
+    """Cheia de cache: schemă/host lowercase, fără fragment, query sortat, fără '/' final."""
+    p = urlsplit((url or "").strip())
+    query = urlencode(sorted(parse_qsl(p.query, keep_blank_values=True)))
+    path = p.path.rstrip("/") or "/"
+    return urlunsplit((p.scheme.lower(), p.netloc.lower(), path, query, ""))
+
+
+def _atomic_write(path: str, data: bytes) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+class ResponseCache:
+    """
+    Cache pe disc pentru răspunsuri HTTP:
+      - entries/<sha256(url normalizat)>.json: ETag, Last-Modified, momentul descărcării,
+        hash-ul body-ului și (opțional) recordul deja parsat; ultimul acces e mtime-ul
+        fișierului (os.utime la fiecare hit, fără să rescriem JSON-ul)
+      - objects/<sha256(body)>: body-ul, adresat după conținut
+    Intrările mai vechi de `ttl` secunde sunt ignorate; peste `max_bytes` ștergem
+    intrările cel mai puțin recent folosite (LRU).
+    """
+
+    def __init__(self, root: str = HTTP_CACHE_DIR, ttl: float = HTTP_CACHE_TTL,
+                 max_bytes: int = int(HTTP_CACHE_MAX_MB * 1024 * 1024)):
+        self.root = root
+        self.ttl = float(ttl or 0)
+        self.max_bytes = int(max_bytes or 0)
+        self._lock = threading.Lock()
+        self._total = None  # calculat leneș la primul put()
+
+    def _entry_path(self, url: str) -> str:
+        key = hashlib.sha256(normalize_url(url).encode("utf-8")).hexdigest()
+        return os.path.join(self.root, "entries", f"{key}.json")
+
+    def _object_path(self, digest: str) -> str:
+        return os.path.join(self.root, "objects", digest[:2], digest)
+
+    def _read_entry(self, path: str):
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _write_entry(self, path: str, meta: dict) -> None:
+        _atomic_write(path, json.dumps(meta, ensure_ascii=False).encode("utf-8"))
+
+    @staticmethod
+    def _mark_accessed(path: str) -> None:
+        # doar metadata fișierului (mtime = acum), nu o rescriere + rename pe drumul de citire
+        try:
+            os.utime(path, None)
+        except OSError:
+            pass
+
+    @staticmethod
+    def _last_access(path: str, meta: dict) -> float:
+        """Momentul ultimului acces, pentru LRU: mtime-ul entry-ului (sau accessed_at din JSON)."""
+        try:
+            mtime = os.path.getmtime(path)
+        except OSError:
+            mtime = 0
+        return max(mtime, meta.get("accessed_at", 0))
+
+    def get(self, url: str):
+        """Intrarea validă pentru url (meta + "body" în bytes) sau None."""
+        path = self._entry_path(url)
+        meta = self._read_entry(path)
+        if not meta:
+            return None
+        if self.ttl and time.time() - meta.get("fetched_at", 0) > self.ttl:
+            return None
+        try:
+            with open(self._object_path(meta["sha256"]), "rb") as f:
+                body = f.read()
+        except (OSError, KeyError):
+            return None
+        self._mark_accessed(path)
+        meta["body"] = body
+        return meta
+
+    def conditional_headers(self, entry) -> dict:
+        h = {}
+        if entry and entry.get("etag"):
+            h["If-None-Match"] = entry["etag"]
+        if entry and entry.get("last_modified"):
+            h["If-Modified-Since"] = entry["last_modified"]
+        return h
+
+    def put(self, url: str, body: bytes, headers=None, encoding: str = None) -> dict:
+        headers = headers or {}
+        digest = hashlib.sha256(body).hexdigest()
+        obj = self._object_path(digest)
+        new_bytes = 0
+        if not os.path.exists(obj):
+            _atomic_write(obj, body)
+            new_bytes = len(body)
+        now = time.time()
+        meta = {
+            "url": normalize_url(url),
+            "etag": headers.get("ETag") or "",
+            "last_modified": headers.get("Last-Modified") or "",
+            "encoding": encoding or "",
+            "sha256": digest,
+            "size": len(body),
+            "fetched_at": now,
+            "accessed_at": now,
+            "parsed": {},
+        }
+        self._write_entry(self._entry_path(url), meta)
+        self._grow(new_bytes)
+        meta["body"] = body
+        return meta
+
+    def touch(self, url: str, headers=None) -> None:
+        """După un 304: entry-ul e din nou proaspăt (și poate primi un ETag nou)."""
+        path = self._entry_path(url)
+        meta = self._read_entry(path)
+        if not meta:
+            return
+        headers = headers or {}
+        meta["fetched_at"] = meta["accessed_at"] = time.time()
+        if headers.get("ETag"):
+            meta["etag"] = headers["ETag"]
+        if headers.get("Last-Modified"):
+            meta["last_modified"] = headers["Last-Modified"]
+        self._write_entry(path, meta)
+
+    def get_parsed(self, url: str, kind: str, entry=None):
+        meta = entry if entry is not None else self._read_entry(self._entry_path(url))
+        return ((meta or {}).get("parsed") or {}).get(kind)
+
+    def set_parsed(self, url: str, kind: str, record: dict) -> None:
+        """Păstrăm recordul parsat lângă body, ca un 304 să nu mai ceară re-parsare."""
+        path = self._entry_path(url)
+        meta = self._read_entry(path)
+        if not meta:
+            return
+        meta.setdefault("parsed", {})[kind] = record
+        self._write_entry(path, meta)
+
+    def _scan(self):
+        entries_dir = os.path.join(self.root, "entries")
+        out = []
+        if os.path.isdir(entries_dir):
+            for fn in os.listdir(entries_dir):
+                if fn.endswith(".json"):
+                    path = os.path.join(entries_dir, fn)
+                    meta = self._read_entry(path)
+                    if meta:
+                        out.append((path, meta))
+        return out
+
+    def _objects_size(self) -> int:
+        total = 0
+        for dirpath, _, files in os.walk(os.path.join(self.root, "objects")):
+            for fn in files:
+                try:
+                    total += os.path.getsize(os.path.join(dirpath, fn))
+                except OSError:
+                    pass
+        return total
+
+    def _grow(self, n: int) -> None:
+        with self._lock:
+            if self._total is None:
+                self._total = self._objects_size()
+            else:
+                self._total += n
+            over = self.max_bytes and self._total > self.max_bytes
+        if over:
+            self.evict()
+
+    def evict(self) -> None:
+        """Șterge intrările expirate, apoi LRU până sub 90% din limită, apoi obiectele orfane."""
+        with self._lock:
+            now = time.time()
+            entries = self._scan()
+            keep = []
+            for path, meta in entries:
+                if self.ttl and now - meta.get("fetched_at", 0) > self.ttl:
+                    self._remove(path)
+                else:
+                    keep.append((path, meta))
+
+            refs = {}
+            sizes = {}
+            for _, meta in keep:
+                digest = meta.get("sha256")
+                refs[digest] = refs.get(digest, 0) + 1
+                sizes[digest] = meta.get("size", 0)
+            total = sum(sizes.values())
+            target = int(self.max_bytes * 0.9) if self.max_bytes else None
+            if target is not None and total > target:
+                keep.sort(key=lambda pm: self._last_access(*pm))
+                for path, meta in keep:
+                    if total <= target:
+                        break
+                    self._remove(path)
+                    digest = meta.get("sha256")
+                    refs[digest] -= 1
+                    if not refs[digest]:
+                        del refs[digest]
+                        total -= sizes.pop(digest, 0)
+
+            for dirpath, _, files in os.walk(os.path.join(self.root, "objects")):
+                for fn in files:
+                    # .tmp = scriere în curs din alt thread
+                    if fn not in refs and not fn.endswith(".tmp"):
+                        self._remove(os.path.join(dirpath, fn))
+            self._total = self._objects_size()
+
+    @staticmethod
+    def _remove(path: str) -> None:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_cache():
+    """Cache-ul comun al procesului; None dacă HTTP_CACHE_DIR e gol (cache dezactivat)."""
+    global _cache
+    if _cache is None and HTTP_CACHE_DIR:
+        with _cache_lock:
+            if _cache is None:
+                _cache = ResponseCache()
+    return _cache
@@ -0,0 +1,197 @@
+# app/http_client.py
+import random
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from .config import (
+    USER_AGENT,
+    PAUSE_BETWEEN_REQUESTS,
+    HTTP_POOL_SIZE,
+    HTTP_RETRIES,
+    HTTP_BACKOFF_BASE,
+    HTTP_BACKOFF_MAX,
+    HTTP_CACHE_FRESH,
+)
+from . import metrics
+from .http_cache import get_cache
+from .throttle import HostRateLimiter, min_interval_limiter
+
+# status-uri tranzitorii pe care merită să le reîncercăm
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+_stats_lock = threading.Lock()
+_stats = {
+    "requests": 0, "retries": 0, "failures": 0, "retry_status": {},
+    "cache_fresh": 0, "cache_not_modified": 0, "cache_misses": 0,
+}
+
+_session = None
+_session_lock = threading.Lock()
+
+# scheduler central: pauza minimă per host se aplică DOAR pe I/O real de rețea
+_scheduler = min_interval_limiter(PAUSE_BETWEEN_REQUESTS)
+
+
+def _count(key: str, status=None):
+    with _stats_lock:
+        _stats[key] += 1
+        if status is not None:
+            k = str(status)
+            _stats["retry_status"][k] = _stats["retry_status"].get(k, 0) + 1
+
+
+def stats() -> dict:
+    """Copie a contoarelor: request-uri, retry-uri, eșecuri, retry-uri pe status, cache."""
+    with _stats_lock:
+        out = dict(_stats)
+        out["retry_status"] = dict(_stats["retry_status"])
+        return out
+
+
+def new_session(headers: dict = None, pool_size: int = HTTP_POOL_SIZE) -> requests.Session:
+    """
+    Session cu keep-alive și pool de conexiuni (evită TCP+TLS nou la fiecare request).
+    Retry-urile le facem noi în `request()`, ca să putem număra și respecta Retry-After.
+    """
+    s = requests.Session()
+    s.headers.update({"User-Agent": USER_AGENT})
+    if headers:
+        s.headers.update(headers)
+    size = max(1, int(pool_size or 1))
+    adapter = HTTPAdapter(pool_connections=size, pool_maxsize=size, max_retries=0)
+    s.mount("https://", adapter)
+    s.mount("http://", adapter)
+    return s
+
+
+def get_session() -> requests.Session:
+    """Session-ul comun al procesului (creat o singură dată)."""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                _session = new_session()
+    return _session
+
+
+def get_scheduler() -> HostRateLimiter:
+    return _scheduler
+
+
+def set_scheduler(limiter: HostRateLimiter) -> None:
+    """Înlocuiește scheduler-ul implicit (ex. alt buget pentru un run)."""
+    global _scheduler
+    _scheduler = limiter
+
+
+def _retry_after(resp) -> float:
+    """Secunde din header-ul Retry-After (număr sau dată HTTP); None dacă lipsește."""
+    v = (resp.headers.get("Retry-After") or "").strip() if resp is not None else ""
+    if not v:
+        return None
+    try:
+        return max(0.0, float(v))
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(v)
+        if when.tzinfo is None:
+            when = when.replace(tzinfo=timezone.utc)
+        return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+    except (TypeError, ValueError):
+        return None
+
+
+def backoff(attempt: int) -> float:
+    """Secunde de așteptat înainte de încercarea `attempt` + 1: exponential backoff cu "full jitter"."""
+    return random.uniform(0, min(HTTP_BACKOFF_MAX, HTTP_BACKOFF_BASE * (2 ** attempt)))
+
+
+def request(url: str, session: requests.Session = None, method: str = "GET",
+            timeout: float = 30, retries: int = HTTP_RETRIES,
+            limiter: HostRateLimiter = None, **kwargs) -> requests.Response:
+    """
+    Request cu retry pe erori de rețea și pe 429/5xx.
+    Fiecare încercare trece prin scheduler-ul per host (`limiter` sau cel implicit).
+    Întoarce ultimul răspuns (apelantul decide ce face cu status-ul).
+    """
+    s = session or get_session()
+    lim = limiter or _scheduler
+    attempt = 0
+    while True:
+        with metrics.stage("http_wait"):
+            lim.acquire(url)
+        _count("requests")
+        t0 = time.perf_counter()
+        try:
+            with metrics.stage("http"):
+                resp = s.request(method, url, timeout=timeout, **kwargs)
+        except (requests.ConnectionError, requests.Timeout):
+            metrics.observe_http(url, None, 0, time.perf_counter() - t0)
+            if attempt >= retries:
+                _count("failures")
+                raise
+            _count("retries", "network")
+            time.sleep(backoff(attempt))
+            attempt += 1
+            continue
+
+        metrics.observe_http(url, resp.status_code, len(resp.content), time.perf_counter() - t0)
+        if resp.status_code not in RETRY_STATUSES or attempt >= retries:
+            if resp.status_code >= 400:
+                _count("failures")
+            return resp
+
+        _count("retries", resp.status_code)
+        wait = _retry_after(resp)
+        # Retry-After are prioritate, dar nu stăm la nesfârșit
+        wait = min(HTTP_BACKOFF_MAX, wait) if wait is not None else backoff(attempt)
+        resp.close()
+        time.sleep(wait)
+        attempt += 1
+
+
+def get_text(url: str, session: requests.Session = None, timeout: float = 30,
+             limiter: HostRateLimiter = None) -> str:
+    r = request(url, session=session, timeout=timeout, limiter=limiter)
+    r.raise_for_status()
+    return r.text
+
+
+def _cached_text(entry: dict) -> str:
+    return entry["body"].decode(entry.get("encoding") or "utf-8", errors="replace")
+
+
+def fetch_cached(url: str, session: requests.Session = None, timeout: float = 30,
+                 limiter: HostRateLimiter = None, cache=None):
+    """
+    GET prin cache-ul de pe disc (app.http_cache), cu revalidare condiționată
+    (If-None-Match / If-Modified-Since).
+    Întoarce (text, entry, not_modified); not_modified=True când body-ul vine din
+    cache (încă proaspăt sau confirmat de un 304), deci nu trebuie re-parsat.
+    """
+    cache = cache if cache is not None else get_cache()
+    if cache is None:
+        return get_text(url, session=session, timeout=timeout, limiter=limiter), None, False
+
+    entry = cache.get(url)
+    if entry and HTTP_CACHE_FRESH and time.time() - entry.get("fetched_at", 0) < HTTP_CACHE_FRESH:
+        _count("cache_fresh")
+        return _cached_text(entry), entry, True
+
+    r = request(url, session=session, timeout=timeout, limiter=limiter,
+                headers=cache.conditional_headers(entry))
+    if r.status_code == 304 and entry:
+        _count("cache_not_modified")
+        cache.touch(url, r.headers)
+        return _cached_text(entry), entry, True
+
+    r.raise_for_status()
+    _count("cache_misses")
+    entry = cache.put(url, r.content, r.headers, r.encoding or r.apparent_encoding)
+    return r.text, entry, False
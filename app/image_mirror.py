@@ -0,0 +1,230 @@
+# app/image_mirror.py
+"""
+Mirror local pentru imaginile din feed (IMAGE_MIRROR=disk|s3).
+
+Fiecare imagine (URL-ul publicat, după app.images.normalize_images) se descarcă o singură dată, prin
+session-ul și scheduler-ul per host din app.http_client, cu IMAGE_MIRROR_WORKERS
+descărcări în paralel, și se salvează adresată după conținut:
+
+    images/<sha256[:2]>/<sha256>.<ext>            originalul
+    images/<sha256[:2]>/<sha256>-<N>.jpg          varianta cu latura maximă N (IMAGE_VARIANT_MAX_PX)
+
+în IMAGE_MIRROR_DIR sau în bucket-ul S3 din app.storage (sub S3_PREFIX). Varianta
+se face doar cu Pillow instalat și doar pentru imagini mai mari de N; altfel feed-ul
+folosește originalul. Indexul de imagini (app.images, IMAGE_INDEX_PATH) ține pentru
+fiecare URL sha256-ul și calea din mirror: URL-urile deja mirror-uite nu se mai
+descarcă, iar un conținut deja stocat (același hash) nu se mai scrie / urcă.
+La randare, app.images.feed_images() rescrie URL-urile spre IMAGE_HOST_BASE/<cale>.
+
+Pentru inventory-ul existent (fără scrape):
+
+    python -m app.image_mirror
+"""
+import hashlib
+import io
+import os
+import posixpath
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+import requests
+
+try:
+    from PIL import Image  # opțional: doar pentru varianta redimensionată
+except Exception:
+    Image = None
+
+from .config import (
+    IMAGE_HOST_BASE, IMAGE_MIRROR, IMAGE_MIRROR_DIR, IMAGE_MIRROR_WORKERS,
+    IMAGE_VARIANT_MAX_PX, IMAGE_VARIANT_QUALITY,
+)
+from . import http_client, images, metrics, storage
+
+MIRROR_PREFIX = "images"
+_EXTENSIONS = {".jpg", ".jpeg", ".png", ".webp", ".gif"}
+_CONTENT_TYPES = {".jpg": "image/jpeg", ".jpeg": "image/jpeg", ".png": "image/png",
+                  ".webp": "image/webp", ".gif": "image/gif"}
+_BY_TYPE = {"image/jpeg": ".jpg", "image/png": ".png", "image/webp": ".webp", "image/gif": ".gif"}
+
+
+def mirror_path(digest: str, ext: str, variant: int = None) -> str:
+    """Calea relativă (față de IMAGE_HOST_BASE / IMAGE_MIRROR_DIR / S3_PREFIX) a unui conținut."""
+    name = f"{digest}-{variant}{ext}" if variant else f"{digest}{ext}"
+    return posixpath.join(MIRROR_PREFIX, digest[:2], name)
+
+
+def _extension(url: str, content_type: str) -> str:
+    ext = posixpath.splitext(urlsplit(url).path)[1].lower()
+    if ext in _EXTENSIONS:
+        return ".jpg" if ext == ".jpeg" else ext
+    return _BY_TYPE.get((content_type or "").split(";", 1)[0].strip().lower(), ".jpg")
+
+
+# --- stocare ----------------------------------------------------------------
+# put() întoarce True dacă a scris, False dacă obiectul exista deja (adresat după
+# conținut: același nume înseamnă aceiași bytes)
+
+class DiskStore:
+    verify_index = True  # verificarea pe disc e ieftină: un fișier șters se descarcă din nou
+
+    def __init__(self, root: str = IMAGE_MIRROR_DIR):
+        self.root = root
+
+    def _full(self, path: str) -> str:
+        return os.path.join(self.root, *path.split("/"))
+
+    def exists(self, path: str) -> bool:
+        return os.path.exists(self._full(path))
+
+    def put(self, path: str, data: bytes, content_type: str) -> bool:
+        full = self._full(path)
+        if os.path.exists(full):
+            return False
+        os.makedirs(os.path.dirname(full), exist_ok=True)
+        tmp = f"{full}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, full)
+        return True
+
+
+class S3Store:
+    """Bucket-ul din app.storage (sub S3_PREFIX)."""
+    verify_index = False  # ne bazăm pe index, fără un HEAD în S3 pentru fiecare imagine la fiecare rulare
+
+    def exists(self, path: str) -> bool:
+        return storage.s3_object_exists(storage._s3_key(path, path))
+
+    def put(self, path: str, data: bytes, content_type: str) -> bool:
+        # conținutul unei chei nu se schimbă niciodată: cache pe termen lung
+        return storage.put_blob(path, data, content_type, cache_control="public, max-age=31536000, immutable")
+
+
+def get_store(kind: str = IMAGE_MIRROR):
+    if kind == "disk":
+        return DiskStore()
+    if kind == "s3":
+        return S3Store()
+    raise ValueError(f"IMAGE_MIRROR must be 'disk' or 's3', got {kind!r}")
+
+
+# --- variantă redimensionată ------------------------------------------------
+
+def resized_variant(data: bytes, max_px: int = IMAGE_VARIANT_MAX_PX, quality: int = IMAGE_VARIANT_QUALITY):
+    """JPEG cu latura maximă `max_px`; None fără Pillow, pentru imagini deja mici sau necitibile."""
+    if Image is None or not max_px:
+        return None
+    try:
+        with Image.open(io.BytesIO(data)) as im:
+            if max(im.size) <= max_px:
+                return None
+            im.thumbnail((max_px, max_px))
+            if im.mode not in ("RGB", "L"):
+                im = im.convert("RGB")
+            out = io.BytesIO()
+            im.save(out, "JPEG", quality=quality, optimize=True, progressive=True)
+            return out.getvalue()
+    except Exception as e:
+        print("Image variant skipped:", repr(e))
+        return None
+
+
+# --- mirror -----------------------------------------------------------------
+
+def mirror_image(url: str, store=None, index: images.ImageIndex = None):
+    """
+    Mirror pentru o imagine (URL-ul din feed); întoarce intrarea din index sau None la eroare.
+    Nu descarcă dacă URL-ul e deja în mirror; nu scrie dacă același conținut e deja stocat.
+    """
+    store = store or get_store()
+    index = index or images.get_index()
+    e = index.entry(url)
+    if e and e.get("mirror") and (not store.verify_index or store.exists(e["mirror"])):
+        metrics.incr("image_mirror_skipped")
+        return e
+
+    try:
+        with metrics.stage("image_download"):
+            r = http_client.request(url, timeout=60)
+    except requests.RequestException as err:
+        print("Image mirror failed:", url, repr(err))
+        metrics.incr("image_mirror_errors")
+        return None
+    if r.status_code >= 400:
+        print("Image mirror failed:", url, f"HTTP {r.status_code}")
+        metrics.incr("image_mirror_errors")
+        return None
+
+    data = r.content
+    digest = hashlib.sha256(data).hexdigest()
+    ext = _extension(url, r.headers.get("Content-Type"))
+    path = mirror_path(digest, ext)
+    fields = {"sha256": digest, "mirror": path, "variant": None, "mirrored": time.time()}
+
+    with metrics.stage("image_store"):
+        if store.put(path, data, _CONTENT_TYPES.get(ext, "application/octet-stream")):
+            metrics.incr("image_mirror_stored")
+            metrics.incr("image_mirror_bytes", len(data))
+        else:
+            metrics.incr("image_mirror_dedup")  # același conținut e deja stocat (ex. alt URL)
+        variant_path = mirror_path(digest, ".jpg", IMAGE_VARIANT_MAX_PX)
+        if store.exists(variant_path):
+            fields["variant"] = variant_path
+        else:
+            small = resized_variant(data)
+            if small is not None:
+                store.put(variant_path, small, "image/jpeg")
+                fields["variant"] = variant_path
+    return index.put(url, **fields)
+
+
+def mirror_urls(urls, workers: int = IMAGE_MIRROR_WORKERS, store=None) -> dict:
+    """{url: intrare din index | None}, descărcările rulând în paralel (fiecare URL o dată)."""
+    urls = list(dict.fromkeys(u for u in urls if u))
+    if not urls:
+        return {}
+    store = store or get_store()
+    index = images.get_index()
+    with ThreadPoolExecutor(max_workers=max(1, min(int(workers or 1), len(urls)))) as pool:
+        return dict(zip(urls, pool.map(lambda u: mirror_image(u, store, index), urls)))
+
+
+@metrics.timed("image_mirror")
+def mirror_item(item: dict, store=None) -> dict:
+    """Mirror pentru imaginile unui listing (după app.images.process_item); itemul rămâne neschimbat."""
+    if item and IMAGE_MIRROR:
+        mirror_urls(images.normalize_images(item.get("images")), store=store)
+    return item
+
+
+def mirror_items(items: list) -> list:
+    """Mirror pentru toate imaginile din `items` (o singură trecere, fără dubluri)."""
+    if not IMAGE_MIRROR:
+        return items
+    if not IMAGE_HOST_BASE:
+        print("IMAGE_MIRROR is set but IMAGE_HOST_BASE is empty: the feed keeps the BaT image URLs.")
+    with metrics.stage("image_mirror"):
+        res = mirror_urls(u for it in items for u in images.normalize_images(it.get("images")))
+    images.flush()
+    print(f"Image mirror: {sum(1 for e in res.values() if e)} of {len(res)} images mirrored")
+    return items
+
+
+def main():
+    from .inventory import iter_active, open_inventory
+
+    if not IMAGE_MIRROR:
+        raise SystemExit("Set IMAGE_MIRROR=disk or IMAGE_MIRROR=s3")
+    try:
+        with open_inventory() as inv:
+            items = list(iter_active(inv))
+        mirror_items(items)
+    finally:
+        images.flush()
+        metrics.write_reports()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,278 @@
+# app/images.py
+"""
+Imaginile unui listing: URL canonic, dedup, validare HEAD (opțională) și rescriere spre mirror.
+
+BaT servește aceeași fotografie din wp-content/uploads sub mai multe URL-uri:
+  .../2024/05/IMG_1234-scaled.jpg?fit=940%2C627
+  .../2024/05/IMG_1234-scaled.jpg?w=620&resize=620%2C413
+  .../2024/05/IMG_1234-scaled-940x627.jpg              (dimensiune intermediară WordPress)
+canonical_image_url() le reduce la același URL (https, fără query, fără sufixul -WxH),
+adică la originalul full-size. Îl folosim doar drept cheie de dedup: normalize_images()
+păstrează o singură apariție per cale canonică, dar URL-ul văzut primul (de obicei o
+variantă redimensionată), ca feed-ul să nu trimită originale de mărime necunoscută.
+
+Cu IMAGE_VALIDATE=1, process_item() verifică imaginile cu HEAD în paralel (prin
+scheduler-ul per host din app.http_client) și scoate ce nu e accesibil, nu e imagine
+sau depășește IMAGE_MAX_BYTES. Cu IMAGE_MAX_BYTES setat, o imagine trece pe originalul
+canonic doar dacă HEAD-ul lui a confirmat o mărime în limită. Rezultatele stau în
+IMAGE_INDEX_PATH (JSON), deci o imagine e verificată o dată la IMAGE_CHECK_TTL, nu la
+fiecare rulare.
+"""
+import json
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+import requests
+
+from .config import (
+    IMAGE_HOST_BASE, IMAGE_VALIDATE, IMAGE_VALIDATE_WORKERS, IMAGE_INDEX_PATH, IMAGE_CHECK_TTL,
+    IMAGE_MAX_BYTES, IMAGE_MIRROR,
+)
+from .inventory_journal import atomic_write_json
+from . import http_client, metrics
+
+_UPLOADS = "/wp-content/uploads/"
+_BAT_HOSTS = ("bringatrailer.com", "www.bringatrailer.com")
+# IMG_1234-940x627.jpg -> IMG_1234.jpg (dimensiunile intermediare generate de WordPress)
+_SIZE_SUFFIX_RX = re.compile(r"-\d{2,5}x\d{2,5}(?=\.[A-Za-z0-9]+$)")
+
+
+def canonical_image_url(url: str) -> str:
+    """
+    URL-ul canonic (originalul full-size) al unei imagini BaT din wp-content/uploads;
+    alte URL-uri rămân neschimbate. Cheie de dedup, nu URL de publicat (vezi normalize_images).
+    """
+    u = (url or "").strip()
+    if u.startswith("//"):
+        u = "https:" + u
+    p = urlsplit(u)
+    host = p.netloc.lower()
+    if host not in _BAT_HOSTS or _UPLOADS not in p.path:
+        return u
+    path = _SIZE_SUFFIX_RX.sub("", p.path)
+    return f"https://bringatrailer.com{path}"
+
+
+def image_key(url: str) -> str:
+    """Cheia de dedup: calea canonică (fără host, query, dimensiune)."""
+    c = canonical_image_url(url)
+    p = urlsplit(c)
+    return p.path if p.netloc else c
+
+
+def normalize_images(urls, limit: int = None) -> list:
+    """O singură imagine per cale canonică: URL-ul văzut primul, în ordinea primei apariții."""
+    out, seen = [], set()
+    for u in urls or []:
+        if not u:
+            continue
+        k = image_key(u)
+        if k in seen:
+            continue
+        seen.add(k)
+        out.append(u)
+        if limit is not None and len(out) >= limit:
+            break
+    return out
+
+
+def mirror_url(url: str, base: str = IMAGE_HOST_BASE, mirror: str = IMAGE_MIRROR) -> str:
+    """
+    Imaginea BaT pe IMAGE_HOST_BASE; fără base, URL-ul neschimbat.
+    Cu IMAGE_MIRROR: calea din mirror-ul nostru (varianta redimensionată, dacă există),
+    iar imaginile încă nemirror-uite rămân pe BaT. Fără IMAGE_MIRROR: aceeași cale (și
+    query, deci aceeași dimensiune) ca pe BaT.
+    """
+    if not base:
+        return url
+    if mirror:
+        e = get_index().entry(url)
+        path = e and (e.get("variant") or e.get("mirror"))
+        return f"{base.rstrip('/')}/{path}" if path else url
+    p = urlsplit(url)
+    if p.netloc.lower() not in _BAT_HOSTS or _UPLOADS not in p.path:
+        return url
+    return base.rstrip("/") + p.path + (f"?{p.query}" if p.query else "")
+
+
+def feed_images(urls, limit: int = None) -> list:
+    """Lista de imagini scrisă în feed: fără dubluri, rescrise spre IMAGE_HOST_BASE."""
+    return [mirror_url(u) for u in normalize_images(urls, limit)]
+
+
+# --- index persistent -------------------------------------------------------
+
+class ImageIndex:
+    """
+    {url canonic: {"status", "bytes", "type", "checked"}} în IMAGE_INDEX_PATH
+    (+ "sha256", "mirror", "variant" pentru imaginile din app.image_mirror).
+    Intrările mai vechi de `ttl` secunde sunt re-verificate. Thread-safe; flush()
+    scrie fișierul (atomic) doar dacă s-a schimbat ceva.
+    """
+
+    def __init__(self, path: str = IMAGE_INDEX_PATH, ttl: float = IMAGE_CHECK_TTL):
+        self.path = path
+        self.ttl = float(ttl or 0)
+        self._lock = threading.Lock()
+        self._entries = None
+        self._dirty = False
+
+    def _load(self) -> dict:
+        if self._entries is None:
+            entries = {}
+            if self.path and os.path.exists(self.path):
+                try:
+                    with open(self.path, "r", encoding="utf-8") as f:
+                        entries = json.load(f)
+                except (OSError, ValueError) as e:
+                    # indexul e doar un cache: îl reconstruim
+                    print("Image index unreadable, starting empty:", repr(e))
+            self._entries = entries
+        return self._entries
+
+    def entry(self, url: str):
+        """Intrarea pentru URL, indiferent de vârstă (ex. calea din mirror, app.image_mirror)."""
+        with self._lock:
+            return self._load().get(url)
+
+    def get(self, url: str):
+        """Intrarea pentru URL dacă e încă valabilă (în TTL), altfel None."""
+        with self._lock:
+            e = self._load().get(url)
+        if e is None:
+            return None
+        if self.ttl and time.time() - e.get("checked", 0) > self.ttl:
+            return None
+        return e
+
+    def put(self, url: str, **fields) -> dict:
+        with self._lock:
+            e = self._load().setdefault(url, {})
+            e.update(fields)
+            self._dirty = True
+            return e
+
+    def flush(self) -> None:
+        with self._lock:
+            if not self._dirty or not self.path:
+                return
+            atomic_write_json(self.path, self._entries, indent=None)
+            self._dirty = False
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_index() -> ImageIndex:
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = ImageIndex()
+    return _index
+
+
+def flush() -> None:
+    """Scrie indexul de imagini, dacă a fost folosit în rularea asta."""
+    if _index is not None:
+        _index.flush()
+
+
+# --- validare HEAD ----------------------------------------------------------
+
+def _head(url: str):
+    """HEAD (urmând redirect-urile); None la eroare de rețea, ca să reîncercăm la rularea următoare."""
+    try:
+        r = http_client.request(url, method="HEAD", timeout=20, allow_redirects=True)
+    except requests.RequestException:
+        return None
+    size = r.headers.get("Content-Length")
+    return {
+        "status": r.status_code,
+        "bytes": int(size) if size and size.isdigit() else None,
+        "type": (r.headers.get("Content-Type") or "").split(";", 1)[0].strip().lower(),
+        "checked": time.time(),
+    }
+
+
+def check_image(url: str, index: ImageIndex = None) -> dict:
+    """Rezultatul HEAD pentru URL (din index dacă e proaspăt); None dacă nu l-am putut verifica."""
+    index = index or get_index()
+    e = index.get(url)
+    if e is not None and "status" in e:
+        metrics.incr("image_index_hits")
+        return e
+    res = _head(url)
+    metrics.incr("image_checks")
+    if res is None:
+        return None
+    return index.put(url, **res)
+
+
+def acceptable(entry: dict, max_bytes: int = IMAGE_MAX_BYTES) -> bool:
+    """Imagine accesibilă, cu Content-Type de imagine și (dacă știm) nu mai mare de max_bytes."""
+    if entry is None:
+        return True  # neverificată (eroare de rețea): nu o scoatem din feed
+    if entry.get("status", 0) >= 400:
+        return False
+    ctype = entry.get("type") or ""
+    if ctype and not ctype.startswith("image/"):
+        return False
+    size = entry.get("bytes")
+    return not (max_bytes and size and size > max_bytes)
+
+
+def size_confirmed(entry: dict, max_bytes: int = IMAGE_MAX_BYTES) -> bool:
+    """HEAD-ul a confirmat o imagine accesibilă cu mărimea cunoscută și în limita max_bytes."""
+    return bool(max_bytes and entry and entry.get("bytes") and acceptable(entry, max_bytes))
+
+
+def _validated(url: str, index: ImageIndex, max_bytes: int):
+    """URL-ul de publicat după HEAD: None dacă nu trece, originalul canonic doar cu mărime confirmată."""
+    if not acceptable(check_image(url, index), max_bytes):
+        return None
+    c = canonical_image_url(url)
+    if c != url and max_bytes and size_confirmed(check_image(c, index), max_bytes):
+        metrics.incr("images_upgraded")
+        return c
+    return url
+
+
+def validate_images(urls: list, workers: int = IMAGE_VALIDATE_WORKERS, max_bytes: int = IMAGE_MAX_BYTES) -> list:
+    """
+    Doar URL-urile care trec de acceptable(), în ordinea inițială; HEAD-urile rulează în paralel.
+    Un URL redimensionat e înlocuit cu originalul canonic doar dacă size_confirmed() pentru acesta.
+    """
+    if not urls:
+        return []
+    index = get_index()
+    with ThreadPoolExecutor(max_workers=max(1, min(int(workers or 1), len(urls)))) as pool:
+        results = list(pool.map(lambda u: _validated(u, index, max_bytes), urls))
+    kept = [u for u in results if u]
+    if len(kept) < len(urls):
+        metrics.incr("images_dropped", len(urls) - len(kept))
+    return kept
+
+
+@metrics.timed("images")
+def process_item(item: dict, validate: bool = IMAGE_VALIDATE) -> dict:
+    """Etapa de imagini pentru un listing parsat: normalizare + dedup, apoi validare opțională."""
+    if not item:
+        return item
+    imgs = normalize_images(item.get("images"))
+    if validate:
+        imgs = validate_images(imgs)
+    item["images"] = imgs
+    return item
+
+
+def process_items(items: list, validate: bool = IMAGE_VALIDATE) -> list:
+    for it in items:
+        process_item(it, validate)
+    flush()
+    return items
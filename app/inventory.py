@@ -1,32 +1,196 @@
 # app/inventory.py
-import json
+import hashlib
 import os
 import re
-from datetime import datetime, timezone
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+
+from . import metrics
+from .config import INVENTORY_BACKEND, INVENTORY_EXPORT_JSON
+from .inventory_db import (
+    SqliteInventory, _listing_key, _rec_listing_key, record_time_bounds, ref_sort_key,
+)
+from .inventory_journal import (
+    JournaledInventory,
+    atomic_write_json,
+    load_journaled,
+    sealed_journals,
+)
 
 BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
 INVENTORY_PATH = os.path.join(BASE_DIR, "data", "inventory.json")
+INVENTORY_JOURNAL_PATH = os.path.join(BASE_DIR, "data", "inventory.journal.jsonl")
+INVENTORY_DB_PATH = os.path.join(BASE_DIR, "data", "inventory.sqlite")
 
 
 def _now_iso():
     return datetime.now(timezone.utc).isoformat()
 
 
-def load_inventory() -> dict:
+def _load_json_inventory() -> dict:
+    """
+    Snapshot-ul inventory.json + replay din jurnalul JSONL.
+    Un snapshot corupt ridică eroare (nu mai pornim cu {} și nu pierdem je_reference).
+    """
+    data = load_journaled(INVENTORY_PATH, INVENTORY_JOURNAL_PATH)
+    return JournaledInventory(INVENTORY_PATH, INVENTORY_JOURNAL_PATH, data)
+
+
+def _json_stamp(path: str) -> str:
+    st = os.stat(path)
+    return f"{st.st_size}:{st.st_mtime_ns}"
+
+
+def _json_sha256(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 16), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _remember_json(inv: SqliteInventory) -> None:
+    """Ține minte ce inventory.json corespunde bazei (după import sau export)."""
+    if os.path.exists(INVENTORY_PATH):
+        inv.set_meta("json_stamp", _json_stamp(INVENTORY_PATH))
+        inv.set_meta("json_sha256", _json_sha256(INVENTORY_PATH))
+
+
+def _check_json(inv: SqliteInventory) -> None:
+    """
+    După migrare, inventory.json nu mai e citit. Dacă s-a schimbat față de cel
+    importat/exportat ultima oară (ex. un git pull), ne oprim în loc să-l ignorăm
+    (și să-l suprascriem la următorul export). Verificarea ieftină e mărime + mtime;
+    hash-ul se calculează doar când ele diferă (ex. un checkout care atinge fișierul).
+    """
     if not os.path.exists(INVENTORY_PATH):
-        return {}
-    with open(INVENTORY_PATH, "r", encoding="utf-8") as f:
-        try:
-            data = json.load(f)
-            return data if isinstance(data, dict) else {}
-        except json.JSONDecodeError:
-            return {}
+        return
+    if _json_stamp(INVENTORY_PATH) == inv.get_meta("json_stamp"):
+        return
+    known = inv.get_meta("json_sha256")
+    if known is None or _json_sha256(INVENTORY_PATH) == known:
+        # bază migrată înainte de verificare, sau doar mtime-ul s-a schimbat
+        _remember_json(inv)
+        return
+    inv.close()
+    raise RuntimeError(
+        f"{INVENTORY_PATH} changed since it was imported into / exported from {INVENTORY_DB_PATH}. "
+        "Run `python -m app.inventory import-json` to replace the database with it, "
+        "or `python -m app.inventory export-json` to overwrite it from the database."
+    )
 
 
+@metrics.timed("inventory_load")
+def load_inventory() -> dict:
+    """
+    Backend implicit: SQLite (data/inventory.sqlite), cu interfață de dict.
+    La prima deschidere importăm o singură dată data/inventory.json; după aceea
+    JSON-ul nu mai e o sursă: dacă se schimbă, load_inventory se oprește (vezi _check_json).
+    INVENTORY_BACKEND=json păstrează fișierul JSON ca înainte.
+    """
+    if INVENTORY_BACKEND == "json":
+        return _load_json_inventory()
+    inv = SqliteInventory(INVENTORY_DB_PATH)
+    if inv.get_meta("migrated_from") is None:
+        src = _load_json_inventory()
+        n = inv.migrate_from(src, INVENTORY_PATH)
+        src.close()
+        _remember_json(inv)
+        if n:
+            print(f"Inventory: migrated {n} records from {INVENTORY_PATH} to {INVENTORY_DB_PATH}")
+    else:
+        _check_json(inv)
+    return inv
+
+
+@metrics.timed("inventory_save")
 def save_inventory(inv: dict) -> None:
-    os.makedirs(os.path.dirname(INVENTORY_PATH), exist_ok=True)
-    with open(INVENTORY_PATH, "w", encoding="utf-8") as f:
-        json.dump(inv, f, indent=2, ensure_ascii=False)
+    if isinstance(inv, SqliteInventory):
+        inv.commit()  # doar recordurile modificate, într-o tranzacție
+        return
+    if INVENTORY_BACKEND != "json":
+        # dict simplu pe SQLite: doar upsert pentru recordurile date; ce lipsește din
+        # dict rămâne în DB (un dict parțial nu trebuie să șteargă restul inventory-ului)
+        db = load_inventory()
+        try:
+            for k, rec in inv.items():
+                db[k] = rec
+            db.commit()
+        finally:
+            db.close()
+        return
+    if isinstance(inv, JournaledInventory):
+        # modificările sunt deja în jurnal (câte o linie per car); doar fsync
+        inv.sync()
+        inv.maybe_compact()
+        return
+    # dict simplu: snapshot complet, atomic (tmp + fsync + rename), apoi jurnalele devin inutile
+    atomic_write_json(INVENTORY_PATH, dict(inv))
+    for p in sealed_journals(INVENTORY_JOURNAL_PATH) + [INVENTORY_JOURNAL_PATH]:
+        if os.path.exists(p):
+            os.remove(p)
+
+
+def close_inventory(inv: dict) -> None:
+    """Închide conexiunea SQLite / fișierul de jurnal; modificările nesalvate se pierd."""
+    if isinstance(inv, (SqliteInventory, JournaledInventory)):
+        inv.close()
+
+
+@contextmanager
+def open_inventory():
+    """Un singur inventory pentru toată rularea, închis la final (și după o eroare)."""
+    inv = load_inventory()
+    try:
+        yield inv
+    finally:
+        close_inventory(inv)
+
+
+def export_inventory_json(inv: dict, force: bool = False) -> None:
+    """
+    Cu SQLite: snapshot-ul data/inventory.json. Citește și rescrie tot inventory-ul,
+    deci la finalul rulărilor doar cu INVENTORY_EXPORT_JSON=1; altfel la cerere
+    (`force`, python -m app.inventory export-json).
+    Recordurile în ordinea inserării, ca diff-urile între exporturi să fie mici.
+    """
+    if not isinstance(inv, SqliteInventory) or not (force or INVENTORY_EXPORT_JSON):
+        return
+    atomic_write_json(INVENTORY_PATH, dict(inv.items()))
+    _remember_json(inv)
+    print(f"Inventory: exported {len(inv)} records to {INVENTORY_PATH}")
+
+
+def iter_active(inv: dict):
+    """Recordurile active; pe SQLite prin indexul pe status."""
+    if isinstance(inv, SqliteInventory):
+        return inv.iter_status("active")
+    return (x for x in inv.values() if x.get("status") == "active")
+
+
+def iter_by_reference(inv: dict, status: str = "active"):
+    """
+    Recordurile (cu `status`, sau toate pentru None) în ordine stabilă după
+    referința din feed, ca același inventory să dea mereu același feed.
+    """
+    if isinstance(inv, SqliteInventory):
+        return inv.iter_by_reference(status)
+    return (r for _, r in iter_items_by_reference(inv, status))
+
+
+def iter_items_by_reference(inv: dict, status: str = "active"):
+    """Ca iter_by_reference, dar perechi (cheie din inventory, record)."""
+    if isinstance(inv, SqliteInventory):
+        return inv.iter_items_by_reference(status)
+    recs = ((k, r) for k, r in inv.items() if status is None or r.get("status") == status)
+    return iter(sorted(recs, key=lambda kv: ref_sort_key(*kv)))
+
+
+def time_bounds(inv: dict, status: str = "active") -> tuple:
+    """(cel mai vechi first_seen, cel mai nou last_seen) al recordurilor cu `status` (None = toate)."""
+    if isinstance(inv, SqliteInventory):
+        return inv.time_bounds(status)
+    return record_time_bounds(r for r in inv.values() if status is None or r.get("status") == status)
 
 
 def _slugify(s: str, max_len: int = 80) -> str:
@@ -94,36 +258,209 @@ def ensure_je_reference(rec: dict) -> dict:
     return rec
 
 
+class _SqliteListingIndex:
+    """
+    listing_index pe SQLite: lookup-uri prin indexul pe listing_key, la cerere,
+    plus cheile adăugate în rularea asta (încă necomise). Nu citește tot tabelul.
+    """
+
+    def __init__(self, inv: SqliteInventory):
+        self.inv = inv
+        self._new = {}
+
+    def get(self, key: str, default=None):
+        if key in self._new:
+            return self._new[key]
+        return self.inv.find_listing(key) or default
+
+    def __setitem__(self, key: str, ext_id: str):
+        self._new[key] = ext_id
+
+
+def listing_index(inv: dict):
+    """slug BaT -> external_id pentru tot inventory-ul (vezi upsert_car); pe SQLite, prin index."""
+    if isinstance(inv, SqliteInventory):
+        return _SqliteListingIndex(inv)
+    return {_rec_listing_key(r): k for k, r in inv.items()}
+
+
+def upsert_car(inv: dict, car: dict, now: str = None, index: dict = None) -> tuple:
+    """
+    Upsert pentru un singur car; întoarce (external_id, record).
+    `index` (listing_index) e folosit și ținut la zi, ca să nu-l reconstruim per car.
+    """
+    now = now or _now_iso()
+    ext_id = _external_id_for_car(car)
+
+    rec = inv.get(ext_id)
+    if not rec:
+        # același lot poate exista sub o cheie veche (BAT-https://...): îl refolosim,
+        # altfel ar apărea de două ori în feed
+        if index is None:
+            index = listing_index(inv)
+        old_id = index.get(_listing_key(car.get("url", "")))
+        if old_id:
+            ext_id = old_id
+            rec = inv[old_id]
+    if not rec:
+        # first time seen
+        rec = {
+            "external_id": ext_id,
+            "first_seen": now,
+            "status": "active",
+        }
+
+    # update common fields
+    rec["last_seen"] = now
+    rec["status"] = "active"
+    rec["title"] = car.get("title")
+    rec["url"] = car.get("url")
+    rec["price"] = car.get("price")
+    rec["images"] = car.get("images", []) or []
+    rec["location"] = car.get("location") or {}
+    rec["description"] = car.get("description") or ""
+    rec["raw"] = car
+
+    # IMPORTANT: setăm je_reference doar dacă nu există deja (nu schimbăm niciodată)
+    rec = ensure_je_reference(rec)
+
+    # pe backend-ul JSON asta adaugă și linia în jurnal; pe SQLite marchează recordul de scris
+    inv[ext_id] = rec
+    if index is not None:
+        index[_rec_listing_key(rec)] = ext_id
+    return ext_id, rec
+
+
 def upsert_bat_cars(inv: dict, cars: list) -> dict:
     now = _now_iso()
-
+    index = listing_index(inv) if cars else None
     for car in cars or []:
-        ext_id = _external_id_for_car(car)
-
-        rec = inv.get(ext_id)
-        if not rec:
-            # first time seen
-            rec = {
-                "external_id": ext_id,
-                "first_seen": now,
-                "status": "active",
-            }
-
-        # update common fields
-        rec["last_seen"] = now
-        rec["status"] = "active"
-        rec["title"] = car.get("title")
-        rec["url"] = car.get("url")
-        rec["price"] = car.get("price")
-        rec["images"] = car.get("images", []) or []
-        rec["location"] = car.get("location") or {}
-        rec["description"] = car.get("description") or ""
-        rec["raw"] = car
-
-        # IMPORTANT: setăm je_reference doar dacă nu există deja (nu schimbăm niciodată)
-        rec = ensure_je_reference(rec)
-
-        inv[ext_id] = rec
+        upsert_car(inv, car, now, index)
 
     # NU ștergem nimic automat
     return inv
+
+
+def _parse_iso(s: str):
+    try:
+        dt = datetime.fromisoformat(s)
+    except (TypeError, ValueError):
+        return None
+    return dt if dt.tzinfo else dt.replace(tzinfo=timezone.utc)
+
+
+def plan_incremental(inv: dict, urls: list, stale_after_hours: float) -> list:
+    """
+    Din URL-urile găsite în index le păstrează doar pe cele care trebuie (re)descărcate:
+      - noi (nu există în inventory după slug)
+      - care nu mai sunt "active" (au revenit în index)
+      - cu last_seen mai vechi de `stale_after_hours` (0 = niciodată stale)
+    Ordinea din `urls` se păstrează.
+    """
+    wanted = incremental_planner(inv, stale_after_hours)
+    return [u for u in urls or [] if wanted(u)]
+
+
+def incremental_planner(inv: dict, stale_after_hours: float):
+    """
+    Predicatul din plan_incremental, pentru un URL odată: url -> trebuie descărcat?
+    Poate fi folosit din alt thread cât timp inventory-ul e modificat: pe SQLite
+    citește starea salvată (status, last_seen) prin indexul pe slug, per URL;
+    pe JSON starea e copiată acum.
+    """
+    if isinstance(inv, SqliteInventory):
+        def state(key):
+            row = inv.listing_state(key)
+            return (row[0], _parse_iso(row[1])) if row else None
+    else:
+        snapshot = {}
+        for rec in inv.values():
+            k = _rec_listing_key(rec)
+            if k:
+                snapshot[k] = (rec.get("status"), _parse_iso(rec.get("last_seen")))
+        state = snapshot.get
+
+    cutoff = None
+    if stale_after_hours and stale_after_hours > 0:
+        cutoff = datetime.now(timezone.utc) - timedelta(hours=stale_after_hours)
+
+    def wanted(url: str) -> bool:
+        st = state(_listing_key(url))
+        if st is None or st[0] != "active":
+            return True
+        return cutoff is not None and (st[1] is None or st[1] < cutoff)
+
+    return wanted
+
+
+def _unique_items(*iterables):
+    seen = set()
+    for it in iterables:
+        for k, rec in it:
+            if k not in seen:
+                seen.add(k)
+                yield k, rec
+
+
+def reconcile_listed(inv: dict, urls: list, inactive_status: str = "inactive") -> dict:
+    """
+    Marchează ce a fost văzut în index (last_listed) și scoate din "active" anunțurile
+    care nu mai apar. Dacă indexul e gol (discovery eșuat) nu atingem nimic.
+    Nu ștergem recordurile: je_reference rămâne rezervat dacă lotul revine.
+    """
+    keys = {_listing_key(u) for u in urls or []}
+    keys.discard("")
+    if not keys:
+        return inv
+
+    if isinstance(inv, SqliteInventory):
+        # doar ce poate schimba: recordurile din index și cele active (indexurile pe
+        # listing_key și status), nu tot tabelul
+        candidates = _unique_items(inv.items_for_listing_keys(keys), inv.iter_status_items("active"))
+    else:
+        candidates = inv.items()
+
+    now = _now_iso()
+    changed = []
+    for ext_id, rec in candidates:
+        if _rec_listing_key(rec) in keys:
+            rec["last_listed"] = now
+        elif rec.get("status") == "active":
+            rec["status"] = inactive_status
+            rec["delisted_at"] = now
+        else:
+            continue
+        changed.append((ext_id, rec))
+    # scriem explicit înapoi (store-ul SQLite salvează doar ce primește prin inv[key] = rec)
+    for ext_id, rec in changed:
+        inv[ext_id] = rec
+    return inv
+
+
+def main(argv=None):
+    import argparse
+
+    ap = argparse.ArgumentParser(description="Inventory maintenance (SQLite backend)")
+    ap.add_argument("command", choices=["export-json", "import-json"],
+                    help="export-json: scrie data/inventory.json din data/inventory.sqlite; "
+                         "import-json: înlocuiește data/inventory.sqlite cu data/inventory.json")
+    args = ap.parse_args(argv)
+    if INVENTORY_BACKEND == "json":
+        raise SystemExit("INVENTORY_BACKEND=json: data/inventory.json is already the store")
+    # direct pe SQLite, fără _check_json: comenzile astea rezolvă tocmai divergența
+    inv = SqliteInventory(INVENTORY_DB_PATH)
+    try:
+        if args.command == "export-json":
+            export_inventory_json(inv, force=True)
+        else:
+            src = _load_json_inventory()
+            n = inv.migrate_from(src, INVENTORY_PATH, replace=True)
+            src.close()
+            _remember_json(inv)
+            print(f"Inventory: replaced {INVENTORY_DB_PATH} with {n} records from {INVENTORY_PATH}")
+    finally:
+        inv.close()
+
+
+if __name__ == "__main__":
+    main()
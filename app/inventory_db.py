@@ -0,0 +1,342 @@
+# app/inventory_db.py
+import json
+import os
+import re
+import sqlite3
+import threading
+from collections.abc import MutableMapping
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS listings (
+    external_id  TEXT PRIMARY KEY,
+    je_reference TEXT,
+    status       TEXT,
+    url          TEXT,
+    last_seen    TEXT,
+    data         TEXT NOT NULL,
+    listing_key  TEXT
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key   TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+# după ALTER TABLE-ul din _upgrade_schema (bazele vechi nu au coloana listing_key)
+INDEXES = """
+CREATE INDEX IF NOT EXISTS ix_listings_je_reference ON listings(je_reference);
+CREATE INDEX IF NOT EXISTS ix_listings_status ON listings(status);
+CREATE INDEX IF NOT EXISTS ix_listings_last_seen ON listings(last_seen);
+CREATE INDEX IF NOT EXISTS ix_listings_listing_key ON listings(listing_key);
+"""
+
+_UPSERT = """
+INSERT INTO listings (external_id, je_reference, status, url, last_seen, data, listing_key)
+VALUES (?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT(external_id) DO UPDATE SET
+    je_reference = excluded.je_reference,
+    status       = excluded.status,
+    url          = excluded.url,
+    last_seen    = excluded.last_seen,
+    data         = excluded.data,
+    listing_key  = excluded.listing_key
+"""
+
+# câte valori punem într-un "IN (...)" (limita SQLite e 999 pe versiunile vechi)
+_IN_CHUNK = 500
+
+
+def _listing_key(value: str) -> str:
+    """Cheie de comparație între URL-urile din index și inventory: slug-ul BaT."""
+    m = re.search(r"/listing/([^/?#]+)", value or "")
+    return m.group(1).lower() if m else ""
+
+
+def _rec_listing_key(rec: dict) -> str:
+    # inventory vechi are external_id de forma BAT-https://..., cel nou BAT-<slug>
+    return _listing_key(rec.get("url", "")) or _listing_key(rec.get("external_id", "")) \
+        or (rec.get("external_id") or "").replace("BAT-", "").lower()
+
+
+# ordinea feed-ului determinist: referința din advert (je_reference, altfel external_id)
+_REF_ORDER = "ORDER BY COALESCE(NULLIF(TRIM(je_reference), ''), external_id), external_id"
+
+
+def ref_sort_key(key: str, rec: dict) -> tuple:
+    """Cheia de sortare din _REF_ORDER, pentru recordurile care nu sunt (încă) în DB."""
+    return ((rec.get("je_reference") or "").strip() or key, key)
+
+
+def record_time_bounds(records) -> tuple:
+    """(cel mai vechi first_seen, cel mai nou last_seen) dintr-un iterabil de recorduri."""
+    firsts, lasts = [], []
+    for r in records:
+        if r.get("first_seen"):
+            firsts.append(r["first_seen"])
+        if r.get("last_seen"):
+            lasts.append(r["last_seen"])
+    return (min(firsts) if firsts else None, max(lasts) if lasts else None)
+
+
+def _row(ext_id: str, rec: dict) -> tuple:
+    return (
+        ext_id,
+        rec.get("je_reference"),
+        rec.get("status"),
+        rec.get("url"),
+        rec.get("last_seen"),
+        json.dumps(rec, ensure_ascii=False),
+        _rec_listing_key(rec),
+    )
+
+
+class SqliteInventory(MutableMapping):
+    """
+    Inventory în SQLite cu interfață de dict (external_id -> record), ca restul
+    codului (upsert_bat_cars, build_james_xml) să nu se schimbe.
+
+    - recordurile se citesc la cerere; items()/values() le iau din DB în flux
+      (nu țin tot inventory-ul în memorie)
+    - modificările se fac cu `inv[key] = rec` și ajung pe disc la commit(),
+      într-o singură tranzacție și doar pentru recordurile schimbate
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(SCHEMA)
+        self._upgrade_schema()
+        self._lock = threading.RLock()
+        self._cache = {}     # recorduri citite cu inv[key] (pot fi modificate in-place)
+        self._dirty = {}     # key -> record de scris la commit (ordinea = ordinea inserării)
+        self._deleted = set()
+
+    # --- meta / migrare ---------------------------------------------------
+
+    def _upgrade_schema(self) -> None:
+        # coloana listing_key (slug-ul BaT, vezi _rec_listing_key) a apărut după primele baze:
+        # o adăugăm și o completăm o singură dată, apoi lookup-urile merg prin index
+        cols = {row[1] for row in self._db.execute("PRAGMA table_info(listings)")}
+        if "listing_key" not in cols:
+            with self._db:
+                self._db.execute("ALTER TABLE listings ADD COLUMN listing_key TEXT")
+                keys = [(_rec_listing_key(json.loads(data)), k)
+                        for k, data in self._db.execute("SELECT external_id, data FROM listings")]
+                self._db.executemany("UPDATE listings SET listing_key = ? WHERE external_id = ?", keys)
+        self._db.executescript(INDEXES)
+
+    def get_meta(self, key: str, default=None):
+        row = self._db.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else default
+
+    def set_meta(self, key: str, value: str) -> None:
+        with self._lock, self._db:
+            self._db.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
+
+    def migrate_from(self, records: dict, marker: str, replace: bool = False) -> int:
+        """
+        Import one-time (ex. din inventory.json); a doua oară nu mai face nimic.
+        `replace`: re-import explicit, tabelul e înlocuit integral cu `records`.
+        """
+        with self._lock:
+            if self.get_meta("migrated_from") is not None and not replace:
+                return 0
+            with self._db:
+                if replace:
+                    self._db.execute("DELETE FROM listings")
+                    self._dirty.clear()
+                    self._deleted.clear()
+                    self._cache.clear()
+                self._db.executemany(_UPSERT, (_row(k, r) for k, r in (records or {}).items()))
+                self._db.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('migrated_from', ?)", (marker,))
+            return len(records or {})
+
+    # --- MutableMapping ---------------------------------------------------
+
+    def _in_db(self, key: str) -> bool:
+        return self._db.execute("SELECT 1 FROM listings WHERE external_id = ?", (key,)).fetchone() is not None
+
+    def __getitem__(self, key):
+        with self._lock:
+            if key in self._deleted:
+                raise KeyError(key)
+            if key in self._dirty:
+                return self._dirty[key]
+            if key in self._cache:
+                return self._cache[key]
+            row = self._db.execute("SELECT data FROM listings WHERE external_id = ?", (key,)).fetchone()
+            if row is None:
+                raise KeyError(key)
+            rec = self._cache[key] = json.loads(row[0])
+            return rec
+
+    def __setitem__(self, key, rec):
+        with self._lock:
+            self._deleted.discard(key)
+            self._cache.pop(key, None)
+            self._dirty[key] = rec
+
+    def __delitem__(self, key):
+        with self._lock:
+            if key not in self._dirty and not self._in_db(key):
+                raise KeyError(key)
+            self._dirty.pop(key, None)
+            self._cache.pop(key, None)
+            self._deleted.add(key)
+
+    def __contains__(self, key):
+        with self._lock:
+            if key in self._deleted:
+                return False
+            return key in self._dirty or key in self._cache or self._in_db(key)
+
+    def __iter__(self):
+        for key, _ in self.items():
+            yield key
+
+    def __len__(self):
+        with self._lock:
+            n = self._db.execute("SELECT COUNT(*) FROM listings").fetchone()[0]
+            new = sum(1 for k in self._dirty if not self._in_db(k))
+            gone = sum(1 for k in self._deleted if self._in_db(k))
+            return n + new - gone
+
+    def _iter_rows(self, where: str = "", params: tuple = (), order: str = "ORDER BY rowid"):
+        # cursor separat, citit în bucăți: memorie constantă indiferent de mărime
+        cur = self._db.execute(f"SELECT external_id, data FROM listings {where} {order}", params)
+        while True:
+            rows = cur.fetchmany(500)
+            if not rows:
+                break
+            yield from rows
+
+    def items(self):
+        seen_dirty = set()
+        for key, data in self._iter_rows():
+            if key in self._deleted:
+                continue
+            if key in self._dirty:
+                seen_dirty.add(key)
+                yield key, self._dirty[key]
+            elif key in self._cache:
+                yield key, self._cache[key]
+            else:
+                yield key, json.loads(data)
+        for key in list(self._dirty):
+            if key not in seen_dirty:
+                yield key, self._dirty[key]
+
+    def values(self):
+        for _, rec in self.items():
+            yield rec
+
+    def keys(self):
+        return iter(self)
+
+    def iter_status(self, status: str):
+        """Recordurile cu un anumit status, prin index (fără să citim tot tabelul)."""
+        for _, rec in self.iter_status_items(status):
+            yield rec
+
+    def iter_status_items(self, status: str):
+        """Ca iter_status, dar perechi (external_id, record)."""
+        seen_dirty = set()
+        for key, data in self._iter_rows("WHERE status = ?", (status,)):
+            if key in self._deleted:
+                continue
+            if key in self._dirty:
+                seen_dirty.add(key)
+                rec = self._dirty[key]
+            else:
+                rec = self._cache.get(key) or json.loads(data)
+            if rec.get("status") == status:
+                yield key, rec
+        for key, rec in list(self._dirty.items()):
+            if key not in seen_dirty and rec.get("status") == status:
+                yield key, rec
+
+    # --- lookup după slug-ul BaT (indexul pe listing_key) --------------------
+
+    def find_listing(self, key: str):
+        """external_id-ul recordului cu slug-ul `key` (ultimul, ca listing_index), sau None."""
+        with self._lock:
+            for (ext_id,) in self._db.execute(
+                    "SELECT external_id FROM listings WHERE listing_key = ? ORDER BY rowid DESC", (key,)):
+                if ext_id not in self._deleted:
+                    return ext_id
+            return None
+
+    def listing_state(self, key: str):
+        """(status, last_seen) salvate pentru slug-ul `key`, sau None dacă nu există."""
+        with self._lock:
+            return self._db.execute(
+                "SELECT status, last_seen FROM listings WHERE listing_key = ? ORDER BY rowid DESC LIMIT 1",
+                (key,)).fetchone()
+
+    def items_for_listing_keys(self, keys):
+        """Perechile (external_id, record) ale căror slug e în `keys`, prin index."""
+        keys = list(keys)
+        seen_dirty = set()
+        for i in range(0, len(keys), _IN_CHUNK):
+            chunk = keys[i:i + _IN_CHUNK]
+            where = f"WHERE listing_key IN ({', '.join('?' * len(chunk))})"
+            for key, data in list(self._iter_rows(where, tuple(chunk))):
+                if key in self._deleted:
+                    continue
+                if key in self._dirty:
+                    seen_dirty.add(key)
+                    yield key, self._dirty[key]
+                else:
+                    yield key, self._cache.get(key) or json.loads(data)
+        wanted = set(keys)
+        for key, rec in list(self._dirty.items()):
+            if key not in seen_dirty and _rec_listing_key(rec) in wanted:
+                yield key, rec
+
+    def iter_by_reference(self, status: str = None):
+        """
+        Recordurile (toate sau doar cu `status`) în ordinea referinței din feed,
+        sortate de SQLite. Cu modificări necomise sortăm în memorie.
+        """
+        for _, rec in self.iter_items_by_reference(status):
+            yield rec
+
+    def iter_items_by_reference(self, status: str = None):
+        """Ca iter_by_reference, dar perechi (external_id, record)."""
+        if self._dirty or self._deleted:
+            recs = ((k, r) for k, r in self.items() if status is None or r.get("status") == status)
+            yield from sorted(recs, key=lambda kv: ref_sort_key(*kv))
+            return
+        where, params = ("", ()) if status is None else ("WHERE status = ?", (status,))
+        for key, data in self._iter_rows(where, params, _REF_ORDER):
+            yield key, self._cache.get(key) or json.loads(data)
+
+    def time_bounds(self, status: str = None) -> tuple:
+        """(cel mai vechi first_seen, cel mai nou last_seen), ca stringuri ISO; (None, None) dacă e gol."""
+        if self._dirty or self._deleted:
+            return record_time_bounds(self.values() if status is None else self.iter_status(status))
+        where, params = ("", ()) if status is None else ("WHERE status = ?", (status,))
+        row = self._db.execute(
+            f"SELECT MIN(json_extract(data, '$.first_seen')), MAX(last_seen) FROM listings {where}", params
+        ).fetchone()
+        return row[0], row[1]
+
+    # --- persistență ------------------------------------------------------
+
+    def commit(self) -> int:
+        """Scrie recordurile modificate într-o tranzacție; întoarce câte s-au scris."""
+        with self._lock:
+            n = len(self._dirty) + len(self._deleted)
+            with self._db:
+                self._db.executemany(_UPSERT, (_row(k, r) for k, r in self._dirty.items()))
+                self._db.executemany("DELETE FROM listings WHERE external_id = ?", ((k,) for k in self._deleted))
+            self._dirty.clear()
+            self._deleted.clear()
+            self._cache.clear()
+            return n
+
+    def close(self) -> None:
+        self._db.close()
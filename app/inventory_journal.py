@@ -0,0 +1,210 @@
+# app/inventory_journal.py
+import glob
+import json
+import os
+import threading
+import time
+
+# compactăm când jurnalul depășește jumătate din snapshot (dar minim atât)
+COMPACT_MIN_BYTES = 256 * 1024
+
+_compact_lock = threading.Lock()
+
+
+def atomic_write_json(path: str, data, indent: int = 2) -> None:
+    """
+    Scrie în fișier temporar în același director, fsync, apoi os.replace.
+    Un kill în timpul scrierii lasă fișierul vechi intact (niciodată unul trunchiat).
+    """
+    d = os.path.dirname(path) or "."
+    os.makedirs(d, exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=indent, ensure_ascii=False)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+    try:
+        fd = os.open(d, os.O_RDONLY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+    except OSError:
+        pass  # ex. Windows: fsync pe director nu e suportat
+
+
+def read_snapshot(path: str) -> dict:
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        try:
+            data = json.load(f)
+        except json.JSONDecodeError as e:
+            # NU întoarcem {}: am pierde toate je_reference-urile stabile
+            raise RuntimeError(f"Inventory snapshot {path} is corrupt ({e}); refusing to start empty") from e
+    if not isinstance(data, dict):
+        raise RuntimeError(f"Inventory snapshot {path} is not a JSON object")
+    return data
+
+
+def sealed_journals(journal_path: str) -> list:
+    return sorted(glob.glob(f"{journal_path}.*.sealed"))
+
+
+def replay(path: str, data: dict) -> int:
+    """Aplică jurnalul peste `data`. Liniile trunchiate (kill la append) sunt ignorate."""
+    if not os.path.exists(path):
+        return 0
+    n = 0
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue
+            if entry.get("op") == "put":
+                data[entry["key"]] = entry["rec"]
+            elif entry.get("op") == "del":
+                data.pop(entry["key"], None)
+            n += 1
+    return n
+
+
+def load_journaled(snapshot_path: str, journal_path: str) -> dict:
+    """Snapshot + jurnalele sigilate (compactări neterminate) + jurnalul curent."""
+    data = read_snapshot(snapshot_path)
+    for p in sealed_journals(journal_path):
+        replay(p, data)
+    replay(journal_path, data)
+    return data
+
+
+class JournaledInventory(dict):
+    """
+    dict-ul de inventory care, la fiecare `inv[key] = rec`, adaugă o linie JSONL
+    în jurnal. Un save costă astfel O(recorduri schimbate), nu O(tot inventory-ul);
+    snapshot-ul complet e rescris doar la compactare, în fundal.
+    """
+
+    def __init__(self, snapshot_path: str, journal_path: str, data: dict = None):
+        super().__init__(data or {})
+        self.snapshot_path = snapshot_path
+        self.journal_path = journal_path
+        self._fh = None
+        self._lock = threading.Lock()
+        self.compaction = None  # thread-ul ultimei compactări, dacă a pornit vreuna
+
+    def _append(self, entry: dict) -> None:
+        line = json.dumps(entry, ensure_ascii=False) + "\n"
+        with self._lock:
+            if self._fh is None:
+                os.makedirs(os.path.dirname(self.journal_path) or ".", exist_ok=True)
+                self._fh = open(self.journal_path, "a", encoding="utf-8")
+                # dacă ultima linie a rămas trunchiată, o închidem ca să nu lipim intrarea nouă de ea
+                if self._fh.tell() > 0:
+                    with open(self.journal_path, "rb") as r:
+                        r.seek(-1, os.SEEK_END)
+                        if r.read(1) != b"\n":
+                            self._fh.write("\n")
+            self._fh.write(line)
+            self._fh.flush()  # ajunge în kernel: supraviețuiește unui kill al procesului
+
+    def __setitem__(self, key, rec):
+        super().__setitem__(key, rec)
+        self._append({"op": "put", "key": key, "rec": rec})
+
+    def __delitem__(self, key):
+        super().__delitem__(key)
+        self._append({"op": "del", "key": key})
+
+    def pop(self, key, *default):
+        had = key in self
+        out = super().pop(key, *default)
+        if had:
+            self._append({"op": "del", "key": key})
+        return out
+
+    def update(self, *args, **kwargs):
+        for k, v in dict(*args, **kwargs).items():
+            self[k] = v
+
+    def setdefault(self, key, default=None):
+        if key not in self:
+            self[key] = default
+        return self[key]
+
+    def sync(self) -> None:
+        """fsync pe jurnal (durabil și la căderi de curent)."""
+        with self._lock:
+            if self._fh is not None:
+                self._fh.flush()
+                os.fsync(self._fh.fileno())
+
+    def _journal_size(self) -> int:
+        try:
+            return os.path.getsize(self.journal_path)
+        except OSError:
+            return 0
+
+    def maybe_compact(self, background: bool = True):
+        """Compactează dacă jurnalul a crescut prea mult față de snapshot."""
+        try:
+            snap = os.path.getsize(self.snapshot_path)
+        except OSError:
+            snap = 0
+        if self._journal_size() < max(COMPACT_MIN_BYTES, snap // 2):
+            return None
+        return self.compact(background=background)
+
+    def compact(self, background: bool = True):
+        """
+        Sigilează jurnalul curent (rename) și pornește un jurnal nou, apoi
+        snapshot + jurnale sigilate -> snapshot nou (atomic) -> ștergem jurnalele sigilate.
+        Lucrează doar cu fișierele de pe disc, deci nu se atinge de dict-ul din memorie.
+        """
+        if not _compact_lock.acquire(blocking=False):
+            return None  # rulează deja o compactare
+        try:
+            with self._lock:
+                if self._fh is not None:
+                    self._fh.flush()
+                    os.fsync(self._fh.fileno())
+                    self._fh.close()
+                    self._fh = None
+                if os.path.exists(self.journal_path):
+                    sealed = f"{self.journal_path}.{int(time.time() * 1000):015d}.sealed"
+                    os.replace(self.journal_path, sealed)
+        except Exception:
+            _compact_lock.release()
+            raise
+
+        def work():
+            try:
+                data = read_snapshot(self.snapshot_path)
+                parts = sealed_journals(self.journal_path)
+                for p in parts:
+                    replay(p, data)
+                atomic_write_json(self.snapshot_path, data)
+                for p in parts:
+                    os.remove(p)
+            finally:
+                _compact_lock.release()
+
+        if not background:
+            work()
+            return None
+        # thread non-daemon: la ieșire, interpretorul așteaptă să se termine compactarea
+        t = threading.Thread(target=work, name="inventory-compact")
+        t.start()
+        self.compaction = t
+        return t
+
+    def close(self) -> None:
+        with self._lock:
+            if self._fh is not None:
+                self._fh.close()
+                self._fh = None
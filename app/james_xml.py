@@ -1,10 +1,20 @@
 from xml.etree.ElementTree import Element, SubElement, tostring
 import datetime as dt
+import hashlib
+import io
+import json
+import os
 import re
-import uuid
 
-from .inventory import load_inventory, save_inventory, upsert_bat_cars
+from .inventory import (
+    load_inventory, save_inventory, open_inventory, export_inventory_json, upsert_bat_cars,
+    reconcile_listed, iter_active, iter_by_reference, iter_items_by_reference, time_bounds,
+)
+from .inventory_journal import atomic_write_json
+from .images import feed_images
+from . import metrics
 from .config import (
+    FEED_DETERMINISTIC,
     FEED_VERSION,
     FEED_REFERENCE,
     FEED_TITLE,
@@ -21,8 +31,10 @@ def _add(parent, tag, value=""):
     return el
 
 # Brand list (poți extinde)
+# "Mercedes-AMG" e brand separat (mai lung, deci încercat înaintea alias-ului "Mercedes"):
+# titlurile BaT "Mercedes-AMG C43 ..." rămân brand "Mercedes-AMG", model "C43 ...", ca înainte
 KNOWN_BRANDS = [
-    "Aston Martin", "Mercedes-Benz", "Rolls-Royce", "Land Rover",
+    "Aston Martin", "Mercedes-AMG", "Mercedes-Benz", "Rolls-Royce", "Land Rover",
     "Volkswagen", "Chevrolet", "Porsche", "Ferrari", "Lamborghini",
     "Bentley", "Cadillac", "Studebaker", "Toyota", "Jaguar", "Dodge",
     "BMW", "Ford", "Jeep", "Audi", "Ural", "Honda", "Nissan", "Mazda",
@@ -32,16 +44,62 @@ KNOWN_BRANDS = [
     "Infiniti", "Genesis"
 ]
 
+# Alias -> brand canonic din KNOWN_BRANDS (poți extinde)
+BRAND_ALIASES = {
+    "Mercedes": "Mercedes-Benz",
+    "Mercedes Benz": "Mercedes-Benz",
+    "Benz": "Mercedes-Benz",
+    "VW": "Volkswagen",
+    "Rolls Royce": "Rolls-Royce",
+    "Chevy": "Chevrolet",
+    "Land-Rover": "Land Rover",
+    "Aston-Martin": "Aston Martin",
+    "Alfa-Romeo": "Alfa Romeo",
+}
+
+# (semnătura listelor, regex, nume lowercase -> (brand canonic, prioritate))
+_brand_index = (None, None, None)
+
 def _find_year(title: str) -> str:
     m = re.search(r"\b(19\d{2}|20\d{2})\b", title or "")
     return m.group(1) if m else ""
 
+def _brand_matcher():
+    """
+    Un singur regex cu toate brandurile + alias-urile, cel mai lung primul,
+    case-insensitive. Se compilează o dată și se reface doar dacă cineva
+    modifică KNOWN_BRANDS / BRAND_ALIASES.
+    """
+    global _brand_index
+    sig = (tuple(KNOWN_BRANDS), tuple(BRAND_ALIASES.items()))
+    if _brand_index[0] != sig:
+        names = [(b, b) for b in KNOWN_BRANDS] + list(BRAND_ALIASES.items())
+        # aceeași prioritate ca vechiul sorted(KNOWN_BRANDS, key=len, reverse=True)
+        ranked = sorted(enumerate(names), key=lambda x: (-len(x[1][0]), x[0]))
+        lookup = {}
+        for rank, (_, (name, brand)) in enumerate(ranked):
+            lookup.setdefault(name.lower(), (brand, rank))
+        rx = re.compile(
+            r"\b(?:" + "|".join(re.escape(name) for _, (name, _) in ranked) + r")\b",
+            re.IGNORECASE,
+        )
+        _brand_index = (sig, rx, lookup)
+    return _brand_index[1], _brand_index[2]
+
+
+def _match_brand(title: str):
+    """(brand canonic, match) pentru brandul cu prioritatea cea mai mare din titlu; ("", None) dacă nu e."""
+    rx, lookup = _brand_matcher()
+    best = None
+    for m in rx.finditer(title or ""):
+        brand, rank = lookup[m.group(0).lower()]
+        if best is None or rank < best[0]:
+            best = (rank, brand, m)
+    return (best[1], best[2]) if best else ("", None)
+
+
 def _find_brand(title: str) -> str:
-    t = title or ""
-    for b in sorted(KNOWN_BRANDS, key=len, reverse=True):
-        if re.search(rf"\b{re.escape(b)}\b", t):
-            return b
-    return ""
+    return _match_brand(title)[0]
 
 def _extract_brand_model_year(title: str):
     """
@@ -55,7 +113,7 @@ def _extract_brand_model_year(title: str):
     if not year:
         return "", "", ""  # JE cere year, deci fără year nu trimitem
 
-    brand = _find_brand(title)
+    brand, brand_match = _match_brand(title)
 
     # fallback brand: primul cuvânt după year
     if not brand:
@@ -66,7 +124,10 @@ def _extract_brand_model_year(title: str):
     # model = ce rămâne după "year + brand"
     # încercăm să scoatem partea de început până la brand inclusiv
     model = ""
-    if brand in title:
+    if brand_match is not None:
+        # tăiem exact după textul potrivit (poate fi alias sau altă capitalizare)
+        model = title[brand_match.end():].strip(" -")
+    elif brand in title:
         model = title.split(brand, 1)[1].strip(" -")
     else:
         # dacă brand e fallback și nu apare exact în title (rar), scoatem după year
@@ -84,89 +145,386 @@ def _extract_brand_model_year(title: str):
 
     return year, brand, model
 
-def build_james_xml(items: list) -> bytes:
-    if not JE_DEALER_ID or not JE_DEALER_NAME:
-        raise SystemExit("JE_DEALER_ID and JE_DEALER_NAME are required env vars.")
+def advert_fields(it: dict):
+    """(year, brand, model) exact cum ajung în <advert> (pentru filtre pe brand/an)."""
+    title = _txt(it.get("title"))
+    raw = it.get("raw") or {}
+
+    # Preferăm câmpurile extrase din pagină (scraper.py),
+    # NU derivări din titlu.
+    year = _txt(raw.get("year"))
+    brand = _txt(raw.get("brand"))
+    model = _txt(raw.get("model"))
+
+    # fallback-uri (rar) – doar dacă pagina nu a livrat câmpurile
+    if not year or not brand or not model:
+        y2, b2, m2 = _extract_brand_model_year(title)
+        year = year or y2
+        brand = brand or b2
+        model = model or m2
+
+    return year, brand, model
+
+
+# câte imagini trimitem maxim per advert (un feed spec poate cere mai puține)
+MAX_ADVERT_IMAGES = 40
+
+
+def advert_reference(it: dict) -> str:
+    """Atributul reference al advert-ului."""
+    # reference stabil: NU schimbăm brusc identitatea
+    ref = _txt(it.get("je_reference")) or _txt(it.get("external_id")) or _txt(it.get("url"))
+    if not ref:
+        # derivat din conținut: același record -> aceeași referință la fiecare build
+        year, brand, model = advert_fields(it)
+        key = "|".join((_txt(it.get("title")), _txt(year), _txt(brand), _txt(model), _txt(it.get("description"))))
+        ref = f"JE-{hashlib.sha1(key.encode('utf-8')).hexdigest()[:12]}"
+    return ref
 
-    inv = load_inventory()
-    inv = upsert_bat_cars(inv, items or [])
-    save_inventory(inv)
 
-    items = [x for x in inv.values() if x.get("status") == "active"]
+def _advert_element(it: dict, max_images: int = MAX_ADVERT_IMAGES):
+    """Elementul <advert> pentru un record din inventory; None dacă nu îl putem trimite."""
+    title = _txt(it.get("title"))
+    year, brand, model = advert_fields(it)
 
-    root = Element("jameslist_feed", {"version": _txt(FEED_VERSION or "3.0")})
+    if not year:
+        return None  # nu putem fără year
+
+    adv = Element("advert", {"reference": advert_reference(it), "category": "car"})
+
+    _add(adv, "preowned", "yes")
+    _add(adv, "type", "sale")
+
+    _add(adv, "brand", brand)
+    _add(adv, "model", model)  # GARANTAT non-empty
+    _add(adv, "year", year)
+
+    _add(adv, "price_on_request", "yes")
+    SubElement(adv, "price", {"currency": "USD", "vat_included": "VAT Excluded"}).text = ""
+
+    loc_in = it.get("location") or {}
+    if not isinstance(loc_in, dict):
+        loc_in = {}
+
+    loc = SubElement(adv, "location")
+    _add(loc, "country", _txt(loc_in.get("country")) or "United States")
+    _add(loc, "region", _txt(loc_in.get("region")))
+    _add(loc, "city", _txt(loc_in.get("city")))
+    _add(loc, "zip", _txt(loc_in.get("zip")))
+    _add(loc, "address", _txt(loc_in.get("address")))
+
+    _add(adv, "headline", title)
+    _add(adv, "description", _txt(it.get("description")))
+    _add(adv, "url", _txt(it.get("url")))
+
+    media = SubElement(adv, "media")
+    # canonice, fără dubluri (și recordurile vechi din inventory), pe IMAGE_HOST_BASE dacă e setat
+    for im in feed_images(it.get("images"), max_images):
+        img = SubElement(media, "image")
+        _add(img, "image_url", im)
 
-    fi = SubElement(root, "feed_information")
+    return adv
+
+
+def _xml_bytes(el) -> bytes:
+    # aceeași serializare ca tostring(root, encoding="utf-8") pe arborele întreg
+    return tostring(el, encoding="unicode").encode("utf-8", "xmlcharrefreplace")
+
+
+def advert_bytes(it: dict, max_images: int = MAX_ADVERT_IMAGES):
+    """<advert>-ul serializat (UTF-8), gata de scris în unul sau mai multe feed-uri; None dacă nu se trimite."""
+    adv = _advert_element(it, max_images)
+    return None if adv is None else _xml_bytes(adv)
+
+
+def _open_tag(tag: str, attrs: dict) -> bytes:
+    # "<tag a="1" />" -> "<tag a="1">", cu escaparea atributelor făcută de ElementTree
+    return _xml_bytes(Element(tag, attrs))[:-3] + b">"
+
+
+def _feed_header(created: str, updated: str = None) -> bytes:
+    """<feed_information> + <dealer>, comune feed-ului complet și celui delta."""
+    fi = Element("feed_information")
     _add(fi, "reference", FEED_REFERENCE or "BAT-unsold")
     _add(fi, "title", FEED_TITLE or "BaT Unsold importer")
-    now = dt.datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S")
     _add(fi, "description", "Automated import of unsold Bring a Trailer lots")
-    _add(fi, "created", now)
-    _add(fi, "updated", now)
+    _add(fi, "created", created)
+    _add(fi, "updated", updated or created)
 
-    dealer = SubElement(root, "dealer")
+    dealer = Element("dealer")
     _add(dealer, "id", JE_DEALER_ID)
     _add(dealer, "name", JE_DEALER_NAME)
+    return _xml_bytes(fi) + _xml_bytes(dealer)
+
+
+class JamesFeedWriter:
+    """
+    Scrie feed-ul JamesEdition incremental într-un sink binar (fișier, BytesIO, socket):
+    antetul la start(), câte un <advert> la add(), închiderea la close().
+    În memorie stă cel mult un advert; ieșirea e identică byte cu byte cu
+    serializarea arborelui complet.
+    """
+
+    def __init__(self, sink):
+        self.sink = sink
+        self.count = 0
+
+    def start(self, created: str, updated: str = None) -> None:
+        self.sink.write(b'<?xml version="1.0" encoding="UTF-8"?>\n')
+        self.sink.write(_open_tag("jameslist_feed", {"version": _txt(FEED_VERSION or "3.0")}))
+        self.sink.write(_feed_header(created, updated))
+
+    def add(self, it: dict, max_images: int = MAX_ADVERT_IMAGES) -> bool:
+        data = advert_bytes(it, max_images)
+        if data is None:
+            return False
+        self.add_bytes(data)
+        return True
+
+    def add_bytes(self, data: bytes) -> None:
+        """Un <advert> deja serializat (advert_bytes), ca să nu-l construim o dată per feed."""
+        if not self.count:
+            self.sink.write(b"<adverts>")
+        self.sink.write(data)
+        self.count += 1
+
+    def close(self) -> None:
+        # ElementTree scrie un <adverts> gol ca "<adverts />"
+        self.sink.write(b"</adverts>" if self.count else b"<adverts />")
+        self.sink.write(b"</jameslist_feed>")
+
+
+def ingest_items(items: list, seen_urls: list = None, inv=None):
+    """
+    Pasul de ingest (singurul care scrie): upsert în inventory, reconcile cu
+    indexul (dacă îl avem) și save. Întoarce inventory-ul, gata de randat.
+    `inv`: inventory-ul deschis de apelant (vezi open_inventory); fără el se
+    deschide unul nou, pe care îl închide apelantul (close_inventory).
+    """
+    if inv is None:
+        inv = load_inventory()
+    inv = upsert_bat_cars(inv, items or [])
+    if seen_urls is not None:
+        inv = reconcile_listed(inv, seen_urls)
+    save_inventory(inv)
+    return inv
+
+
+def _require_dealer():
+    if not JE_DEALER_ID or not JE_DEALER_NAME:
+        raise SystemExit("JE_DEALER_ID and JE_DEALER_NAME are required env vars.")
 
-    adverts = SubElement(root, "adverts")
 
-    for it in items:
+FEED_TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
 
-        title = _txt(it.get("title"))
-        raw = it.get("raw") or {}
 
-        # Preferăm câmpurile extrase din pagină (scraper.py),
-        # NU derivări din titlu.
-        year = _txt(raw.get("year"))
-        brand = _txt(raw.get("brand"))
-        model = _txt(raw.get("model"))
+def _feed_time(iso: str):
+    """ISO din inventory (first_seen/last_seen) -> formatul din feed_information, în UTC."""
+    try:
+        t = dt.datetime.fromisoformat(iso)
+    except (TypeError, ValueError):
+        return None
+    if t.tzinfo is not None:
+        t = t.astimezone(dt.timezone.utc).replace(tzinfo=None)
+    return t.strftime(FEED_TIME_FORMAT)
 
-        # fallback-uri (rar) – doar dacă pagina nu a livrat câmpurile
-        if not year or not brand or not model:
-            y2, b2, m2 = _extract_brand_model_year(title)
-            year = year or y2
-            brand = brand or b2
-            model = model or m2
 
-        if not year:
-            continue  # nu putem fără year
+def feed_timestamps(inv, status: str = "active", deterministic: bool = FEED_DETERMINISTIC) -> tuple:
+    """
+    (created, updated) pentru feed_information. Determinist: cel mai vechi first_seen
+    și cel mai nou last_seen din recordurile randate; altfel ora build-ului.
+    """
+    now = dt.datetime.utcnow().strftime(FEED_TIME_FORMAT)
+    if not deterministic:
+        return now, now
+    first, last = time_bounds(inv, status)
+    updated = _feed_time(last) or _feed_time(first)
+    if updated is None:
+        return now, now  # inventory gol: nu avem din ce deriva
+    return _feed_time(first) or updated, updated
+
+
+def feed_records(inv, status: str = "active", deterministic: bool = FEED_DETERMINISTIC):
+    """Recordurile de randat (`status`, None = toate); determinist sortate după reference."""
+    if deterministic:
+        return iter_by_reference(inv, status)
+    if status == "active":
+        return iter_active(inv)
+    return (x for x in inv.values() if status is None or x.get("status") == status)
+
+
+@metrics.timed("render")
+def render_feed(records, sink, now: str = None, updated: str = None) -> int:
+    """
+    Randează feed-ul din `records` (orice iterabil de recorduri de inventory, deja
+    filtrate: ex. feed_records(inv) sau o listă) în `sink` (fișier binar sau cale).
+    `now`/`updated` sunt created/updated din feed_information (implicit ora curentă).
+    Read-only: nu citește și nu scrie inventory-ul, nu atinge last_seen.
+    Întoarce numărul de adverts scrise.
+    """
+    _require_dealer()
+    if isinstance(sink, str):
+        with open(sink, "wb") as f:
+            return render_feed(records, f, now, updated)
+
+    w = JamesFeedWriter(sink)
+    w.start(now or dt.datetime.utcnow().strftime(FEED_TIME_FORMAT), updated)
+    for it in records:
+        w.add(it)
+    w.close()
+    return w.count
+
+
+def render_james_xml(records, now: str = None, updated: str = None) -> bytes:
+    """render_feed în memorie."""
+    buf = io.BytesIO()
+    render_feed(records, buf, now, updated)
+    return buf.getvalue()
+
+
+def write_james_xml(items: list, sink, seen_urls: list = None) -> int:
+    """
+    Ingest + randare: ca build_james_xml, dar scrie feed-ul direct în `sink`
+    (fișier binar sau cale), advert cu advert. Întoarce numărul de adverts scrise.
+    """
+    _require_dealer()
+    with open_inventory() as inv:
+        ingest_items(items, seen_urls, inv)
+        created, updated = feed_timestamps(inv)
+        n = render_feed(feed_records(inv), sink, created, updated)
+        export_inventory_json(inv)
+    return n
+
 
-        # reference stabil: NU schimbăm brusc identitatea
-        ref = _txt(it.get("je_reference")) or _txt(it.get("external_id")) or _txt(it.get("url"))
-        if not ref:
-            ref = f"JE-{uuid.uuid4().hex[:12]}"
+def build_james_xml(items: list, seen_urls: list = None) -> bytes:
+    """
+    `seen_urls`: (opțional) toate URL-urile din indexul curent; anunțurile care
+    lipsesc din el ies din feed (status "inactive"), vezi reconcile_listed.
+    Pentru re-randări fără ingest folosește render_feed / render_james_xml.
+    """
+    buf = io.BytesIO()
+    write_james_xml(items, buf, seen_urls)
+    return buf.getvalue()
 
-        adv = SubElement(adverts, "advert", {"reference": ref, "category": "car"})
 
-        _add(adv, "preowned", "yes")
-        _add(adv, "type", "sale")
+# --- feed delta -------------------------------------------------------------
 
-        _add(adv, "brand", brand)
-        _add(adv, "model", model)  # GARANTAT non-empty
-        _add(adv, "year", year)
+# hash-ul advert-ului din ultimul feed publicat, ținut în fiecare record din inventory
+PUBLISHED_HASH_KEY = "feed_hash"
 
-        _add(adv, "price_on_request", "yes")
-        SubElement(adv, "price", {"currency": "USD", "vat_included": "VAT Excluded"}).text = ""
 
-        loc_in = it.get("location") or {}
-        if not isinstance(loc_in, dict):
-            loc_in = {}
+def delta_paths(feed_path: str) -> tuple:
+    """JamesEdition_feed_X.xml -> (JamesEdition_feed_X.delta.xml, JamesEdition_feed_X.manifest.json)."""
+    base = feed_path[:-4] if feed_path.endswith(".xml") else feed_path
+    return f"{base}.delta.xml", f"{base}.manifest.json"
 
-        loc = SubElement(adv, "location")
-        _add(loc, "country", _txt(loc_in.get("country")) or "United States")
-        _add(loc, "region", _txt(loc_in.get("region")))
-        _add(loc, "city", _txt(loc_in.get("city")))
-        _add(loc, "zip", _txt(loc_in.get("zip")))
-        _add(loc, "address", _txt(loc_in.get("address")))
 
-        _add(adv, "headline", title)
-        _add(adv, "description", _txt(it.get("description")))
-        _add(adv, "url", _txt(it.get("url")))
+def _file_sha256(path: str):
+    if not path or not os.path.exists(path):
+        return None, 0
+    h, n = hashlib.sha256(), 0
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 16), b""):
+            h.update(chunk)
+            n += len(chunk)
+    return h.hexdigest(), n
 
-        media = SubElement(adv, "media")
-        for im in (it.get("images") or [])[:40]:
-            img = SubElement(media, "image")
-            _add(img, "image_url", im)
 
-    xml = tostring(root, encoding="utf-8")
-    return b'<?xml version="1.0" encoding="UTF-8"?>\n' + xml
+@metrics.timed("delta")
+def write_delta(inv, feed_path: str, delta_path: str = None, manifest_path: str = None) -> tuple:
+    """
+    Delta față de feed-ul publicat anterior, din hash-urile per advert din inventory:
+    <added>/<changed> conțin adverts complete, <removed> doar reference-urile.
+    Scrie delta_path (XML) și manifest_path (JSON cu numere și hash-uri).
+    `feed_path` e feed-ul complet deja scris (hash-ul lui intră în manifest).
+    Nu atinge inventory-ul: întoarce (manifest, pending), iar `pending` se dă la
+    mark_published() abia după ce feed-ul / delta au fost publicate (upload reușit).
+    """
+    _require_dealer()
+    d_path, m_path = delta_paths(feed_path)
+    delta_path, manifest_path = delta_path or d_path, manifest_path or m_path
+
+    previous = {}
+    if os.path.exists(manifest_path):
+        try:
+            with open(manifest_path, "r", encoding="utf-8") as f:
+                previous = json.load(f)
+        except (OSError, ValueError):
+            previous = {}
+
+    created, updated = feed_timestamps(inv)
+    sections = {"added": [], "changed": [], "removed": []}
+    pending, unchanged = [], 0
+    for key, rec in iter_items_by_reference(inv, None):
+        data = advert_bytes(rec) if rec.get("status") == "active" else None
+        digest = hashlib.sha256(data).hexdigest() if data is not None else None
+        prev = rec.get(PUBLISHED_HASH_KEY)
+        if digest == prev:
+            unchanged += digest is not None
+            continue
+        if digest is None:
+            sections["removed"].append(_xml_bytes(Element("advert", {"reference": advert_reference(rec)})))
+        else:
+            sections["changed" if prev else "added"].append(data)
+        pending.append((key, digest))
+
+    tmp = f"{delta_path}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(b'<?xml version="1.0" encoding="UTF-8"?>\n')
+        f.write(_open_tag("jameslist_delta", {
+            "version": _txt(FEED_VERSION or "3.0"),
+            "base": (previous.get("feed") or {}).get("sha256") or "",
+        }))
+        f.write(_feed_header(created, updated))
+        for name, parts in sections.items():
+            if not parts:
+                f.write(f"<{name} />".encode("ascii"))
+                continue
+            f.write(f"<{name}>".encode("ascii"))
+            for data in parts:
+                f.write(data)
+            f.write(f"</{name}>".encode("ascii"))
+        f.write(b"</jameslist_delta>")
+    os.replace(tmp, delta_path)
+
+    feed_sha, feed_size = _file_sha256(feed_path)
+    delta_sha, delta_size = _file_sha256(delta_path)
+    manifest = {
+        "created": created,
+        "updated": updated,
+        "feed": {
+            "name": os.path.basename(feed_path),
+            "sha256": feed_sha,
+            "bytes": feed_size,
+            "adverts": unchanged + len(sections["added"]) + len(sections["changed"]),
+        },
+        "previous_feed_sha256": (previous.get("feed") or {}).get("sha256"),
+        "delta": {
+            "name": os.path.basename(delta_path),
+            "sha256": delta_sha,
+            "bytes": delta_size,
+            "added": len(sections["added"]),
+            "changed": len(sections["changed"]),
+            "removed": len(sections["removed"]),
+            "unchanged": unchanged,
+        },
+    }
+    atomic_write_json(manifest_path, manifest)
+    return manifest, pending
+
+
+def mark_published(inv, pending: list) -> None:
+    """
+    Starea publicată (PUBLISHED_HASH_KEY) intră în inventory, sub cheia fiecărui
+    record, pentru perechile (cheie, hash | None) întoarse de write_delta; apoi save.
+    Apelat doar după un upload reușit: altfel delta următoare le conține din nou.
+    """
+    for key, digest in pending:
+        rec = dict(inv[key])
+        if digest is None:
+            rec.pop(PUBLISHED_HASH_KEY, None)
+        else:
+            rec[PUBLISHED_HASH_KEY] = digest
+        inv[key] = rec
+    if pending:
+        save_inventory(inv)
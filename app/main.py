@@ -1,5 +1,6 @@
 import time
 import re
+from concurrent.futures import ThreadPoolExecutor
 import requests
 from bs4 import BeautifulSoup
 from urllib.parse import urljoin, urlparse
@@ -7,6 +8,12 @@ from xml.etree.ElementTree import Element, SubElement, ElementTree
 
 from playwright.sync_api import sync_playwright
 
+from .config import FETCH_WORKERS, HOST_RATE_LIMIT, HOST_RATE_BURST, DISCOVERY_BACKEND, USER_AGENT
+from .discovery import HARVEST_LINKS_JS, IndexIncomplete, iter_listing_urls, normalize_listing_url
+from .throttle import HostRateLimiter
+from . import http_client, image_mirror, images as image_stage, metrics, parse_pool
+from .http_cache import get_cache
+
 BASE_AUCTIONS = "https://bringatrailer.com/auctions/?sortby=bd"
 
 DEALER_ID = "105029"
@@ -15,6 +22,7 @@ OUTPUT_XML = f"JamesEdition_feed_{DEALER_ID}.xml"
 
 MAX_IMAGES = 7
 SCROLL_PAUSE = 1.2
+PARSED_KIND = "main.fetch_listing.v3"   # cheia recordului parsat în cache-ul HTTP
 SCROLL_MAX_LOOPS = 500         # safety cap
 STABLE_LOOPS_TO_STOP = 6       # stop after N loops with no new listings
 REQUEST_TIMEOUT_S = 30
@@ -40,6 +48,7 @@ def pick_first_paragraphs(soup: BeautifulSoup, max_paragraphs: int = 2, max_char
 
 def pick_images(soup: BeautifulSoup, max_images: int = MAX_IMAGES) -> list[str]:
     imgs: list[str] = []
+    keys = set()
 
     def add(u: str):
         if not u:
@@ -53,8 +62,11 @@ def pick_images(soup: BeautifulSoup, max_images: int = MAX_IMAGES) -> list[str]:
             return
         if not re.search(r"\.(jpg|jpeg|png|webp)(\?|$)", u, re.IGNORECASE):
             return
+        # aceeași fotografie (cale canonică, app.images) o singură dată
         u = clean_url(u)
-        if u not in imgs:
+        k = image_stage.image_key(u)
+        if k not in keys:
+            keys.add(k)
             imgs.append(u)
 
     og = soup.select_one("meta[property='og:image']")
@@ -112,7 +124,7 @@ def build_xml(listings: list[dict]):
         SubElement(price, "price_on_request").text = "yes"
 
         images = SubElement(it, "images")
-        for img in l["images"][:MAX_IMAGES]:
+        for img in image_stage.feed_images(l["images"], MAX_IMAGES):
             SubElement(images, "image").text = img
 
     ElementTree(feed).write(
@@ -148,13 +160,10 @@ def collect_listing_urls_with_browser() -> tuple[list[str], dict, str]:
         stable = 0
 
         def grab():
-            hrefs = page.eval_on_selector_all(
-                "a[href]",
-                "els => els.map(e => e.getAttribute('href')).filter(Boolean)"
-            )
+            # doar ancorele /listing/ noi de la apelul anterior (MutationObserver în pagină)
             out = []
-            for h in hrefs:
-                if "/listing/" not in h:
+            for h in page.evaluate(HARVEST_LINKS_JS) or []:
+                if not h or "/listing/" not in h:
                     continue
                 full = urljoin("https://bringatrailer.com", h)
                 full = clean_url(full)
@@ -164,9 +173,7 @@ def collect_listing_urls_with_browser() -> tuple[list[str], dict, str]:
 
         last_count = 0
         for i in range(SCROLL_MAX_LOOPS):
-            links = grab()
-            for u in links:
-                seen.add(u)
+            seen.update(grab())
 
             # scroll down
             page.evaluate("window.scrollTo(0, document.body.scrollHeight)")
@@ -193,12 +200,29 @@ def collect_listing_urls_with_browser() -> tuple[list[str], dict, str]:
 
     return sorted(seen), cookies_dict, user_agent
 
-def fetch_listing(session: requests.Session, url: str) -> dict:
-    r = session.get(url, timeout=REQUEST_TIMEOUT_S)
-    if r.status_code != 200:
-        raise RuntimeError(f"HTTP {r.status_code}")
-
-    soup = BeautifulSoup(r.text, "html.parser")
+def fetch_listing(session: requests.Session, url: str, limiter: HostRateLimiter = None) -> dict:
+    try:
+        html, entry, not_modified = http_client.fetch_cached(
+            url, session=session, timeout=REQUEST_TIMEOUT_S, limiter=limiter
+        )
+    except requests.HTTPError as e:
+        raise RuntimeError(f"HTTP {e.response.status_code}") from e
+
+    # 304 / cache proaspăt: nu mai parsăm
+    cache = get_cache()
+    if not_modified and cache is not None:
+        item = cache.get_parsed(url, PARSED_KIND, entry)
+        if item:
+            return item
+
+    item = parse_pool.run(parse_listing_bytes, html, entry, url)
+    if entry is not None and cache is not None:
+        cache.set_parsed(url, PARSED_KIND, item)
+    return item
+
+def parse_listing_bytes(body: bytes, encoding: str, url: str) -> dict:
+    """HTML brut -> item; rulează și în procesele din app.parse_pool (PARSE_PROCESSES)."""
+    soup = BeautifulSoup(parse_pool.decode(body, encoding), "html.parser")
     h1 = soup.find("h1")
     title = h1.get_text(" ", strip=True) if h1 else url
     listing_id = url.rstrip("/").split("/")[-1]
@@ -214,33 +238,91 @@ def fetch_listing(session: requests.Session, url: str) -> dict:
         "images": images[:MAX_IMAGES],
     }
 
-def main():
+def fetch_all_listings(session: requests.Session, urls: list[str], workers: int = FETCH_WORKERS,
+                       limiter: HostRateLimiter = None) -> list[dict]:
+    """
+    Descarcă listing-urile în paralel (maxim `workers` simultan), cu buget de
+    request-uri per host în loc de sleep fix (aplicat de http_client pe fiecare
+    încercare reală de rețea, inclusiv retry-uri). Ordinea rezultatelor și a liniilor
+    `[i/N] OK/SKIP` este aceeași ca în varianta secvențială.
+    """
+    if limiter is None:
+        limiter = HostRateLimiter(HOST_RATE_LIMIT, HOST_RATE_BURST)
+
+    def one(u):
+        try:
+            return image_stage.process_item(fetch_listing(session, u, limiter=limiter)), None
+        except Exception as e:
+            return None, e
+
+    listings = []
+    with ThreadPoolExecutor(max_workers=max(1, int(workers or 1))) as pool:
+        # map() păstrează ordinea de intrare, deci printăm și colectăm în ordinea URL-urilor
+        for i, (u, (item, err)) in enumerate(zip(urls, pool.map(one, urls)), start=1):
+            if err is None:
+                listings.append(item)
+                print(f"[{i}/{len(urls)}] OK {item['id']} images={len(item['images'])}")
+                metrics.incr("listings_parsed")
+            else:
+                print(f"[{i}/{len(urls)}] SKIP {u} ({err})")
+                metrics.incr("listings_skipped")
+    return listings
+
+def collect_listing_urls() -> tuple[list[str], dict, str]:
+    """
+    Ca collect_listing_urls_with_browser, dar întâi fără browser (app.discovery).
+    Dacă indexul se oprește la o pagină eșuată (IndexIncomplete), URL-urile găsite
+    până acolo se păstrează și se adaugă la cele din browser.
+    """
+    urls = []
+    if DISCOVERY_BACKEND in ("auto", "direct"):
+        try:
+            for u in iter_listing_urls(BASE_AUCTIONS):
+                urls.append(u)
+            if urls:
+                return sorted(urls), {}, USER_AGENT
+        except IndexIncomplete as e:
+            print(f"Direct discovery incomplete ({len(urls)} URLs):", repr(e))
+        except Exception as e:
+            print("Direct discovery failed:", repr(e))
+        if DISCOVERY_BACKEND == "direct":
+            return sorted(urls), {}, USER_AGENT
     print("Opening real browser to collect ALL listing URLs…")
-    urls, cookies_dict, ua = collect_listing_urls_with_browser()
+    if not urls:
+        return collect_listing_urls_with_browser()
+    try:
+        links, cookies_dict, ua = collect_listing_urls_with_browser()
+    except Exception as e:
+        print("Browser discovery failed, keeping the partial index:", repr(e))
+        return sorted(urls), {}, USER_AGENT
+    merged = set(urls) | {normalize_listing_url(u) or u for u in links}
+    return sorted(merged), cookies_dict, ua
+
+
+def main():
+    print("Collecting listing URLs…")
+    with metrics.stage("discovery"):
+        urls, cookies_dict, ua = collect_listing_urls()
     print(f"Found {len(urls)} listing URLs")
 
-    sess = requests.Session()
-    sess.headers.update({
+    sess = http_client.new_session({
         "User-Agent": ua,
         "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
         "Accept-Language": "en-US,en;q=0.9",
         "Connection": "keep-alive",
         "Referer": "https://bringatrailer.com/",
-    })
+    }, pool_size=FETCH_WORKERS)
     sess.cookies.update(cookies_dict)
 
-    listings = []
-    for i, u in enumerate(urls, start=1):
-        try:
-            item = fetch_listing(sess, u)
-            listings.append(item)
-            print(f"[{i}/{len(urls)}] OK {item['id']} images={len(item['images'])}")
-        except Exception as e:
-            print(f"[{i}/{len(urls)}] SKIP {u} ({e})")
-        time.sleep(0.5)
+    listings = fetch_all_listings(sess, urls)
+    image_mirror.mirror_items(listings)
 
-    build_xml(listings)
+    with metrics.stage("render"):
+        build_xml(listings)
     print(f"Done. Wrote {OUTPUT_XML} with {len(listings)} listings.")
+    print("HTTP stats:", http_client.stats())
+    image_stage.flush()
+    metrics.write_reports()
 
 if __name__ == "__main__":
     main()
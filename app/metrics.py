@@ -0,0 +1,162 @@
+# app/metrics.py
+"""
+Instrumentare ușoară pentru o rulare: timp per etapă, contoare, HTTP.
+
+    with metrics.stage("discovery"): ...
+    @metrics.timed("render")
+    metrics.incr("upload_skipped")
+    metrics.observe_http(url, status, nbytes, seconds)   # din app.http_client
+
+Pentru fiecare etapă: numărul de apeluri, wall și CPU (al thread-ului care a
+rulat-o), însumate peste apeluri, și cel mai lung apel. Etapele rulate în paralel
+(ex. http, parse) pot avea deci wall_s mai mare decât durata rulării.
+La final write_reports() scrie sumarul JSON (METRICS_JSON) și, opțional,
+formatul text Prometheus (METRICS_PROM, pentru node_exporter textfile).
+"""
+import functools
+import heapq
+import json
+import os
+import re
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+from .config import METRICS_JSON, METRICS_PROM, METRICS_SLOWEST
+
+_lock = threading.Lock()
+_started = time.time()
+_stages = {}
+_counters = Counter()
+_status = Counter()
+_bytes = Counter()
+_slowest = []  # min-heap (secunde, url) cu cele mai lente METRICS_SLOWEST request-uri
+
+
+def _record(name: str, wall: float, cpu: float) -> None:
+    with _lock:
+        s = _stages.get(name)
+        if s is None:
+            s = _stages[name] = {"calls": 0, "wall_s": 0.0, "cpu_s": 0.0, "max_s": 0.0}
+        s["calls"] += 1
+        s["wall_s"] += wall
+        s["cpu_s"] += cpu
+        s["max_s"] = max(s["max_s"], wall)
+
+
+@contextmanager
+def stage(name: str):
+    w0, c0 = time.perf_counter(), time.thread_time()
+    try:
+        yield
+    finally:
+        _record(name, time.perf_counter() - w0, time.thread_time() - c0)
+
+
+def timed(name: str):
+    """Decorator: fiecare apel al funcției intră în etapa `name`."""
+    def deco(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with stage(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return deco
+
+
+def incr(name: str, n: int = 1) -> None:
+    with _lock:
+        _counters[name] += n
+
+
+def observe_http(url: str, status, nbytes: int, seconds: float) -> None:
+    """O încercare HTTP: status (None = eroare de rețea), bytes primiți, durata."""
+    with _lock:
+        _status[str(status) if status is not None else "error"] += 1
+        _bytes["in"] += nbytes or 0
+        item = (seconds, url)
+        if len(_slowest) < METRICS_SLOWEST:
+            heapq.heappush(_slowest, item)
+        elif item > _slowest[0]:
+            heapq.heapreplace(_slowest, item)
+
+
+def reset() -> None:
+    global _started
+    with _lock:
+        _started = time.time()
+        for c in (_stages, _counters, _status, _bytes):
+            c.clear()
+        _slowest.clear()
+
+
+def summary() -> dict:
+    from . import http_client  # retry-uri și cache hits le numără deja http_client
+
+    with _lock:
+        return {
+            "started": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(_started)),
+            "elapsed_s": round(time.time() - _started, 3),
+            "stages": {k: {m: round(v, 4) if isinstance(v, float) else v for m, v in s.items()}
+                       for k, s in _stages.items()},
+            "counters": dict(_counters),
+            "http": {
+                **http_client.stats(),
+                "status": dict(_status),
+                "bytes_in": _bytes["in"],
+                "slowest": [{"url": u, "seconds": round(t, 3)} for t, u in sorted(_slowest, reverse=True)],
+            },
+        }
+
+
+def _prom_name(s: str) -> str:
+    return re.sub(r"[^a-zA-Z0-9_]", "_", s)
+
+
+def prometheus_text(data: dict = None) -> str:
+    data = data or summary()
+    out = []
+
+    def metric(name, kind, samples):
+        out.append(f"# TYPE {name} {kind}")
+        for labels, value in samples:
+            lab = ",".join(f'{k}="{v}"' for k, v in labels.items())
+            out.append(f"{name}{{{lab}}} {value}" if lab else f"{name} {value}")
+
+    st = data["stages"]
+    metric("je_stage_calls_total", "counter", [({"stage": k}, s["calls"]) for k, s in st.items()])
+    metric("je_stage_wall_seconds_total", "counter", [({"stage": k}, s["wall_s"]) for k, s in st.items()])
+    metric("je_stage_cpu_seconds_total", "counter", [({"stage": k}, s["cpu_s"]) for k, s in st.items()])
+    metric("je_stage_max_seconds", "gauge", [({"stage": k}, s["max_s"]) for k, s in st.items()])
+    http = data["http"]
+    metric("je_http_responses_total", "counter", [({"status": k}, v) for k, v in http["status"].items()])
+    metric("je_http_received_bytes_total", "counter", [({}, http["bytes_in"])])
+    metric("je_http_retries_by_status_total", "counter",
+           [({"status": k}, v) for k, v in (http.get("retry_status") or {}).items()])
+    for k, v in http.items():
+        if isinstance(v, (int, float)) and k != "bytes_in":
+            metric(f"je_http_{_prom_name(k)}_total", "counter", [({}, v)])
+    for k, v in data["counters"].items():
+        metric(f"je_{_prom_name(k)}_total", "counter", [({}, v)])
+    metric("je_run_elapsed_seconds", "gauge", [({}, data["elapsed_s"])])
+    return "\n".join(out) + "\n"
+
+
+def _atomic_write(path: str, text: str) -> None:
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp, path)
+
+
+def write_reports(json_path: str = METRICS_JSON, prom_path: str = METRICS_PROM) -> dict:
+    """Sumarul rulării în JSON (și Prometheus, dacă e configurat); întoarce sumarul."""
+    data = summary()
+    if json_path:
+        _atomic_write(json_path, json.dumps(data, indent=2))
+        print("Metrics:", json_path)
+    if prom_path:
+        _atomic_write(prom_path, prometheus_text(data))
+    return data
@@ -0,0 +1,63 @@
+# app/parse_pool.py
+"""
+Parsarea HTML -> record (BeautifulSoup, CPU pur) în procese separate.
+
+Cu PARSE_PROCESSES > 0, workerii de rețea (thread-uri) trimit body-ul brut al
+paginii într-un ProcessPoolExecutor comun și primesc înapoi dict-ul parsat, deci
+parsarea folosește toate core-urile, nu doar un interpretor. Pool-ul e creat la
+prima folosire și refolosit pe toată rularea. Cu 0 (implicit) se parsează în
+thread-ul apelantului, ca înainte.
+"""
+import atexit
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from . import metrics
+from .config import PARSE_PROCESSES
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool(workers: int = PARSE_PROCESSES) -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                # "spawn": fork-ul unui proces cu thread-uri (fetch, browser) poate bloca copilul
+                _pool = ProcessPoolExecutor(max_workers=max(1, int(workers)),
+                                            mp_context=multiprocessing.get_context("spawn"))
+                atexit.register(shutdown)
+    return _pool
+
+
+def shutdown() -> None:
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=True, cancel_futures=True)
+            _pool = None
+
+
+def payload(html: str, entry: dict = None) -> tuple:
+    """(bytes, encoding) de trimis workerului: body-ul brut din cache dacă îl avem."""
+    if entry is not None and entry.get("body") is not None:
+        return entry["body"], entry.get("encoding") or "utf-8"
+    return html.encode("utf-8"), "utf-8"
+
+
+def decode(body: bytes, encoding: str) -> str:
+    return body.decode(encoding or "utf-8", errors="replace")
+
+
+@metrics.timed("parse")
+def run(fn, html: str, entry: dict, url: str):
+    """
+    fn(body, encoding, url) -> record; în pool dacă PARSE_PROCESSES > 0, altfel pe loc.
+    `fn` trebuie să fie o funcție de nivel modul (se trimite prin pickle).
+    """
+    body, encoding = payload(html, entry)
+    if PARSE_PROCESSES <= 0:
+        return fn(body, encoding, url)
+    return get_pool().submit(fn, body, encoding, url).result()
@@ -0,0 +1,262 @@
+# app/pipeline.py
+import os
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from . import image_mirror, images, metrics
+from .config import (
+    output_filename, FETCH_WORKERS, INCREMENTAL, STALE_AFTER_HOURS, FEED_DELTA, DISCOVERY_STOP_AT_KNOWN,
+    STREAMING, STREAM_QUEUE_SIZE, STREAM_COMMIT_EVERY,
+)
+from .scraper import LISTING_LIMIT, iter_unsold_index, parse_unsold_index, parse_listing
+from .inventory import (
+    open_inventory, save_inventory, export_inventory_json, plan_incremental, incremental_planner,
+    listing_index, upsert_car, reconcile_listed,
+)
+from .james_xml import (
+    JamesFeedWriter, ingest_items, write_delta, mark_published, delta_paths, feed_timestamps,
+    _require_dealer,
+)
+from .feeds import load_feed_specs, render_fanout
+from .storage import s3_enabled, upload_to_s3
+
+
+def _absolute(u: str) -> str:
+    return u if u.startswith("http") else f"https://bringatrailer.com{u}"
+
+
+def parse_listings(urls: list, workers: int = FETCH_WORKERS) -> list:
+    """parse_listing pe toate URL-urile, în paralel; rezultatele păstrează ordinea URL-urilor."""
+
+    def one(u):
+        try:
+            return parse_listing(_absolute(u)), None
+        except Exception as e:
+            return None, e
+
+    items = []
+    with ThreadPoolExecutor(max_workers=max(1, int(workers or 1))) as pool:
+        for i, (u, (data, err)) in enumerate(zip(urls, pool.map(one, urls)), start=1):
+            if err is None:
+                items.append(data)
+                print(f"[{i}/{len(urls)}] Parsed: {data.get('title', '')}")
+            else:
+                print("Skip", u, err)
+                metrics.incr("listings_skipped")
+    metrics.incr("listings_parsed", len(items))
+    return items
+
+
+def _known_urls(inv):
+    # pentru DISCOVERY_STOP_AT_KNOWN: descoperirea se oprește la pagini cu doar URL-uri de aici
+    if not DISCOVERY_STOP_AT_KNOWN:
+        return None
+    return {r.get("url") for r in inv.values() if r.get("url")}
+
+
+def _publish(inv, written: dict) -> None:
+    """Delta + manifest pentru feed-ul principal (FEED_DELTA), apoi upload opțional în S3."""
+    for name, n in written.items():
+        print(f"Wrote feed: {name} ({n} adverts)")
+
+    uploads = [(name, "application/xml") for name in written]
+    pending = []
+    if FEED_DELTA:
+        # delta față de publicarea anterioară + manifest, pentru feed-ul principal
+        manifest, pending = write_delta(inv, output_filename())
+        m = manifest["delta"]
+        print(f"Wrote delta: {m['name']} (+{m['added']} ~{m['changed']} -{m['removed']}, {m['bytes']} bytes)")
+        delta_name, manifest_name = delta_paths(output_filename())
+        uploads += [(delta_name, "application/xml"), (manifest_name, "application/json")]
+
+    # optional S3 push
+    failed = [name for name, content_type in uploads
+              if upload_to_s3(name, object_name=name, content_type=content_type) is None]
+
+    # starea publicată (feed_hash) se marchează doar după ce totul a urcat; fără S3,
+    # "publicat" înseamnă fișierele scrise local
+    if pending and s3_enabled() and failed:
+        print(f"Upload failed for {', '.join(failed)}: published state not updated, "
+              "the next delta repeats these changes")
+    elif pending:
+        mark_published(inv, pending)
+
+
+def run(incremental: bool = INCREMENTAL, streaming: bool = STREAMING):
+    # un singur inventory pe rulare, închis la final; tot la final (și după o eroare)
+    # sumarul de metrici: METRICS_JSON / METRICS_PROM
+    try:
+        with open_inventory() as inv:
+            if streaming:
+                run_streaming(incremental, inv=inv)
+            else:
+                _run_batch(incremental, inv)
+            # doar cu INVENTORY_EXPORT_JSON=1 (altfel: python -m app.inventory export-json)
+            export_inventory_json(inv)
+    finally:
+        images.flush()
+        metrics.write_reports()
+
+
+def _run_batch(incremental: bool, inv):
+    print("Discovering listings...")
+    known = _known_urls(inv)
+    report = {}
+    with metrics.stage("discovery"):
+        urls = parse_unsold_index(known=known, report=report)
+    print(f"Found {len(urls)} listings candidates" + ("" if report["complete"] else " (partial index)"))
+
+    to_fetch = urls
+    if incremental:
+        # doar noi / inactive / mai vechi de STALE_AFTER_HOURS; restul rămân cum sunt în inventory
+        to_fetch = plan_incremental(inv, urls, STALE_AFTER_HOURS)
+        print(f"Incremental: fetching {len(to_fetch)} new or stale of {len(urls)}")
+    # MAX_LISTINGS limitează ce se descarcă, nu indexul (reconcile se face pe tot indexul)
+    if len(to_fetch) > LISTING_LIMIT:
+        print(f"MAX_LISTINGS: fetching the first {LISTING_LIMIT} of {len(to_fetch)}")
+        to_fetch = to_fetch[:LISTING_LIMIT]
+
+    items = parse_listings(to_fetch)
+    # URL-uri canonice fără dubluri; cu IMAGE_VALIDATE și HEAD (rezultate ținute în IMAGE_INDEX_PATH)
+    images.process_items(items)
+    # IMAGE_MIRROR: copiile noastre (adresate după sha256), servite de pe IMAGE_HOST_BASE
+    image_mirror.mirror_items(items)
+
+    # în modul incremental indexul curent decide și ce iese din feed; un index oprit
+    # la URL-uri cunoscute sau după o pagină eșuată e parțial, deci din el nu putem
+    # deduce ce a dispărut
+    full_index = known is None and report["complete"]
+    if incremental and not full_index:
+        print("Partial index: skipping reconcile (no listing marked inactive)")
+    ingest_items(items, seen_urls=urls if incremental and full_index else None, inv=inv)
+
+    # feed-ul principal + feed-urile din FEEDS_CONFIG, într-o singură trecere prin inventory;
+    # fiecare fișier e scris advert cu advert în .tmp și redenumit la final
+    specs = [{"name": output_filename()}] + load_feed_specs()
+    _publish(inv, render_fanout(inv, specs))
+
+
+_DONE = object()
+
+
+def run_streaming(incremental: bool = INCREMENTAL, workers: int = FETCH_WORKERS, inv=None):
+    """
+    Aceleași etape ca run(), dar în flux:
+
+        discovery (thread) -> url_q -> fetch + parse (`workers` thread-uri) -> rec_q
+            -> upsert în inventory + <advert> în feed (thread-ul curent)
+
+    Cozile au cel mult STREAM_QUEUE_SIZE elemente, deci memoria nu crește cu
+    mărimea rulării, iar primele adverts ajung în <feed>.partial cât discovery încă rulează.
+    Inventory-ul se salvează la fiecare STREAM_COMMIT_EVERY recorduri: după un crash
+    se pierd cel mult ultimele, iar feed-ul publicat rămâne cel vechi.
+    La final feed-ul principal și cele din FEEDS_CONFIG se randează din inventory ca în
+    run() (render_fanout, cu FEED_DETERMINISTIC: ordinea din iter_by_reference și
+    timestamp-uri din inventory), deci ies identice cu cele din modul batch și skip-ul
+    pe hash la upload funcționează; .partial se șterge.
+    `inv`: inventory-ul deschis de run(); fără el, rularea își deschide și închide unul.
+    """
+    if inv is None:
+        with open_inventory() as inv:
+            return run_streaming(incremental, workers, inv)
+    _require_dealer()
+    workers = max(1, int(workers or 1))
+    index = listing_index(inv)
+    known = _known_urls(inv)
+    wanted = incremental_planner(inv, STALE_AFTER_HOURS) if incremental else None
+
+    url_q = queue.Queue(STREAM_QUEUE_SIZE)
+    rec_q = queue.Queue(STREAM_QUEUE_SIZE)
+    discovered = []
+    failed = []
+    report = {}
+
+    def discover():
+        queued = 0
+        try:
+            with metrics.stage("discovery"):
+                for u in iter_unsold_index(known=known, report=report):
+                    discovered.append(u)
+                    # MAX_LISTINGS limitează ce se descarcă; indexul îl citim tot (pentru reconcile)
+                    if queued < LISTING_LIMIT and (wanted is None or wanted(u)):
+                        url_q.put(u)
+                        queued += 1
+        except Exception as e:
+            failed.append(e)
+            print("Discovery failed:", repr(e))
+        finally:
+            for _ in range(workers):
+                url_q.put(_DONE)
+
+    def fetch_worker():
+        while True:
+            u = url_q.get()
+            if u is _DONE:
+                rec_q.put(_DONE)
+                return
+            try:
+                data = images.process_item(parse_listing(_absolute(u)))
+                rec_q.put((u, image_mirror.mirror_item(data), None))
+            except Exception as e:
+                rec_q.put((u, None, e))
+
+    threads = [threading.Thread(target=discover, name="discover", daemon=True)]
+    threads += [threading.Thread(target=fetch_worker, name=f"fetch-{i}", daemon=True) for i in range(workers)]
+    for t in threads:
+        t.start()
+
+    # progresul, advert cu advert, în ordinea sosirii; nu e feed-ul publicat
+    name = output_filename()
+    partial = name + ".partial"
+    created, updated = feed_timestamps(inv, deterministic=False)
+    in_feed = set()
+    parsed = pending = 0
+    with open(partial, "wb") as f:
+        w = JamesFeedWriter(f)
+        w.start(created, updated)
+
+        finished = 0
+        while finished < workers:
+            msg = rec_q.get()
+            if msg is _DONE:
+                finished += 1
+                continue
+            u, data, err = msg
+            if err is not None:
+                print("Skip", u, err)
+                metrics.incr("listings_skipped")
+                continue
+            parsed += 1
+            metrics.incr("listings_parsed")
+            ext_id, rec = upsert_car(inv, data, index=index)
+            if ext_id not in in_feed and w.add(rec):
+                in_feed.add(ext_id)
+                f.flush()
+            print(f"[{parsed}/{len(discovered)}] Parsed: {data.get('title', '')}")
+
+            pending += 1
+            if pending >= STREAM_COMMIT_EVERY:
+                save_inventory(inv)
+                pending = 0
+
+        for t in threads:
+            t.join()
+        w.close()
+
+    # doar indexul complet (fără oprire la URL-uri cunoscute, fără pagini eșuate)
+    # decide ce iese din feed, ca în run()
+    full_index = known is None and not failed and report.get("complete")
+    if incremental and full_index:
+        reconcile_listed(inv, discovered)
+    elif incremental:
+        print("Partial index: skipping reconcile (no listing marked inactive)")
+    save_inventory(inv)
+
+    # feed-urile finale, din inventory, exact ca în modul batch
+    specs = [{"name": name}] + load_feed_specs()
+    _publish(inv, render_fanout(inv, specs))
+    os.remove(partial)
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,376 @@
+# app/profiling.py
+"""
+Profilare la cerere, fără să edităm codul:
+
+    python -m app.profiling pipeline [--streaming] [--incremental]
+    python -m app.profiling pages data/pages [--parser scraper|main] [--repeat N] [--no-render]
+    ... [--sampler [--interval MS]] [--out DIR] [--focus fisier.py:functie]
+
+`pipeline` rulează app.pipeline.run() (cu rețea și inventory-ul real);
+`pages` parsează paginile salvate (*.html) fără rețea, apoi build_james_xml pe
+recordurile rezultate, într-un inventory temporar (data/ nu se atinge).
+
+Profilere:
+  - implicit cProfile, câte unul per thread (workerii de fetch intră și ei),
+    combinate într-un singur fișier .pstats (snakeviz, `python -m pstats`);
+  - --sampler: eșantionează stivele tuturor thread-urilor la --interval ms și
+    scrie .collapsed (flamegraph.pl, speedscope). Overhead mic, util pe rulări lungi.
+
+Raportul .txt are top-ul după timp cumulat și atribuirea per funcție pentru
+căile fierbinți (regex-urile din parse_listing_html, DOM-ul din _scan_listing_dom,
+ElementTree din _advert_element / build_james_xml): timpul fiecărei funcții
+împărțit pe categorii (regex, ElementTree, bs4, lxml, json, app, alte).
+Cu PARSE_PROCESSES > 0 parsarea din `pipeline` rulează în alte procese și nu apare;
+`pages` parsează mereu în procesul curent.
+"""
+import argparse
+import cProfile
+import glob
+import io
+import os
+import pstats
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter, defaultdict
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PROFILE_DIR = os.path.join(BASE_DIR, "data", "profile")
+
+# funcțiile pentru care raportăm atribuirea: (fișier, nume)
+FOCUS = [
+    ("scraper.py", "parse_listing_html"),
+    ("scraper.py", "_first_match"),
+    ("scraper.py", "_scan_listing_dom"),
+    ("main.py", "parse_listing_bytes"),
+    ("main.py", "pick_first_paragraphs"),
+    ("main.py", "pick_images"),
+    ("james_xml.py", "build_james_xml"),
+    ("james_xml.py", "render_feed"),
+    ("james_xml.py", "_advert_element"),
+    ("james_xml.py", "_xml_bytes"),
+]
+
+
+def category(filename: str, name: str) -> str:
+    """Categoria unei funcții (după fișier / numele din cProfile pentru built-in-uri)."""
+    path = filename.replace("\\", "/")
+    if "re.Pattern" in name or "_sre" in name or "/re/" in path or "/sre_" in path:
+        return "regex"
+    if "etree" in name or "/xml/etree/" in path:
+        return "ElementTree"
+    if "/bs4/" in path:
+        return "bs4"
+    if "lxml" in name or "/lxml/" in path:
+        return "lxml"
+    if "json" in name or "/json/" in path:
+        return "json"
+    if path.startswith(os.path.join(BASE_DIR, "app").replace("\\", "/")):
+        return "app"
+    return "other"
+
+
+def _short(filename: str) -> str:
+    if filename in ("~", ""):
+        return ""  # built-in
+    base = os.path.basename(filename)
+    if base == "__init__.py":
+        return f"{os.path.basename(os.path.dirname(filename))}/{base}"  # re/__init__.py, nu doar __init__.py
+    return base
+
+
+def _label(filename: str, name: str) -> str:
+    f = _short(filename)
+    return f"{f}:{name}" if f else name
+
+
+# --- cProfile, per thread ---------------------------------------------------
+
+class ThreadProfiler:
+    """
+    cProfile pe thread-ul curent și pe toate thread-urile pornite după start()
+    (pe Python < 3.12 un Profile vede doar thread-ul în care a fost pornit).
+    """
+
+    def __init__(self):
+        self._main = cProfile.Profile()
+        self._threads = []
+        self._lock = threading.Lock()
+
+    def _hook(self, frame, event, arg):
+        # primul eveniment din thread-ul nou: înlocuim hook-ul cu un profiler propriu
+        sys.setprofile(None)
+        p = cProfile.Profile()
+        try:
+            p.enable()
+        except ValueError:
+            return  # Python 3.12+: profilerul principal vede deja toate thread-urile
+        with self._lock:
+            self._threads.append(p)
+
+    def start(self) -> None:
+        threading.setprofile(self._hook)
+        self._main.enable()
+
+    def stop(self) -> pstats.Stats:
+        self._main.disable()
+        threading.setprofile(None)
+        stats = pstats.Stats(self._main, stream=io.StringIO())
+        with self._lock:
+            for p in self._threads:
+                try:
+                    stats.add(p)
+                except TypeError:
+                    pass  # profiler fără niciun apel înregistrat
+        return stats
+
+
+def attribution(stats: pstats.Stats, focus: list = FOCUS) -> list:
+    """
+    Pentru fiecare funcție din `focus` găsită în profil: apeluri, timp propriu,
+    cumulat și timpul apelurilor făcute de ea, pe categorii și pe funcții apelate.
+    """
+    callees = defaultdict(list)
+    for func, (_, _, _, _, callers) in stats.stats.items():
+        for caller, (_, nc, tt, ct) in callers.items():
+            callees[caller].append((func, nc, tt, ct))
+
+    wanted = {(f, n) for f, n in focus}
+    out = []
+    for func, (cc, nc, tt, ct, _) in stats.stats.items():
+        filename, line, name = func
+        if (os.path.basename(filename), name) not in wanted:
+            continue
+        by_cat = Counter({"self": tt})
+        rows = []
+        for (cf, cl, cn), cnc, ctt, cct in callees.get(func, []):
+            by_cat[category(cf, cn)] += cct
+            rows.append({"function": _label(cf, cn), "calls": cnc, "cum_s": cct,
+                         "category": category(cf, cn)})
+        rows.sort(key=lambda r: r["cum_s"], reverse=True)
+        out.append({
+            "function": f"{os.path.basename(filename)}:{line}:{name}",
+            "calls": nc, "self_s": tt, "cum_s": ct,
+            "by_category": dict(by_cat.most_common()),
+            "callees": rows,
+        })
+    out.sort(key=lambda r: r["cum_s"], reverse=True)
+    return out
+
+
+def format_report(stats: pstats.Stats, focus: list = FOCUS, top: int = 40, callees: int = 12) -> str:
+    buf = io.StringIO()
+    stats.stream = buf
+    stats.sort_stats("cumulative").print_stats(top)
+    buf.write("\n=== Atribuire per funcție (secunde) ===\n")
+    for r in attribution(stats, focus):
+        buf.write(f"\n{r['function']}  calls={r['calls']}  cum={r['cum_s']:.4f}  self={r['self_s']:.4f}\n")
+        buf.write("  categorii: " + ", ".join(f"{k}={v:.4f}" for k, v in r["by_category"].items()) + "\n")
+        for c in r["callees"][:callees]:
+            buf.write(f"    {c['cum_s']:>9.4f}s {c['calls']:>8} {c['category']:<12} {c['function']}\n")
+    return buf.getvalue()
+
+
+# --- profiler prin eșantionare ------------------------------------------------
+
+class Sampler:
+    """Stivele tuturor thread-urilor (mai puțin al său), la fiecare `interval` secunde."""
+
+    def __init__(self, interval: float = 0.005):
+        self.interval = max(0.0005, float(interval))
+        self.stacks = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._loop, name="sampler", daemon=True)
+
+    def _loop(self):
+        me = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == me:
+                    continue
+                stack = []
+                while frame is not None:
+                    co = frame.f_code
+                    stack.append((co.co_filename, co.co_name))
+                    frame = frame.f_back
+                stack.append(("", names.get(ident, f"thread-{ident}")))
+                self.stacks[tuple(reversed(stack))] += 1
+            self.samples += 1
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def collapsed(self) -> str:
+        """Formatul "a;b;c N" (o linie per stivă), cu thread-ul ca prim cadru."""
+        lines = [";".join(_label(f, n) for f, n in stack) + f" {count}"
+                 for stack, count in self.stacks.most_common()]
+        return "\n".join(lines) + "\n"
+
+    def format_report(self, focus: list = FOCUS, top: int = 40) -> str:
+        """Eșantioane per funcție (inclusiv / pe vârf) și, pentru focus, pe categoria vârfului."""
+        incl, leaf = Counter(), Counter()
+        per_focus = defaultdict(Counter)
+        wanted = {(f, n) for f, n in focus}
+        for stack, count in self.stacks.items():
+            frames = [(f, n) for f, n in stack[1:]]
+            if not frames:
+                continue
+            for fr in set(frames):
+                incl[fr] += count
+            leaf[frames[-1]] += count
+            top_cat = category(*frames[-1])
+            for f, n in set(frames):
+                if (os.path.basename(f), n) in wanted:
+                    per_focus[(f, n)][top_cat] += count
+
+        total = sum(self.stacks.values()) or 1
+        buf = io.StringIO()
+        buf.write(f"{self.samples} rounds, {total} stack samples, interval {self.interval * 1000:.1f} ms\n\n")
+        buf.write(f"{'incl %':>7} {'leaf %':>7}  function\n")
+        for fr, n in incl.most_common(top):
+            buf.write(f"{100.0 * n / total:>7.2f} {100.0 * leaf[fr] / total:>7.2f}  {_label(*fr)}\n")
+        buf.write("\n=== Atribuire per funcție (eșantioane, după categoria vârfului stivei) ===\n")
+        for fr, cats in sorted(per_focus.items(), key=lambda kv: -sum(kv[1].values())):
+            n = sum(cats.values())
+            buf.write(f"\n{_label(*fr)}  samples={n} ({100.0 * n / total:.1f}%)\n")
+            buf.write("  categorii: " + ", ".join(f"{k}={v}" for k, v in cats.most_common()) + "\n")
+        return buf.getvalue()
+
+
+# --- ținte ------------------------------------------------------------------
+
+def _page_url(path: str) -> str:
+    slug = os.path.splitext(os.path.basename(path))[0]
+    return f"https://bringatrailer.com/listing/{slug}/"
+
+
+def profile_pages(pages_dir: str, parser: str = "scraper", repeat: int = 1, render: bool = True) -> int:
+    """Parsează *.html din `pages_dir` (fără rețea); opțional build_james_xml într-un inventory temporar."""
+    from . import inventory, main as app_main, scraper
+    from .james_xml import build_james_xml
+
+    files = sorted(glob.glob(os.path.join(pages_dir, "*.html")))
+    if not files:
+        raise SystemExit(f"No *.html pages in {pages_dir}")
+    pages = []
+    for path in files:
+        with open(path, "rb") as f:
+            pages.append((_page_url(path), f.read()))
+
+    items = []
+    for _ in range(max(1, repeat)):
+        items = []
+        for url, body in pages:
+            if parser == "main":
+                items.append(app_main.parse_listing_bytes(body, "utf-8", url))
+            else:
+                items.append(scraper.parse_listing_html(body.decode("utf-8", errors="replace"), url))
+    print(f"Parsed {len(pages)} pages x {max(1, repeat)} ({parser})")
+
+    if render and parser == "scraper":
+        with tempfile.TemporaryDirectory() as tmp:
+            saved = (inventory.INVENTORY_PATH, inventory.INVENTORY_JOURNAL_PATH, inventory.INVENTORY_DB_PATH)
+            inventory.INVENTORY_PATH = os.path.join(tmp, "inventory.json")
+            inventory.INVENTORY_JOURNAL_PATH = os.path.join(tmp, "inventory.journal.jsonl")
+            inventory.INVENTORY_DB_PATH = os.path.join(tmp, "inventory.sqlite")
+            try:
+                xml = build_james_xml(items)
+            finally:
+                inventory.INVENTORY_PATH, inventory.INVENTORY_JOURNAL_PATH, inventory.INVENTORY_DB_PATH = saved
+        print(f"Built feed: {len(xml)} bytes")
+    return len(items)
+
+
+def profile_pipeline(incremental: bool = None, streaming: bool = None) -> None:
+    from . import pipeline
+
+    kwargs = {}
+    if incremental is not None:
+        kwargs["incremental"] = incremental
+    if streaming is not None:
+        kwargs["streaming"] = streaming
+    pipeline.run(**kwargs)
+
+
+# --- CLI --------------------------------------------------------------------
+
+def _parse_focus(values: list) -> list:
+    focus = list(FOCUS)
+    for v in values or []:
+        f, _, n = v.partition(":")
+        if not n:
+            raise SystemExit(f"--focus expects FILE.py:FUNCTION, got {v!r}")
+        focus.append((f, n))
+    return focus
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Profile the pipeline or listing parsing (cProfile / sampling)")
+    sub = ap.add_subparsers(dest="target", required=True)
+    p_pipe = sub.add_parser("pipeline", help="app.pipeline.run()")
+    p_pipe.add_argument("--streaming", action="store_true", default=None)
+    p_pipe.add_argument("--incremental", action="store_true", default=None)
+    p_pages = sub.add_parser("pages", help="parse_listing pe pagini salvate, apoi build_james_xml")
+    p_pages.add_argument("pages_dir")
+    p_pages.add_argument("--parser", choices=("scraper", "main"), default="scraper",
+                         help="scraper = app.scraper.parse_listing_html, main = app.main.parse_listing_bytes")
+    p_pages.add_argument("--repeat", type=int, default=1)
+    p_pages.add_argument("--no-render", dest="render", action="store_false",
+                         help="fără build_james_xml")
+    for p in (p_pipe, p_pages):
+        p.add_argument("--sampler", action="store_true", help="eșantionare în loc de cProfile")
+        p.add_argument("--interval", type=float, default=5.0, help="ms între eșantioane (--sampler)")
+        p.add_argument("--out", default=PROFILE_DIR, help=f"director pentru rezultate (implicit {PROFILE_DIR})")
+        p.add_argument("--focus", action="append", default=[],
+                       help="FISIER.py:FUNCTIE de adăugat la atribuire; se poate repeta")
+        p.add_argument("--top", type=int, default=40)
+    args = ap.parse_args(argv)
+
+    if args.target == "pages":
+        # build_james_xml cere dealer-ul; în inventory-ul temporar orice valoare merge
+        os.environ.setdefault("JE_DEALER_ID", "profile")
+        os.environ.setdefault("JE_DEALER_NAME", "profile")
+        run = lambda: profile_pages(args.pages_dir, args.parser, args.repeat, args.render)  # noqa: E731
+    else:
+        run = lambda: profile_pipeline(args.incremental, args.streaming)  # noqa: E731
+    focus = _parse_focus(args.focus)
+
+    os.makedirs(args.out, exist_ok=True)
+    base = os.path.join(args.out, f"{args.target}-{time.strftime('%Y%m%d-%H%M%S')}")
+    t0 = time.perf_counter()
+    if args.sampler:
+        prof = Sampler(args.interval / 1000.0)
+        prof.start()
+        try:
+            run()
+        finally:
+            prof.stop()
+        with open(base + ".collapsed", "w", encoding="utf-8") as f:
+            f.write(prof.collapsed())
+        report = prof.format_report(focus, args.top)
+        outputs = [base + ".collapsed", base + ".txt"]
+    else:
+        prof = ThreadProfiler()
+        prof.start()
+        try:
+            run()
+        finally:
+            stats = prof.stop()
+        stats.dump_stats(base + ".pstats")
+        report = format_report(stats, focus, args.top)
+        outputs = [base + ".pstats", base + ".txt"]
+
+    with open(base + ".txt", "w", encoding="utf-8") as f:
+        f.write(report)
+    print(f"Profiled {args.target} in {time.perf_counter() - t0:.2f}s:", ", ".join(outputs))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+# app/render.py
+"""
+Re-randare read-only a feed-urilor din inventory (fără scrape, fără save,
+fără să atingem last_seen):
+
+    python -m app.render
+    python -m app.render --feed JamesEdition_feed_105029_ferrari.xml=Ferrari \\
+                         --feed JamesEdition_feed_105029_lamborghini.xml=Lamborghini
+    python -m app.render --config feeds.json
+
+Toate feed-urile se randează într-o singură trecere prin inventory (app.feeds).
+"""
+import argparse
+
+from .config import FEEDS_CONFIG, output_filename
+from .feeds import load_feed_specs, render_fanout
+from .inventory import open_inventory
+
+
+def render_outputs(specs: list) -> dict:
+    """specs: feed spec-uri (vezi app.feeds); întoarce {nume: număr de adverts}."""
+    with open_inventory() as inv:
+        out = render_fanout(inv, specs)
+    for name, n in out.items():
+        print(f"Rendered {name}: {n} adverts")
+    return out
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Render JamesEdition feeds from the inventory (read-only)")
+    ap.add_argument("--feed", action="append", default=[],
+                    help="CALE[=BRAND]; se poate repeta")
+    ap.add_argument("--config", default=None,
+                    help=f"fișier JSON cu feed spec-uri (implicit {FEEDS_CONFIG}, dacă există)")
+    args = ap.parse_args(argv)
+
+    specs = []
+    for f in args.feed:
+        path, _, brand = f.partition("=")
+        specs.append({"name": path, "brands": [brand] if brand else []})
+    if not specs:
+        # implicit: feed-ul principal + ce e definit în FEEDS_CONFIG
+        specs = [{"name": output_filename()}] + load_feed_specs(args.config or FEEDS_CONFIG)
+    elif args.config:
+        specs += load_feed_specs(args.config)
+    render_outputs(specs)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,13 +1,17 @@
 import re
-import time
-import asyncio
-from urllib.parse import urljoin
+import json
 
 import requests
 from bs4 import BeautifulSoup
-from playwright.async_api import async_playwright
+from bs4.element import CData, NavigableString, Tag
 
-from .config import USER_AGENT, BASE, MAX_LISTINGS, PAUSE_BETWEEN_REQUESTS
+from . import parse_pool
+from .browser import get_browser
+from .config import USER_AGENT, MAX_LISTINGS, DISCOVERY_BACKEND, BROWSER_TABS
+from .discovery import HARVEST_LINKS_JS, IndexIncomplete, iter_listing_urls, normalize_listing_url
+from .http_cache import get_cache
+from .http_client import fetch_cached
+from .images import image_key
 
 HEADERS = {"User-Agent": USER_AGENT}
 
@@ -15,64 +19,67 @@ HEADERS = {"User-Agent": USER_AGENT}
 AUCTIONS_URL = "https://bringatrailer.com/auctions/?sortby=bd"
 
 
-def fetch(url):
-    r = requests.get(url, headers=HEADERS, timeout=30)
-    r.raise_for_status()
-    return r.text
+# cheia sub care ținem recordul parsat în cache-ul HTTP; schimb-o când se schimbă parserul
+_PARSED_KIND = "scraper.parse_listing.v3"
 
 
-def _uniq(seq):
-    seen = set()
-    out = []
-    for x in seq:
-        if x and x not in seen:
-            seen.add(x)
-            out.append(x)
-    return out
+# câte listing-uri se descarcă cel mult într-o rulare; descoperirea directă citește tot
+# indexul (reconcile are nevoie de el întreg), doar fallback-urile prin browser se opresc aici
+LISTING_LIMIT = int(MAX_LISTINGS or 300)
 
 
-def _normalize_listing_url(h: str) -> str:
-    if not h:
-        return ""
-    h = h.split("#")[0].split("?")[0].rstrip("/")
-    if "/listing/" not in h:
-        return ""
-    if h.startswith("http"):
-        return h
-    return urljoin(BASE, h)
+# status-uri la care HTTP-ul simplu e considerat blocat (după retry-urile din http_client)
+_BLOCKED_STATUSES = {403, 429, 503}
 
 
-async def _collect_listing_links_dynamic(target: int) -> list:
+def _fetch_page(url):
+    """
+    fetch_cached, iar dacă BaT blochează request-ul simplu și BROWSER_TABS > 0,
+    pagina vine dintr-un tab al browserului comun (app.browser).
+    Întoarce (html, entry, not_modified) ca fetch_cached.
     """
-    Colectează link-uri de pe /auctions/?sortby=bd (dinamic JS).
+    try:
+        return fetch_cached(url, timeout=30)
+    except requests.HTTPError as e:
+        status = getattr(e.response, "status_code", None)
+        if BROWSER_TABS <= 0 or status not in _BLOCKED_STATUSES:
+            raise
+        print(f"HTTP {status} for {url}; fetching via browser")
+        return get_browser().fetch_html(url), None, False
+
+
+def fetch(url):
+    # session comun (keep-alive) + retry/backoff pe 429/5xx + cache pe disc cu ETag;
+    # pauza PAUSE_BETWEEN_REQUESTS per host o aplică scheduler-ul din http_client
+    html, _, _ = _fetch_page(url)
+    return html
+
+
+_normalize_listing_url = normalize_listing_url
+
+
+async def _collect_listing_links_dynamic(context, target: int) -> list:
+    """
+    Colectează link-uri de pe /auctions/?sortby=bd (dinamic JS), într-un tab din
+    contextul comun (app.browser).
     Încercă scroll și butoane tip "Show more" dacă apar.
     Returnează URL-uri absolute către /listing/...
     """
-    async with async_playwright() as p:
-        browser = await p.chromium.launch(headless=True)
-        page = await browser.new_page(extra_http_headers={"User-Agent": USER_AGENT})
-
+    page = await context.new_page()
+    try:
         await page.goto(AUCTIONS_URL, wait_until="domcontentloaded", timeout=90000)
 
-        urls = []
+        found = {}  # set ordonat: URL -> None, în ordinea descoperirii
         max_steps = 120  # suficient pt 200-300 (depinde de câte încarcă per scroll)
         steps = 0
 
-        while len(urls) < target and steps < max_steps:
-            # ia toate linkurile /listing/ din DOM
-            hrefs = await page.eval_on_selector_all(
-                "a[href*='/listing/']",
-                "els => els.map(e => e.getAttribute('href'))"
-            )
-
-            cleaned = []
-            for h in hrefs or []:
+        while len(found) < target and steps < max_steps:
+            # doar ancorele /listing/ apărute de la pasul anterior (MutationObserver în pagină)
+            for h in await page.evaluate(HARVEST_LINKS_JS) or []:
                 u = _normalize_listing_url(h)
-                if u:
-                    cleaned.append(u)
-
-            urls = _uniq(urls + cleaned)
-            if len(urls) >= target:
+                if u and u not in found:
+                    found[u] = None
+            if len(found) >= target:
                 break
 
             # încearcă butoane "Show more / Load more" dacă există
@@ -107,25 +114,51 @@ async def _collect_listing_links_dynamic(target: int) -> list:
             await page.wait_for_timeout(1200)
             steps += 1
 
-        await browser.close()
-        return urls[:target]
+        return list(found)[:target]
+    finally:
+        await page.close()
 
 
-def parse_unsold_index():
+def iter_unsold_index(known=None, report: dict = None):
     """
-    Păstrăm numele funcției ca să nu modifici main.py.
-    DAR acum ia listările din AUCTIONS_URL (sortby=bd).
-    Returnează MAX_LISTINGS linkuri /listing/...
+    Ca parse_unsold_index, dar dă URL-urile pe măsură ce le găsește (descoperirea
+    directă, pagină cu pagină); fallback-urile (Playwright, static) vin la final, ca listă.
+    Descoperirea directă dă tot indexul, fără limită (MAX_LISTINGS se aplică la ce se
+    descarcă, în app.pipeline); fallback-urile dau cel mult LISTING_LIMIT URL-uri.
+    `report` (opțional) primește "complete": True doar dacă descoperirea directă a citit
+    indexul până la capăt; după o pagină eșuată (IndexIncomplete) sau din fallback-uri,
+    lista e parțială și nu trebuie folosită pentru reconcile.
     """
-    target = int(MAX_LISTINGS or 300)
+    target = LISTING_LIMIT
+    if report is not None:
+        report["complete"] = False
 
-    # Playwright (dinamic)
+    # direct (JSON-ul paginii + endpoint-ul paginat), fără browser
+    if DISCOVERY_BACKEND in ("auto", "direct"):
+        n = 0
+        try:
+            for u in iter_listing_urls(AUCTIONS_URL, known=known):
+                yield u
+                n += 1
+            if report is not None and n:
+                report["complete"] = True
+        except IndexIncomplete as e:
+            print(f"Direct discovery incomplete ({n} URLs):", repr(e))
+        except Exception as e:
+            print("Direct discovery failed:", repr(e))
+        if n or DISCOVERY_BACKEND == "direct":
+            return
+
+    # Playwright (dinamic), în browserul comun; cookie-urile lui trec apoi în session-ul HTTP
     try:
-        links = asyncio.run(_collect_listing_links_dynamic(target=target))
+        browser = get_browser()
+        links = browser.run(lambda ctx: _collect_listing_links_dynamic(ctx, target=target))
+        browser.share_with()
         if links:
-            return links[:target]
-    except Exception:
-        pass
+            yield from links[:target]
+            return
+    except Exception as e:
+        print("Browser discovery failed:", repr(e))
 
     # Fallback (static) – uneori merge parțial
     try:
@@ -137,28 +170,160 @@ def parse_unsold_index():
             u = _normalize_listing_url(href)
             if u and u not in links:
                 links.append(u)
-        return links[:target]
     except Exception:
-        return []
+        return
+    yield from links[:target]
+
+
+def parse_unsold_index(known=None, report: dict = None):
+    """
+    Păstrăm numele funcției ca să nu modifici main.py.
+    DAR acum ia listările din AUCTIONS_URL (sortby=bd).
+    Returnează linkurile /listing/... (tot indexul la descoperirea directă).
+    `known`: URL-uri deja știute; descoperirea directă se oprește la prima pagină
+    care le conține doar pe ele. `report`: ca la iter_unsold_index.
+    """
+    return list(iter_unsold_index(known, report))
+
+
+# tag-urile al căror text intră în căutarea VIN / mileage / transmisie
+_BLOB_TAGS = {"p", "li", "span", "div"}
+# exact tipurile pe care get_text() le consideră text (fără Script/Stylesheet/Comment/Template)
+_TEXT_TYPES = (NavigableString, CData)
+
+
+def _scan_listing_dom(soup) -> dict:
+    """
+    Parcurge arborele o singură dată (iterativ, fără recursie) și strânge:
+      - page_text: echivalent cu soup.get_text("\n", strip=True)
+      - title: textul primului h1/h2
+      - paragraphs: (text, în primul <article>, în primul <main>) pentru fiecare <p>
+      - blob_text: textul din p/li/span/div, fiecare string o singură dată
+      - ld_json, og_image, imgs: candidați pentru imagini
+    Textul unui element = string-urile dintre intrarea și ieșirea din el, deci nu
+    re-citim subarborele pentru fiecare tag.
+    """
+    strings = []
+    blob = []
+    paragraphs = []
+    ld_json = []
+    imgs = []
+    og_image = None
+    title = None
+    has_article = has_main = False
+    in_article = in_main = False
+    blob_depth = 0
+
+    stack = list(reversed(soup.contents))
+    while stack:
+        node = stack.pop()
+
+        if type(node) is tuple:
+            # ieșire din tag: (nume, start în strings, tag)
+            name, start, tag = node
+            if name == "p":
+                paragraphs.append((" ".join(strings[start:]), in_article, in_main))
+            elif name == "heading":
+                title = "".join(strings[start:])
+            elif name == "article" and tag is has_article:
+                in_article = False
+            elif name == "main" and tag is has_main:
+                in_main = False
+            elif name == "blob":
+                blob_depth -= 1
+            continue
+
+        if not isinstance(node, Tag):
+            if type(node) in _TEXT_TYPES:
+                t = node.strip()
+                if t:
+                    strings.append(t)
+                    if blob_depth:
+                        blob.append(t)
+            continue
+
+        name = node.name
+        if name in _BLOB_TAGS:
+            blob_depth += 1
+            stack.append(("blob", 0, node))
+        if name == "p":
+            stack.append(("p", len(strings), node))
+        elif name in ("h1", "h2"):
+            if title is None:
+                title = ""
+                stack.append(("heading", len(strings), node))
+        elif name == "article":
+            if has_article is False:
+                has_article = node
+                in_article = True
+                stack.append(("article", 0, node))
+        elif name == "main":
+            if has_main is False:
+                has_main = node
+                in_main = True
+                stack.append(("main", 0, node))
+        elif name == "script":
+            if node.get("type") == "application/ld+json":
+                ld_json.append(node.get_text(strip=True))
+        elif name == "meta":
+            if og_image is None and node.get("property") == "og:image":
+                og_image = node
+        elif name == "img":
+            imgs.append(node)
+
+        stack.extend(reversed(node.contents))
+
+    return {
+        "page_text": "\n".join(strings),
+        "title": title,
+        "paragraphs": paragraphs,
+        "has_article": has_article is not False,
+        "has_main": has_main is not False,
+        "blob_text": " ".join(blob),
+        "ld_json": ld_json,
+        "og_image": og_image,
+        "imgs": imgs,
+    }
 
 
 def parse_listing(url):
+    """
+    Descarcă și parsează un listing BaT (vezi parse_listing_html).
+    Dacă pagina n-a mai fost modificată (304 / cache proaspăt), refolosim recordul parsat.
+    """
+    html, entry, not_modified = _fetch_page(url)
+    cache = get_cache()
+    if not_modified and cache is not None:
+        rec = cache.get_parsed(url, _PARSED_KIND, entry)
+        if rec:
+            return rec
+    rec = parse_pool.run(_parse_listing_bytes, html, entry, url)
+    if entry is not None and cache is not None:
+        cache.set_parsed(url, _PARSED_KIND, rec)
+    return rec
+
+
+def _parse_listing_bytes(body: bytes, encoding: str, url: str) -> dict:
+    # rulează și în procesele din app.parse_pool: primește body-ul brut, întoarce recordul
+    return parse_listing_html(parse_pool.decode(body, encoding), url)
+
+
+def parse_listing_html(html, url):
     """
     Parsează un listing BaT folosind DATE DIN PAGINĂ (nu din titlu):
       - make / model: din blocul "Make ...", "Model ..."
       - year: din primele propoziții ale descrierii (ex: "This 1989 ...")
       - descriere: doar începutul (primele 1-2 paragrafe), ca summary pentru JE
       - imagini: maxim 5 (preferăm cele mari / OG / JSON-LD)
+    Funcție pură (fără rețea, fără pauze) – merge și pe HTML salvat pe disc.
     """
-    html = fetch(url)
     s = BeautifulSoup(html, "lxml")
 
-    # Title (îl păstrăm pentru output, dar NU îl folosim pentru year/make/model)
-    title_el = s.find(["h1", "h2"])
-    title = title_el.get_text(strip=True) if title_el else "Listing"
-
+    # o singură trecere prin DOM pentru tot ce avem nevoie mai jos
+    scan = _scan_listing_dom(s)
+    title = scan["title"] if scan["title"] is not None else "Listing"
     # text “flattened” (util pentru regex-uri stabile pe site changes)
-    page_text = s.get_text("\n", strip=True)
+    page_text = scan["page_text"]
 
     def _first_match(rx: str) -> str:
         m = re.search(rx, page_text, re.IGNORECASE)
@@ -185,20 +350,18 @@ def parse_listing(url):
             location["country"] = parts[2]
 
     # Descriere: primele 1-2 paragrafe “reale”
-    desc_paras = []
-    # candidate containers in order
+    # containere candidate, în ordine: primul <article>, primul <main>, tot documentul
+    paras = scan["paragraphs"]
     containers = []
-    art = s.find("article")
-    if art:
-        containers.append(art)
-    main = s.find("main")
-    if main:
-        containers.append(main)
-    containers.append(s)
+    if scan["has_article"]:
+        containers.append([txt for txt, in_article, _ in paras if in_article])
+    if scan["has_main"]:
+        containers.append([txt for txt, _, in_main in paras if in_main])
+    containers.append([txt for txt, _, _ in paras])
 
+    desc_paras = []
     for c in containers:
-        for p in c.find_all("p"):
-            txt = p.get_text(" ", strip=True)
+        for txt in c:
             if not txt:
                 continue
             # evităm texte de meniu, cookie etc.
@@ -231,7 +394,8 @@ def parse_listing(url):
 
     # VIN / mileage / transmission: tot din conținut (dar nu “title”)
     vin = mileage = transmission = ""
-    text_blobs = " ".join(el.get_text(" ", strip=True) for el in s.find_all(["p", "li", "span", "div"]))
+    # textul din p/li/span/div, fiecare string o singură dată (nu re-serializăm div-urile imbricate)
+    text_blobs = scan["blob_text"]
 
     # VIN explicit dacă apare ca “VIN: XXXXX”
     mvin = re.search(r"\bVIN\b[:\s]*([A-HJ-NPR-Z0-9]{11,17})\b", text_blobs)
@@ -252,20 +416,27 @@ def parse_listing(url):
         transmission = mt.group(1).lower()
 
     # Imagini: preferăm JSON-LD / OG, apoi fallback pe <img>
+    # o singură dată per cale canonică (app.images.image_key), dar păstrăm URL-ul văzut
+    # primul: varianta redimensionată de BaT, nu originalul full-size
     imgs = []
+    img_keys = set()
+
+    def _add_img(u: str) -> None:
+        k = image_key(u)
+        if k not in img_keys:
+            img_keys.add(k)
+            imgs.append(u)
 
     # JSON-LD images
-    for tag in s.select('script[type="application/ld+json"]'):
+    for ld in scan["ld_json"]:
         try:
-            import json as _json
-            data = _json.loads(tag.get_text(strip=True))
+            data = json.loads(ld)
             if isinstance(data, dict):
                 im = data.get("image")
                 if isinstance(im, list):
                     for u in im:
                         if isinstance(u, str) and u.startswith("http"):
-                            if u not in imgs:
-                                imgs.append(u)
+                            _add_img(u)
         except Exception:
             pass
         if len(imgs) >= 5:
@@ -273,15 +444,15 @@ def parse_listing(url):
 
     # OG image
     if len(imgs) < 5:
-        og = s.select_one('meta[property="og:image"]')
-        if og and og.get("content"):
+        og = scan["og_image"]
+        if og is not None and og.get("content"):
             u = og["content"]
-            if u.startswith("http") and u not in imgs:
-                imgs.append(u)
+            if u.startswith("http"):
+                _add_img(u)
 
     # Fallback <img>
     if len(imgs) < 5:
-        for img in s.select("img"):
+        for img in scan["imgs"]:
             src = img.get("src") or img.get("data-src") or ""
             if not src.startswith("http"):
                 continue
@@ -292,18 +463,10 @@ def parse_listing(url):
                 # eliminăm thumbnails foarte mici
                 if "fit=144" in src or "resize=235" in src:
                     continue
-                if src not in imgs:
-                    imgs.append(src)
+                _add_img(src)
             if len(imgs) >= 5:
                 break
 
-    # respectă pauza între request-uri dacă ai setat
-    if PAUSE_BETWEEN_REQUESTS:
-        try:
-            time.sleep(PAUSE_BETWEEN_REQUESTS)
-        except Exception:
-            pass
-
     return {
         "title": title,
         "brand": brand,
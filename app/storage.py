@@ -1,10 +1,15 @@
 # app/storage.py
+import gzip
+import hashlib
 import os
+import re
+import threading
 try:
     import boto3  # optional
 except Exception:
     boto3 = None
 
+from . import metrics
 from .config import (
     AWS_ACCESS_KEY_ID,
     AWS_SECRET_ACCESS_KEY,
@@ -12,12 +17,75 @@ from .config import (
     S3_BUCKET,
     S3_PREFIX,
     S3_ENDPOINT_URL,
+    S3_GZIP,
 )
 
-def upload_to_s3(local_path: str, object_name: str = None):
+# metadata S3 (x-amz-meta-content-sha256) cu hash-ul conținutului "stabil" al feed-ului
+HASH_METADATA_KEY = "content-sha256"
+
+# <created>/<updated> din feed_information se schimbă la fiecare build, chiar dacă nimic altceva nu
+_VOLATILE_RX = re.compile(rb"<(created|updated)>[^<]*</\1>")
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def _get_client():
+    """Un singur client S3 per proces (sesiunea boto3 + pool-ul de conexiuni refolosite)."""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                session = boto3.session.Session(
+                    aws_access_key_id=AWS_ACCESS_KEY_ID or None,
+                    aws_secret_access_key=AWS_SECRET_ACCESS_KEY or None,
+                    region_name=AWS_DEFAULT_REGION or None,
+                )
+                _client = session.client("s3", endpoint_url=S3_ENDPOINT_URL or None)
+    return _client
+
+
+def s3_enabled() -> bool:
+    """True dacă upload-ul în S3 e configurat (S3_BUCKET) și boto3 e instalat."""
+    return bool(S3_BUCKET) and boto3 is not None
+
+
+def feed_content_hash(data: bytes) -> str:
+    """sha256 peste feed, fără timestamp-urile volatile created/updated."""
+    return hashlib.sha256(_VOLATILE_RX.sub(rb"<\1/>", data)).hexdigest()
+
+
+def _s3_key(local_path: str, object_name: str = None) -> str:
+    key = (object_name or os.path.basename(local_path)).lstrip("/")
+    if S3_PREFIX:
+        key = f"{S3_PREFIX.strip('/')}/{key}"
+    return key
+
+
+def _remote_hash(s3, key: str):
+    """
+    Hash-ul din metadata obiectului remote; None dacă nu există sau nu-l putem citi.
+    Credențialele doar cu PutObject primesc 403 la HEAD (fără s3:GetObject / s3:ListBucket):
+    atunci nu știm nimic despre obiect și urcăm, ca înainte de skip-ul pe hash.
+    """
+    try:
+        head = s3.head_object(Bucket=S3_BUCKET, Key=key)
+    except Exception as e:
+        code = str(getattr(e, "response", {}).get("Error", {}).get("Code", ""))
+        if code not in ("404", "NoSuchKey", "NotFound"):
+            print(f"S3 HEAD failed for {key} ({code or repr(e)}); uploading without the unchanged check")
+            metrics.incr("upload_head_errors")
+        return None
+    return (head.get("Metadata") or {}).get(HASH_METADATA_KEY)
+
+
+@metrics.timed("upload")
+def upload_to_s3(local_path: str, object_name: str = None, content_type: str = "application/xml"):
     """
     Încărcare opțională în S3/R2. Dacă nu e configurat (sau lipsesc pachetele),
     funcția iese lin și returnează None ca să nu pice workflow-ul.
+    Dacă obiectul remote are deja același hash de conținut, nu mai urcăm nimic;
+    altfel urcăm gzip (Content-Encoding: gzip) cu hash-ul în metadata.
     """
     if not S3_BUCKET:
         print("S3 disabled: S3_BUCKET missing.")
@@ -27,19 +95,70 @@ def upload_to_s3(local_path: str, object_name: str = None):
         return None
 
     try:
-        session = boto3.session.Session(
-            aws_access_key_id=AWS_ACCESS_KEY_ID or None,
-            aws_secret_access_key=AWS_SECRET_ACCESS_KEY or None,
-            region_name=AWS_DEFAULT_REGION or None,
-        )
-        s3 = session.client("s3", endpoint_url=S3_ENDPOINT_URL or None)
-        key = (object_name or os.path.basename(local_path)).lstrip("/")
-        if S3_PREFIX:
-            key = f"{S3_PREFIX.strip('/')}/{key}"
-        s3.upload_file(local_path, S3_BUCKET, key, ExtraArgs={"ContentType": "application/xml"})
+        s3 = _get_client()
+        key = _s3_key(local_path, object_name)
         url = f"s3://{S3_BUCKET}/{key}"
+
+        with open(local_path, "rb") as f:
+            data = f.read()
+        digest = feed_content_hash(data)
+
+        if _remote_hash(s3, key) == digest:
+            print("S3 unchanged, skipped:", url)
+            metrics.incr("upload_skipped")
+            return url
+
+        extra = {"ContentType": content_type, "Metadata": {HASH_METADATA_KEY: digest}}
+        if S3_GZIP:
+            # mtime=0: același conținut -> aceiași bytes gzip
+            data = gzip.compress(data, mtime=0)
+            extra["ContentEncoding"] = "gzip"
+        s3.put_object(Bucket=S3_BUCKET, Key=key, Body=data, **extra)
         print("Uploaded to:", url)
+        metrics.incr("upload_ok")
+        metrics.incr("upload_bytes", len(data))
         return url
     except Exception as e:
         print("S3 upload skipped due to error:", repr(e))
+        metrics.incr("upload_errors")
         return None
+
+
+def s3_object_exists(key: str) -> bool:
+    """True dacă obiectul există deja în bucket (cheia exactă, fără S3_PREFIX adăugat)."""
+    try:
+        _get_client().head_object(Bucket=S3_BUCKET, Key=key)
+        return True
+    except Exception as e:
+        code = str(getattr(e, "response", {}).get("Error", {}).get("Code", ""))
+        if code in ("404", "NoSuchKey", "NotFound"):
+            return False
+        raise
+
+
+def put_blob(key: str, data: bytes, content_type: str, cache_control: str = None) -> bool:
+    """
+    Urcă un obiect adresat după conținut (ex. imaginile din app.image_mirror): aceeași
+    cheie înseamnă aceiași bytes, deci dacă obiectul există deja nu îl mai urcăm.
+    Cheia primește S3_PREFIX. True dacă am urcat, False dacă exista; erorile ajung la apelant.
+    """
+    if not S3_BUCKET or boto3 is None:
+        raise RuntimeError("S3 not configured (S3_BUCKET / boto3)")
+    key = _s3_key(key, key)
+    try:
+        exists = s3_object_exists(key)
+    except Exception as e:
+        # ca la upload_to_s3: fără drept de HEAD urcăm oricum
+        print(f"S3 HEAD failed for {key} ({e!r}); uploading")
+        metrics.incr("upload_head_errors")
+        exists = False
+    if exists:
+        metrics.incr("upload_skipped")
+        return False
+    extra = {"ContentType": content_type}
+    if cache_control:
+        extra["CacheControl"] = cache_control
+    _get_client().put_object(Bucket=S3_BUCKET, Key=key, Body=data, **extra)
+    metrics.incr("upload_ok")
+    metrics.incr("upload_bytes", len(data))
+    return True
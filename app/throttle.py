@@ -0,0 +1,65 @@
+# app/throttle.py
+import threading
+import time
+from urllib.parse import urlparse
+
+
+class TokenBucket:
+    """
+    Token bucket thread-safe: `rate` request-uri/secundă, cu rafală de maxim `burst`.
+    rate <= 0 dezactivează limitarea.
+    """
+
+    def __init__(self, rate: float, burst: float = 1.0):
+        self.rate = float(rate or 0)
+        self.burst = max(1.0, float(burst or 1))
+        self._tokens = self.burst
+        self._stamp = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _reserve(self) -> float:
+        """Rezervă un token și întoarce cât trebuie așteptat până devine valid."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._stamp) * self.rate)
+            self._stamp = now
+            self._tokens -= 1.0
+            if self._tokens >= 0:
+                return 0.0
+            # token "împrumutat": următorii apelanți stau la coadă în spatele lui
+            return -self._tokens / self.rate
+
+    def acquire(self) -> float:
+        if self.rate <= 0:
+            return 0.0
+        wait = self._reserve()
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+
+class HostRateLimiter:
+    """Câte un TokenBucket per host (bringatrailer.com, CDN-uri etc.)."""
+
+    def __init__(self, rate: float, burst: float = 1.0):
+        self.rate = rate
+        self.burst = burst
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def bucket(self, url: str) -> TokenBucket:
+        host = (urlparse(url).hostname or "").lower()
+        with self._lock:
+            b = self._buckets.get(host)
+            if b is None:
+                b = self._buckets[host] = TokenBucket(self.rate, self.burst)
+            return b
+
+    def acquire(self, url: str) -> float:
+        return self.bucket(url).acquire()
+
+
+def min_interval_limiter(gap: float) -> HostRateLimiter:
+    """Limiter care impune o pauză minimă de `gap` secunde între request-uri pe același host."""
+    gap = float(gap or 0)
+    return HostRateLimiter(1.0 / gap if gap > 0 else 0, burst=1)
@@ -0,0 +1,77 @@
+# benchmarks/bench_brand_matcher.py
+"""
+Microbenchmark pentru app.james_xml._find_brand pe titlurile (<headline>) din
+feed-urile JamesEdition_feed_*.xml din repo: vechiul sort + re.search per brand
+vs regex-ul precompilat.
+
+    python -m benchmarks.bench_brand_matcher [--repeat N]
+"""
+import argparse
+import glob
+import os
+import re
+import time
+import xml.etree.ElementTree as ET
+
+from app.james_xml import KNOWN_BRANDS, _find_brand
+
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+
+def legacy_find_brand(title: str) -> str:
+    """Copie a implementării vechi (case-sensitive, fără alias-uri)."""
+    t = title or ""
+    for b in sorted(KNOWN_BRANDS, key=len, reverse=True):
+        if re.search(rf"\b{re.escape(b)}\b", t):
+            return b
+    return ""
+
+
+def feed_titles(pattern: str = None) -> list:
+    titles = []
+    for fn in sorted(glob.glob(pattern or os.path.join(BASE_DIR, "JamesEdition_feed_*.xml"))):
+        for _, el in ET.iterparse(fn):
+            if el.tag == "headline" and el.text:
+                titles.append(el.text)
+            if el.tag == "advert":
+                el.clear()
+    return titles
+
+
+def _bench(fn, titles, repeat) -> float:
+    best = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        for t in titles:
+            fn(t)
+        dt = time.perf_counter() - t0
+        best = dt if best is None else min(best, dt)
+    return best
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--feeds", help="glob pentru feed-uri (implicit JamesEdition_feed_*.xml din repo)")
+    ap.add_argument("--repeat", type=int, default=5)
+    args = ap.parse_args()
+
+    titles = feed_titles(args.feeds)
+    if not titles:
+        raise SystemExit("No <headline> titles found")
+
+    before = _bench(legacy_find_brand, titles, args.repeat)
+    after = _bench(_find_brand, titles, args.repeat)
+    old = [legacy_find_brand(t) for t in titles]
+    new = [_find_brand(t) for t in titles]
+    differ = [(t, o, n) for t, o, n in zip(titles, old, new) if o != n]
+
+    print(f"titles: {len(titles)}")
+    print(f"before: {before / len(titles) * 1e6:8.2f} us/title")
+    print(f" after: {after / len(titles) * 1e6:8.2f} us/title  ({before / after:.1f}x)")
+    print(f"found before: {sum(1 for b in old if b)}, after: {sum(1 for b in new if b)}, differ: {len(differ)}")
+    for t, o, n in differ[:10]:
+        print(f"  {t!r}: {o or '-'} -> {n or '-'}")
+
+
+if __name__ == "__main__":
+    main()
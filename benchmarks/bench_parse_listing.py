@@ -0,0 +1,239 @@
+# benchmarks/bench_parse_listing.py
+"""
+CPU time per listing pentru app.scraper.parse_listing_html: implementarea veche
+(multe treceri prin DOM) vs extragerea într-o singură trecere.
+
+    python -m benchmarks.bench_parse_listing [--pages DIR] [--repeat N] [--synthetic]
+
+Rulează pe corpusul înregistrat din data/pages (benchmarks.pages); fără el se oprește,
+iar --synthetic permite explicit paginile generate din data/inventory.json (raportate
+ca "corpus": {"kind": "synthetic"}). Verifică și că ambele variante întorc exact același record (cu imaginile fără dubluri).
+"""
+import argparse
+import json
+import re
+import statistics
+import time
+
+from bs4 import BeautifulSoup
+
+from app.images import normalize_images
+from app.scraper import parse_listing_html
+from benchmarks.pages import load_corpus
+
+
+def legacy_parse_listing_html(html, url):
+    """Copie înghețată a parse_listing de dinainte de extragerea single-pass (fără fetch/sleep)."""
+    s = BeautifulSoup(html, "lxml")
+
+    # Title (îl păstrăm pentru output, dar NU îl folosim pentru year/make/model)
+    title_el = s.find(["h1", "h2"])
+    title = title_el.get_text(strip=True) if title_el else "Listing"
+
+    # text “flattened” (util pentru regex-uri stabile pe site changes)
+    page_text = s.get_text("\n", strip=True)
+
+    def _first_match(rx: str) -> str:
+        m = re.search(rx, page_text, re.IGNORECASE)
+        return m.group(1).strip() if m else ""
+
+    # Make / Model (din blocul de sus al paginii)
+    brand = _first_match(r"\bMake\s+([^\n]+)")
+    model = _first_match(r"\bModel\s+([^\n]+)")
+
+    # Location (BaT afișează “Location Located in …”)
+    location = {"country": "", "region": "", "city": "", "zip": "", "address": ""}
+    loc_full = _first_match(r"\bLocation\s+Located\s+in\s+([^\n]+)")
+    if loc_full:
+        # de obicei: "United States" sau "City, State" etc
+        parts = [p.strip() for p in re.split(r",|\n", loc_full) if p.strip()]
+        if len(parts) == 1:
+            location["country"] = parts[0]
+        elif len(parts) == 2:
+            location["city"] = parts[0]
+            location["region"] = parts[1]
+        elif len(parts) >= 3:
+            location["city"] = parts[0]
+            location["region"] = parts[1]
+            location["country"] = parts[2]
+
+    # Descriere: primele 1-2 paragrafe “reale”
+    desc_paras = []
+    # candidate containers in order
+    containers = []
+    art = s.find("article")
+    if art:
+        containers.append(art)
+    main = s.find("main")
+    if main:
+        containers.append(main)
+    containers.append(s)
+
+    for c in containers:
+        for p in c.find_all("p"):
+            txt = p.get_text(" ", strip=True)
+            if not txt:
+                continue
+            # evităm texte de meniu, cookie etc.
+            if len(txt) < 40:
+                continue
+            # evită paragrafe despre “Verified Checkout”
+            if "Verified Checkout" in txt:
+                continue
+            desc_paras.append(txt)
+            if len(desc_paras) >= 2:
+                break
+        if desc_paras:
+            break
+
+    desc_summary = "\n\n".join(desc_paras).strip()
+    if not desc_summary:
+        # fallback: primele ~500 caractere din textul paginii
+        desc_summary = page_text[:500].strip()
+
+    # Year: din începutul descrierii (ex: "This 1989 ...")
+    year = ""
+    my = re.search(r"\bThis\s+(19\d{2}|20\d{2})\b", desc_summary)
+    if my:
+        year = my.group(1)
+    else:
+        # fallback: primul an găsit în descriere (nu în titlu)
+        my2 = re.search(r"\b(19\d{2}|20\d{2})\b", desc_summary)
+        if my2:
+            year = my2.group(1)
+
+    # VIN / mileage / transmission: tot din conținut (dar nu “title”)
+    vin = mileage = transmission = ""
+    text_blobs = " ".join(el.get_text(" ", strip=True) for el in s.find_all(["p", "li", "span", "div"]))
+
+    # VIN explicit dacă apare ca “VIN: XXXXX”
+    mvin = re.search(r"\bVIN\b[:\s]*([A-HJ-NPR-Z0-9]{11,17})\b", text_blobs)
+    if mvin:
+        vin = mvin.group(1)
+    else:
+        # fallback: orice token VIN-like (mai riscant)
+        mvin2 = re.search(r"\b[A-HJ-NPR-Z0-9]{11,17}\b", text_blobs)
+        if mvin2:
+            vin = mvin2.group(0)
+
+    mm = re.search(r"(\d{1,3}(?:,\d{3})+|\d{1,6})\s*(miles|mi\.?|km)\b", text_blobs, re.I)
+    if mm:
+        mileage = mm.group(1).replace(",", "")
+
+    mt = re.search(r"\b(manual|automatic|semi-automatic|dual-clutch|dct|cvt)\b", text_blobs, re.I)
+    if mt:
+        transmission = mt.group(1).lower()
+
+    # Imagini: preferăm JSON-LD / OG, apoi fallback pe <img>
+    imgs = []
+
+    # JSON-LD images
+    for tag in s.select('script[type="application/ld+json"]'):
+        try:
+            data = json.loads(tag.get_text(strip=True))
+            if isinstance(data, dict):
+                im = data.get("image")
+                if isinstance(im, list):
+                    for u in im:
+                        if isinstance(u, str) and u.startswith("http"):
+                            if u not in imgs:
+                                imgs.append(u)
+        except Exception:
+            pass
+        if len(imgs) >= 5:
+            break
+
+    # OG image
+    if len(imgs) < 5:
+        og = s.select_one('meta[property="og:image"]')
+        if og and og.get("content"):
+            u = og["content"]
+            if u.startswith("http") and u not in imgs:
+                imgs.append(u)
+
+    # Fallback <img>
+    if len(imgs) < 5:
+        for img in s.select("img"):
+            src = img.get("src") or img.get("data-src") or ""
+            if not src.startswith("http"):
+                continue
+            url_no_q = src.split("?", 1)[0].lower()
+            is_photo = url_no_q.endswith((".jpg", ".jpeg", ".webp"))
+            is_theme_asset = "/themes/" in url_no_q or url_no_q.endswith(".svg")
+            if is_photo and not is_theme_asset:
+                # eliminăm thumbnails foarte mici
+                if "fit=144" in src or "resize=235" in src:
+                    continue
+                if src not in imgs:
+                    imgs.append(src)
+            if len(imgs) >= 5:
+                break
+
+    return {
+        "title": title,
+        "brand": brand,
+        "model": model,
+        "year": year,
+        "vin": vin,
+        "mileage": mileage,
+        "transmission": transmission,
+        "images": imgs[:5],
+        "url": url,
+        "description": desc_summary,  # doar începutul descrierii
+        "location": location,
+    }
+
+
+def _cpu_per_page(fn, pages, repeat):
+    out = []
+    for url, html in pages:
+        best = None
+        for _ in range(repeat):
+            t0 = time.process_time()
+            fn(html, url)
+            dt = time.process_time() - t0
+            best = dt if best is None else min(best, dt)
+        out.append(best)
+    return out
+
+
+def _comparable(rec: dict) -> dict:
+    # copia veche păstrează dublurile aceleiași fotografii; parse_listing_html le scoate (app.images)
+    return {**rec, "images": normalize_images(rec["images"])}
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--pages", help="director cu pagini BaT salvate (*.html); implicit data/pages")
+    ap.add_argument("--synthetic", action="store_true",
+                    help="fără pagini salvate, folosește pagini generate din data/inventory.json")
+    ap.add_argument("--limit", type=int, default=0)
+    ap.add_argument("--repeat", type=int, default=3)
+    ap.add_argument("--json", help="scrie rezultatele și în acest fișier")
+    args = ap.parse_args()
+
+    pages, corpus = load_corpus(args.pages, args.limit, allow_synthetic=args.synthetic)
+    print(f"corpus: {len(pages)} {corpus['kind']} pages ({corpus['source']})")
+    mismatches = [url for url, html in pages
+                  if _comparable(legacy_parse_listing_html(html, url)) != parse_listing_html(html, url)]
+
+    results = {"pages": len(pages), "corpus": corpus, "mismatches": mismatches}
+    for name, fn in (("before", legacy_parse_listing_html), ("after", parse_listing_html)):
+        times = _cpu_per_page(fn, pages, args.repeat)
+        results[name] = {
+            "mean_ms": round(statistics.mean(times) * 1000, 2),
+            "median_ms": round(statistics.median(times) * 1000, 2),
+            "max_ms": round(max(times) * 1000, 2),
+        }
+        print(f"{name:>6}: {results[name]['mean_ms']:8.2f} ms/listing (median {results[name]['median_ms']:.2f}, "
+              f"max {results[name]['max_ms']:.2f}) over {len(pages)} pages")
+    print(f"speedup: {results['before']['mean_ms'] / max(results['after']['mean_ms'], 1e-9):.2f}x, "
+          f"mismatches: {len(mismatches)}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,206 @@
+# benchmarks/pages.py
+"""
+Corpus de pagini BaT pentru benchmark-uri offline.
+
+Corpusul "recorded" sunt paginile reale salvate în data/pages/<slug>.html; se
+(re)înregistrează cu `python -m benchmarks.pages record` (URL-urile din
+data/pages/urls.txt sau date pe linia de comandă).
+Fără pagini salvate, load_corpus generează pagini cu structura unui listing BaT
+(header/nav imbricat, bloc "Listing Details", articol, galerie, JSON-LD, comentarii)
+din data/inventory.json — corpus "synthetic", semnalat zgomotos, pentru că
+cifrele de pe el nu spun mare lucru despre paginile reale.
+"""
+import glob
+import html
+import json
+import os
+import sys
+
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+INVENTORY_PATH = os.path.join(BASE_DIR, "data", "inventory.json")
+PAGES_DIR = os.path.join(BASE_DIR, "data", "pages")
+URLS_FILE = os.path.join(PAGES_DIR, "urls.txt")
+
+
+def _nested(depth: int, inner: str, cls: str = "wrap") -> str:
+    return f'<div class="{cls}">' * depth + inner + "</div>" * depth
+
+
+def synth_listing_html(rec: dict, comments: int = 60, depth: int = 12) -> str:
+    raw = rec.get("raw") or {}
+    e = html.escape
+    title = e(rec.get("title") or raw.get("title") or "Listing")
+    loc = rec.get("location") or {}
+    where = ", ".join(x for x in (loc.get("city"), loc.get("region"), loc.get("country")) if x) or "United States"
+    images = rec.get("images") or []
+    desc = (rec.get("description") or "").replace("\n", " ")
+    year = raw.get("year") or "1990"
+    body = (
+        f"This {year} {e(raw.get('brand') or '')} {e(raw.get('model') or '')} is said to have been "
+        f"refinished in its original color and is offered with service records and a clean title. {e(desc)}"
+    )
+
+    nav = "".join(f'<li class="menu-item"><a href="/c/{i}/"><span>Category {i}</span></a></li>' for i in range(40))
+    essentials = (
+        '<div class="essentials"><strong>Listing Details</strong><ul>'
+        f'<li>Chassis: <a href="#">{e(raw.get("vin") or "")}</a></li>'
+        f'<li>{e(raw.get("mileage") or "12,000")} Miles Shown</li>'
+        f'<li>Five-Speed {e((raw.get("transmission") or "manual").title())} Transaxle</li>'
+        "</ul>"
+        f'<div class="item"><strong>Make</strong> {e(raw.get("brand") or "")}</div>'
+        f'<div class="item"><strong>Model</strong> {e(raw.get("model") or "")}</div>'
+        f'<div class="item"><strong>Location</strong> Located in {e(where)}</div>'
+        "</div>"
+    )
+    gallery = "".join(
+        f'<img src="{e(u)}" data-src="{e(u)}" alt="" width="620" height="413">' for u in images
+    ) + '<img src="https://bringatrailer.com/wp-content/themes/bringatrailer/assets/img/logo.svg">'
+    article = (
+        f"<article><h1 class=\"post-title\">{title}</h1>"
+        f"<p>{body}</p><p>{body}</p><p>Verified Checkout is available for this listing.</p>"
+        f"{essentials}<div class=\"gallery\">{gallery}</div></article>"
+    )
+    comment = (
+        '<div class="comment"><div class="comment-meta"><span class="user">member{i}</span>'
+        '<span class="time">Jan {d}, 2026</span></div><div class="comment-text">'
+        "<p>Beautiful car, I had one just like it in {year} with about 40,000 miles and an automatic.</p>"
+        "</div></div>"
+    )
+    comments_html = "".join(_nested(depth // 3, comment.format(i=i, d=1 + i % 28, year=year), "thread") for i in range(comments))
+    ld = json.dumps({"@context": "https://schema.org", "@type": "Product", "name": rec.get("title"), "image": images})
+    og = f'<meta property="og:image" content="{e(images[0])}">' if images else ""
+    return (
+        "<!DOCTYPE html><html><head>"
+        f"<title>{title} | Bring a Trailer</title>{og}"
+        '<script>window.bat = {"listing": true};</script><style>.wrap{margin:0}</style>'
+        f'<script type="application/ld+json">{ld}</script>'
+        "</head><body>"
+        f'<header>{_nested(depth, "<nav><ul>" + nav + "</ul></nav>")}</header>'
+        f'<main>{_nested(depth, article)}<section class="comments">{comments_html}</section></main>'
+        f'<footer>{_nested(depth, "<p>Bring a Trailer Media LLC</p>")}</footer>'
+        "</body></html>"
+    )
+
+
+def _rel(path: str) -> str:
+    path = os.path.abspath(path)
+    return os.path.relpath(path, BASE_DIR) if path.startswith(BASE_DIR + os.sep) else path
+
+
+def _warn_synthetic(source: str):
+    bar = "!" * 78
+    print(f"{bar}\n!! WARNING: no recorded listing pages in {source}\n"
+          "!! falling back to SYNTHETIC pages generated from data/inventory.json;\n"
+          "!! timings/mismatches are NOT representative of real BaT pages.\n"
+          "!! Record the corpus with: python -m benchmarks.pages record\n"
+          f"{bar}", file=sys.stderr, flush=True)
+
+
+def load_corpus(pages_dir: str = None, limit: int = 0, allow_synthetic: bool = True) -> tuple:
+    """
+    (pagini, info): pagini = listă de (url, html); info = {"kind": "recorded"|"synthetic",
+    "source": ..., "pages": N}, de pus în rezultatele benchmark-urilor.
+    Paginile salvate au prioritate; fallback-ul sintetic e avertizat pe stderr,
+    iar cu allow_synthetic=False e o eroare.
+    """
+    pages_dir = pages_dir or PAGES_DIR
+    files = sorted(glob.glob(os.path.join(pages_dir, "*.html")))
+    out = []
+    if files:
+        kind, source = "recorded", _rel(pages_dir)
+        for fn in files:
+            slug = os.path.splitext(os.path.basename(fn))[0]
+            with open(fn, "r", encoding="utf-8", errors="replace") as f:
+                out.append((f"https://bringatrailer.com/listing/{slug}/", f.read()))
+    else:
+        if not allow_synthetic:
+            raise SystemExit(f"No recorded listing pages in {pages_dir}; record them with "
+                             "`python -m benchmarks.pages record` (or pass --synthetic)")
+        _warn_synthetic(pages_dir)
+        kind, source = "synthetic", _rel(INVENTORY_PATH)
+        with open(INVENTORY_PATH, "r", encoding="utf-8") as f:
+            inv = json.load(f)
+        for rec in inv.values():
+            out.append((rec.get("url") or "", synth_listing_html(rec)))
+    out = out[:limit] if limit else out
+    return out, {"kind": kind, "source": source, "pages": len(out)}
+
+
+def load_pages(pages_dir: str = None, limit: int = 0) -> list:
+    """Listă de (url, html), ca load_corpus (inclusiv avertismentul pentru fallback-ul sintetic)."""
+    return load_corpus(pages_dir, limit)[0]
+
+
+def record_pages(urls: list, pages_dir: str = None) -> int:
+    """Salvează paginile de listing date în pages_dir/<slug>.html; întoarce câte au reușit."""
+    from app import http_client
+
+    pages_dir = pages_dir or PAGES_DIR
+    os.makedirs(pages_dir, exist_ok=True)
+    ok = 0
+    for url in urls:
+        slug = url.rstrip("/").rsplit("/", 1)[-1]
+        try:
+            text = http_client.get_text(url)
+        except Exception as e:
+            print(f"{url}: {e!r}")
+            continue
+        with open(os.path.join(pages_dir, f"{slug}.html"), "w", encoding="utf-8") as f:
+            f.write(text)
+        ok += 1
+        print(f"{url} -> {slug}.html ({len(text)} chars)")
+    return ok
+
+
+def feed_records(pattern: str = None, limit: int = 0) -> list:
+    """
+    Recorduri de inventory reconstruite din feed-urile JamesEdition_feed_*.xml din repo
+    (sute de adverts reale, pentru benchmark-urile de randare).
+    """
+    import xml.etree.ElementTree as ET
+
+    out = []
+    for fn in sorted(glob.glob(pattern or os.path.join(BASE_DIR, "JamesEdition_feed_*.xml"))):
+        for _, el in ET.iterparse(fn):
+            if el.tag != "advert":
+                continue
+            ref = el.get("reference") or ""
+            loc = el.find("location")
+            out.append({
+                "external_id": ref,
+                "je_reference": ref,
+                "status": "active",
+                "title": el.findtext("headline") or "",
+                "url": el.findtext("url") or "",
+                "description": el.findtext("description") or "",
+                "images": [t.text for t in el.iter("image_url") if t.text],
+                "location": {c.tag: c.text or "" for c in loc} if loc is not None else {},
+                "raw": {k: el.findtext(k) or "" for k in ("year", "brand", "model")},
+            })
+            el.clear()
+            if limit and len(out) >= limit:
+                return out
+    return out
+
+
+def main():
+    import argparse
+
+    ap = argparse.ArgumentParser(description="Înregistrează corpusul de pagini BaT pentru benchmark-uri")
+    ap.add_argument("cmd", choices=("record",))
+    ap.add_argument("urls", nargs="*", help=f"URL-uri de listing (implicit cele din {os.path.relpath(URLS_FILE, BASE_DIR)})")
+    ap.add_argument("--pages", help="directorul de ieșire (implicit data/pages)")
+    args = ap.parse_args()
+
+    urls = args.urls
+    if not urls:
+        with open(URLS_FILE, "r", encoding="utf-8") as f:
+            urls = [ln.strip() for ln in f if ln.strip() and not ln.startswith("#")]
+    ok = record_pages(urls, args.pages)
+    print(f"recorded {ok}/{len(urls)} pages")
+    if ok < len(urls):
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+# benchmarks/standin.py
+"""
+Server HTTP local care ține locul BaT pentru benchmark-uri (fără rețea):
+
+  /auctions/                      pagina de index cu auctionsCurrentInitialData (prima pagină)
+  /wp-json/.../listings-filter    endpoint-ul paginat (JSON), ca în app.discovery
+  /listing/<slug>/                paginile din corpus (benchmarks.pages.load_pages)
+
+    with StandIn(pages) as site:
+        site.url("/auctions/"), site.api_url
+"""
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+API_PATH = "/wp-json/bringatrailer/1.0/data/listings-filter"
+
+
+def _slug(url: str) -> str:
+    return url.rstrip("/").rsplit("/", 1)[-1]
+
+
+class StandIn:
+    def __init__(self, pages: list, per_page: int = 24, host: str = "127.0.0.1", port: int = 0):
+        """pages: listă de (url, html); URL-urile sunt servite după slug."""
+        self.pages = {}
+        for url, html in pages:
+            self.pages[_slug(url)] = html.encode("utf-8")
+        self.slugs = list(self.pages)
+        self.per_page = max(1, per_page)
+        self.requests = 0
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def api_url(self) -> str:
+        return self.base + API_PATH
+
+    def url(self, path: str) -> str:
+        return self.base + path
+
+    def listing_urls(self) -> list:
+        return [self.url(f"/listing/{s}/") for s in self.slugs]
+
+    def _index(self, page: int, per_page: int) -> dict:
+        pages_total = max(1, -(-len(self.slugs) // per_page))
+        chunk = self.slugs[(page - 1) * per_page: page * per_page]
+        return {
+            "items": [{"title": s, "url": self.url(f"/listing/{s}/")} for s in chunk],
+            "page_current": page,
+            "pages_total": pages_total,
+            "items_total": len(self.slugs),
+        }
+
+    def _handler(self):
+        site = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def _send(self, status: int, body: bytes, ctype: str):
+                self.send_response(status)
+                self.send_header("Content-Type", ctype)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                site.requests += 1
+                u = urlparse(self.path)
+                q = parse_qs(u.query)
+                if u.path == API_PATH:
+                    page = int((q.get("page") or ["1"])[0])
+                    per_page = int((q.get("per_page") or [site.per_page])[0])
+                    body = json.dumps(site._index(page, per_page)).encode("utf-8")
+                    return self._send(200, body, "application/json")
+                if u.path.rstrip("/") == "/auctions":
+                    data = json.dumps(site._index(1, site.per_page)).replace("</", "<\\/")
+                    body = f"<html><body><script>var auctionsCurrentInitialData = {data};\n</script></body></html>"
+                    return self._send(200, body.encode("utf-8"), "text/html; charset=utf-8")
+                if u.path.startswith("/listing/"):
+                    html = site.pages.get(_slug(u.path))
+                    if html is not None:
+                        return self._send(200, html, "text/html; charset=utf-8")
+                self._send(404, b"not found", "text/plain")
+
+        return Handler
+
+    def __enter__(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, name="standin", daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._server.shutdown()
+        self._server.server_close()
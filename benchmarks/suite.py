@@ -0,0 +1,239 @@
+# benchmarks/suite.py
+"""
+Suita de benchmark-uri offline, pe fixture-uri înregistrate:
+  - paginile de listing din data/pages/*.html (corpus "recorded"); fără ele, pagini
+    generate din data/inventory.json, cu avertisment și "corpus.kind": "synthetic" în JSON
+  - feed-urile JamesEdition_feed_*.xml din repo (recorduri reale pentru randare)
+servite de un stand-in HTTP local (benchmarks.standin), fără rețea.
+
+    python -m benchmarks.suite [--pages DIR] [--repeat N] [--out FILE] [--baseline FILE]
+
+Etape: discovery, fetch_parse (HTTP + app.scraper.parse_listing), parse
+(parse_listing_html), parse_main (app.main.parse_listing_bytes: fetch_listing +
+pick_images), render (adverts din feed-uri), ingest (upsert + save într-un
+inventory SQLite temporar). Pentru fiecare: throughput, p50/p95 per item, CPU
+și rss_delta_kb: cu cât a crescut vârful RSS al procesului (ru_maxrss) în timpul
+etapei, față de vârful de la începutul ei. Etapele rulează în același proces, deci
+ru_maxrss e cumulativ: 0 înseamnă că etapa n-a depășit vârful etapelor anterioare,
+nu că n-a alocat nimic. Vârful întregii rulări e în "peak_rss_kb".
+
+Rezultatele se scriu în JSON (implicit data/bench/<commit>.json); cu --baseline
+se afișează raportul față de o rulare anterioară (alt commit).
+"""
+import argparse
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+try:
+    import resource  # nu există pe Windows
+except ImportError:
+    resource = None
+
+from benchmarks.pages import BASE_DIR, feed_records, load_corpus
+from benchmarks.standin import StandIn
+
+RESULTS_DIR = os.path.join(BASE_DIR, "data", "bench")
+
+
+def _percentile(values: list, p: float) -> float:
+    if not values:
+        return 0.0
+    s = sorted(values)
+    k = max(0, min(len(s) - 1, int(round(p / 100.0 * len(s) + 0.5)) - 1))
+    return s[k]
+
+
+def _peak_rss_kb():
+    """Vârful RSS al procesului de la pornire (ru_maxrss), nu al unei etape."""
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss // 1024 if sys.platform == "darwin" else rss  # macOS raportează bytes
+
+
+class Stage:
+    """Cronometrează o etapă: wall + CPU total, latența per item."""
+
+    def __init__(self, name: str, unit: str):
+        self.name = name
+        self.unit = unit
+        self.latencies = []
+
+    def __enter__(self):
+        self._rss0 = _peak_rss_kb()
+        self._wall = time.perf_counter()
+        self._cpu = time.process_time()
+        return self
+
+    def item(self, fn, *args):
+        t0 = time.perf_counter()
+        out = fn(*args)
+        self.latencies.append(time.perf_counter() - t0)
+        return out
+
+    def __exit__(self, *exc):
+        self.wall = time.perf_counter() - self._wall
+        self.cpu = time.process_time() - self._cpu
+        rss1 = _peak_rss_kb()
+        self.rss_delta = rss1 - self._rss0 if rss1 is not None else None
+
+    def result(self, items: int = None) -> dict:
+        n = len(self.latencies) if items is None else items
+        return {
+            "unit": self.unit,
+            "items": n,
+            "wall_s": round(self.wall, 4),
+            "cpu_s": round(self.cpu, 4),
+            "per_s": round(n / self.wall, 2) if self.wall else None,
+            "p50_ms": round(_percentile(self.latencies, 50) * 1000, 3),
+            "p95_ms": round(_percentile(self.latencies, 95) * 1000, 3),
+            "rss_delta_kb": self.rss_delta,
+        }
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BASE_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except Exception:
+        return "unknown"
+
+
+def run_suite(site: StandIn, pages: list, records: list, repeat: int = 1, workers: int = 4) -> dict:
+    """`site` trebuie pornit înainte de primul import din app (config citește INDEX_API_URL)."""
+    from concurrent.futures import ThreadPoolExecutor
+
+    from app import discovery, main as app_main, scraper
+    import app.inventory as inventory
+    from app.james_xml import JamesFeedWriter, ingest_items
+
+    stages = {}
+    with Stage("discovery", "urls") as st:
+        urls = st.item(discovery.discover_listings, site.url("/auctions/"), None, None, workers)
+    stages["discovery"] = st.result(items=len(urls))
+
+    with Stage("fetch_parse", "pages") as st:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            parsed = list(pool.map(lambda u: st.item(scraper.parse_listing, u), urls))
+    stages["fetch_parse"] = st.result()
+    stages["fetch_parse"]["http_requests"] = site.requests
+
+    with Stage("parse", "pages") as st:
+        for _ in range(repeat):
+            for url, html in pages:
+                st.item(scraper.parse_listing_html, html, url)
+    stages["parse"] = st.result()
+
+    with Stage("parse_main", "pages") as st:
+        for _ in range(repeat):
+            for url, html in pages:
+                st.item(app_main.parse_listing_bytes, html.encode("utf-8"), "utf-8", url)
+    stages["parse_main"] = st.result()
+
+    with Stage("render", "adverts") as st:
+        for _ in range(repeat):
+            buf = io.BytesIO()
+            w = JamesFeedWriter(buf)
+            w.start("2026-01-01 00:00:00")
+            for rec in records:
+                st.item(w.add, rec)
+            w.close()
+    stages["render"] = st.result()
+    stages["render"]["bytes"] = len(buf.getvalue())
+
+    # inventory temporar: nu atingem data/
+    with tempfile.TemporaryDirectory() as tmp:
+        saved = (inventory.INVENTORY_PATH, inventory.INVENTORY_JOURNAL_PATH, inventory.INVENTORY_DB_PATH)
+        inventory.INVENTORY_PATH = os.path.join(tmp, "inventory.json")
+        inventory.INVENTORY_JOURNAL_PATH = os.path.join(tmp, "inventory.journal.jsonl")
+        inventory.INVENTORY_DB_PATH = os.path.join(tmp, "inventory.sqlite")
+        try:
+            with Stage("ingest", "records") as st:
+                inventory.close_inventory(st.item(ingest_items, parsed))
+            stages["ingest"] = st.result(items=len(parsed))
+        finally:
+            inventory.INVENTORY_PATH, inventory.INVENTORY_JOURNAL_PATH, inventory.INVENTORY_DB_PATH = saved
+
+    return stages
+
+
+def _print(stages: dict, baseline: dict = None) -> None:
+    base = (baseline or {}).get("stages", {})
+    print(f"{'stage':<12} {'items':>7} {'per_s':>10} {'p50 ms':>9} {'p95 ms':>9} {'cpu s':>8} {'+rss MB':>8}  vs baseline")
+    for name, r in stages.items():
+        rss = f"{r['rss_delta_kb'] / 1024:.1f}" if r.get("rss_delta_kb") is not None else "-"
+        cmp = ""
+        b = base.get(name)
+        if b and b.get("per_s") and r.get("per_s"):
+            cmp = f"{r['per_s'] / b['per_s']:.2f}x throughput, p95 {b['p95_ms']:.2f} -> {r['p95_ms']:.2f} ms"
+        print(f"{name:<12} {r['items']:>7} {r['per_s'] or 0:>10.1f} {r['p50_ms']:>9.2f} {r['p95_ms']:>9.2f} "
+              f"{r['cpu_s']:>8.2f} {rss:>8}  {cmp}")
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--pages", help="director cu pagini BaT salvate (*.html); implicit data/pages sau generate")
+    ap.add_argument("--limit", type=int, default=0, help="cel mult N pagini")
+    ap.add_argument("--feeds", help="glob pentru feed-urile de randat (implicit JamesEdition_feed_*.xml)")
+    ap.add_argument("--repeat", type=int, default=1, help="repetări pentru etapele CPU (parse, render)")
+    ap.add_argument("--workers", type=int, default=4)
+    ap.add_argument("--out", help="fișierul JSON cu rezultate (implicit data/bench/<commit>.json)")
+    ap.add_argument("--baseline", help="rezultate JSON anterioare, pentru comparație")
+    args = ap.parse_args()
+
+    # fără pauze, rate limit sau cache pe disc: măsurăm codul, nu politețea față de BaT
+    os.environ.setdefault("PAUSE_BETWEEN_REQUESTS", "0")
+    os.environ.setdefault("HOST_RATE_LIMIT", "0")
+    os.environ["HTTP_CACHE_DIR"] = ""
+    os.environ.setdefault("JE_DEALER_ID", "bench")
+    os.environ.setdefault("JE_DEALER_NAME", "bench")
+
+    pages, corpus = load_corpus(args.pages, args.limit)
+    records = feed_records(args.feeds)
+    if not pages:
+        raise SystemExit("No pages in the corpus")
+    print(f"corpus: {len(pages)} {corpus['kind']} pages ({corpus['source']}), {len(records)} feed adverts")
+
+    with StandIn(pages) as site:
+        os.environ["INDEX_API_URL"] = site.api_url
+        stages = run_suite(site, pages, records, repeat=max(1, args.repeat), workers=args.workers)
+    commit = _git_commit()
+    result = {
+        "commit": commit,
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "corpus": {**corpus, "adverts": len(records), "repeat": args.repeat},
+        "stages": stages,
+        "peak_rss_kb": _peak_rss_kb(),
+    }
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        base_kind = (baseline.get("corpus") or {}).get("kind", "unknown")
+        if base_kind != corpus["kind"]:
+            print(f"WARNING: baseline corpus is {base_kind!r}, this run is {corpus['kind']!r}; "
+                  "the comparison is not like-for-like", file=sys.stderr)
+    _print(stages, baseline)
+    if result["peak_rss_kb"]:
+        print(f"peak RSS (whole run): {result['peak_rss_kb'] / 1024:.0f} MB")
+
+    out = args.out or os.path.join(RESULTS_DIR, f"{commit}.json")
+    os.makedirs(os.path.dirname(out) or ".", exist_ok=True)
+    with open(out, "w", encoding="utf-8") as f:
+        json.dump(result, f, indent=2)
+    print("results:", out)
+    if corpus["kind"] == "synthetic":
+        print("WARNING: results above are for the SYNTHETIC corpus (corpus.kind = synthetic)", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
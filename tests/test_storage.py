@@ -0,0 +1,110 @@
+# tests/test_storage.py
+"""
+upload_to_s3 pe un bucket S3 simulat (moto):
+
+    pip install -r requirements-dev.txt
+    python -m pytest -q
+"""
+import gzip
+
+import pytest
+
+boto3 = pytest.importorskip("boto3")
+moto = pytest.importorskip("moto")
+
+from app import storage
+
+BUCKET = "feeds-test"
+
+FEED = (b"<?xml version='1.0' encoding='UTF-8'?>\n<adverts><feed_information>"
+        b"<created>2026-01-01 10:00:00</created><updated>2026-01-01 10:00:00</updated>"
+        b"</feed_information><advert reference=\"a-1\"><price>100</price></advert></adverts>")
+
+
+@pytest.fixture
+def s3(monkeypatch):
+    for k, v in {"AWS_ACCESS_KEY_ID": "testing", "AWS_SECRET_ACCESS_KEY": "testing",
+                 "AWS_DEFAULT_REGION": "us-east-1"}.items():
+        monkeypatch.setenv(k, v)
+    monkeypatch.setattr(storage, "S3_BUCKET", BUCKET)
+    monkeypatch.setattr(storage, "S3_PREFIX", "")
+    monkeypatch.setattr(storage, "S3_ENDPOINT_URL", "")
+    monkeypatch.setattr(storage, "S3_GZIP", True)
+    monkeypatch.setattr(storage, "_client", None)
+    with moto.mock_aws():
+        client = boto3.client("s3", region_name="us-east-1")
+        client.create_bucket(Bucket=BUCKET)
+        yield client
+    storage._client = None
+
+
+def _write(tmp_path, data: bytes):
+    p = tmp_path / "feed.xml"
+    p.write_bytes(data)
+    return str(p)
+
+
+def _puts(monkeypatch):
+    # put_object-urile făcute prin clientul din storage
+    calls = []
+    client = storage._get_client()
+    put = client.put_object
+
+    def counting(**kw):
+        calls.append(kw["Key"])
+        return put(**kw)
+
+    monkeypatch.setattr(client, "put_object", counting)
+    return calls
+
+
+def test_first_upload(s3, tmp_path):
+    url = storage.upload_to_s3(_write(tmp_path, FEED), object_name="feed.xml")
+    assert url == f"s3://{BUCKET}/feed.xml"
+    body = s3.get_object(Bucket=BUCKET, Key="feed.xml")["Body"].read()
+    assert gzip.decompress(body) == FEED
+
+
+def test_gzip_encoding_and_hash_metadata(s3, tmp_path):
+    storage.upload_to_s3(_write(tmp_path, FEED), object_name="feed.xml")
+    head = s3.head_object(Bucket=BUCKET, Key="feed.xml")
+    assert head["ContentEncoding"] == "gzip"
+    assert head["ContentType"] == "application/xml"
+    assert head["Metadata"][storage.HASH_METADATA_KEY] == storage.feed_content_hash(FEED)
+
+
+def test_skips_when_only_timestamps_changed(s3, tmp_path, monkeypatch):
+    storage.upload_to_s3(_write(tmp_path, FEED), object_name="feed.xml")
+    puts = _puts(monkeypatch)
+    newer = FEED.replace(b"2026-01-01 10:00:00", b"2026-02-03 04:05:06")
+    assert storage.upload_to_s3(_write(tmp_path, newer), object_name="feed.xml") == f"s3://{BUCKET}/feed.xml"
+    assert puts == []
+    body = s3.get_object(Bucket=BUCKET, Key="feed.xml")["Body"].read()
+    assert gzip.decompress(body) == FEED
+
+
+def test_reuploads_when_content_changed(s3, tmp_path, monkeypatch):
+    storage.upload_to_s3(_write(tmp_path, FEED), object_name="feed.xml")
+    puts = _puts(monkeypatch)
+    changed = FEED.replace(b"<price>100</price>", b"<price>90</price>")
+    storage.upload_to_s3(_write(tmp_path, changed), object_name="feed.xml")
+    assert puts == ["feed.xml"]
+    head = s3.head_object(Bucket=BUCKET, Key="feed.xml")
+    assert head["Metadata"][storage.HASH_METADATA_KEY] == storage.feed_content_hash(changed)
+    body = s3.get_object(Bucket=BUCKET, Key="feed.xml")["Body"].read()
+    assert gzip.decompress(body) == changed
+
+
+def test_uploads_when_head_is_forbidden(s3, tmp_path, monkeypatch):
+    # credențiale doar cu PutObject: HEAD dă 403, upload-ul trebuie să meargă totuși
+    from botocore.exceptions import ClientError
+
+    client = storage._get_client()
+
+    def forbidden(**kw):
+        raise ClientError({"Error": {"Code": "403", "Message": "Forbidden"}}, "HeadObject")
+
+    monkeypatch.setattr(client, "head_object", forbidden)
+    puts = _puts(monkeypatch)
+    assert storage.upload_to_s3(_write(tmp_path, FEED), object_name="feed.xml") == f"s3://{BUCKET}/feed.xml"
+    assert puts == ["feed.xml"]